@@ -1,9 +1,70 @@
 # canvas_api.py - Canvas API interaction module to handle authentication and data retrieval 
+import re
+import time
 import requests
 
+from metrics import endpoint_template
+
+# the HTTP/2 transport needs httpx[http2], without it every request goes over requests/HTTP/1.1
+try:
+    from http2_transport import Http2Session
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# statuses worth retrying: rate limited or the server is temporarily unavailable
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+# grade_cache/submission_cache entries older than this (seconds) are fetched again on the next read
+DEFAULT_CACHE_MAX_AGE = 10 * 60
+
+
+# GraphQL query used at login: every current enrollment with its grades, the
+# first page of the course's assignments and the student's own submissions
+LOGIN_QUERY = """
+query LoginData($userId: ID!, $first: Int!, $withAssignments: Boolean!) {
+  legacyNode(_id: $userId, type: User) {
+    ... on User {
+      enrollments(currentOnly: true) {
+        grades { currentScore currentGrade finalScore finalGrade }
+        section { _id }
+        course {
+          _id
+          name
+          courseCode
+          assignmentsConnection(first: $first) @include(if: $withAssignments) {
+            pageInfo { hasNextPage endCursor }
+            nodes { _id name dueAt pointsPossible updatedAt description htmlUrl }
+          }
+          submissionsConnection(studentIds: [$userId], first: $first) {
+            pageInfo { hasNextPage endCursor }
+            nodes { _id assignmentId score grade submittedAt gradedAt state late missing }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# fields requested for each page of a connection, keyed by connection name
+CONNECTION_FIELDS = {
+    "assignments": "_id name dueAt pointsPossible updatedAt description htmlUrl",
+    "submissions": "_id assignmentId score grade submittedAt gradedAt state late missing",
+}
+
 class CanvasAPI:
     # Initialize with base URL and access token
-    def __init__(self, base_url, access_token):
+    # metrics: optional metrics.RequestMetrics that records every request.
+    # span_hook: optional callable(template, method) returning a context manager,
+    # entered around each request so it can be traced. both cost nothing when None
+    # http2: multiplex concurrent requests over one HTTP/2 connection (see http2_transport.py)
+    # max_retries: retries of rate limited/unavailable answers, off by default since a retry
+    # sleeps on the calling thread (the Tk thread in the GUI)
+    # cache_max_age: seconds a course grade or submission list is served from the cache
+    def __init__(self, base_url, access_token, pool_size=10, metrics=None, span_hook=None, max_retries=0,
+                 http2=False, cache_max_age=DEFAULT_CACHE_MAX_AGE):
         # Normalize URL
         if base_url.endswith("/"):
             base_url = base_url[:-1]
@@ -15,25 +76,164 @@ class CanvasAPI:
         self.headers = {
             "Authorization": f"Bearer {access_token}"
         }
+        self.graphql_url = f"{self.base_url}/api/graphql"
         # simple cache for last error
         self.last_error = None
+        # data primed by load_login_data so later screens don't refetch it
+        self.user = None
+        self.grade_cache = {}
+        self.submission_cache = {}
+        self.group_cache = {}
+        self.cache_max_age = cache_max_age
+        self._cached_at = {}  # ("grades" or "submissions", course_id) -> when it was loaded
+        self.event_cache = {}  # tuple of course ids -> calendar events
+        # url -> (etag, data) for the conditional requests used by the sync engine
+        self.etag_cache = {}
+        # one pooled session per API object so repeated calls reuse connections
+        if http2:
+            if not HTTP2_AVAILABLE:
+                raise RuntimeError('HTTP/2 needs httpx with HTTP/2 support: pip install "httpx[http2]"')
+            self.session = Http2Session(self.base_url, pool_size)
+        else:
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self.metrics = metrics
+        self.span_hook = span_hook
+        self.max_retries = max_retries
+
+    #every HTTP call goes through here: feeds metrics and tracing when enabled and, with
+    #max_retries set, retries rate limits/unavailable servers with backoff (honouring Retry-After).
+    #raises requests.exceptions.RequestException like session.request does
+    def _request(self, method, url, template, **kwargs):
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                if self.span_hook is None:
+                    resp = self.session.request(method, url, **kwargs)
+                else:
+                    with self.span_hook(template, method):
+                        resp = self.session.request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError:
+                if self.metrics is not None:
+                    self.metrics.record(template, "error", time.perf_counter() - started, 0)
+                if attempt >= self.max_retries:
+                    raise
+                delay = 0.5 * 2 ** attempt
+            else:
+                if self.metrics is not None:
+                    self.metrics.record(template, resp.status_code, time.perf_counter() - started,
+                                        len(resp.content))
+                if resp.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return resp
+                retry_after = resp.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else 0.5 * 2 ** attempt
+            attempt += 1
+            if self.metrics is not None:
+                self.metrics.record_retry(template)
+            time.sleep(min(delay, 30))
+
+    #the endpoint name metrics and traces group a request under, not worked out (None)
+    #when neither is on
+    def _template(self, method, path):
+        if self.metrics is None and self.span_hook is None:
+            return None
+        return endpoint_template(method, path)
+
+    def _cache_hit(self, cache):
+        if self.metrics is not None:
+            self.metrics.record_cache_hit(cache)
+
+    #records that the grade_cache ("grades"), submission_cache ("submissions") or group_cache
+    #("groups") entries of these courses were just loaded from Canvas
+    def mark_fresh(self, cache, course_ids):
+        now = time.monotonic()
+        for course_id in course_ids:
+            self._cached_at[(cache, course_id)] = now
+
+    def _is_fresh(self, cache, course_id):
+        return time.monotonic() - self._cached_at.get((cache, course_id), float("-inf")) <= self.cache_max_age
+
     #this is a helper method to make GET requests
     def _get(self, path, params=None):
         url = f"{self.api_root}{path}"
         try:
-            resp = requests.get(url, headers=self.headers, params=params, timeout=10)
+            resp = self._request("GET", url, self._template("GET", path),
+                                 headers=self.headers, params=params, timeout=10)
             if resp.status_code >= 400:
                 self.last_error = f"{resp.status_code} - {resp.text}"
                 return None
             return resp.json()
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             self.last_error = str(e)
             return None
+
+    #GET that sends the ETag from the previous call, returns (data, changed).
+    #a 304 answer has no body so we hand back the data we saved last time
+    def _get_if_changed(self, path, params=None):
+        url = f"{self.api_root}{path}"
+        key = (url, tuple(sorted((params or {}).items())))
+        headers = dict(self.headers)
+        cached = self.etag_cache.get(key)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        try:
+            resp = self._request("GET", url, self._template("GET", path),
+                                 headers=headers, params=params, timeout=10)
+            if resp.status_code == 304 and cached:
+                self._cache_hit("etag")
+                return cached[1], False
+            if resp.status_code >= 400:
+                self.last_error = f"{resp.status_code} - {resp.text}"
+                return None, False
+            data = resp.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.last_error = str(e)
+            return None, False
+        if resp.headers.get("ETag"):
+            self.etag_cache[key] = (resp.headers["ETag"], data)
+        return data, True
     
+    #closes the pooled connections
+    def close(self):
+        self.session.close()
+
+    #this is a helper method to POST a GraphQL query, returns the "data" part
+    def _graphql(self, query, variables=None):
+        try:
+            template = None
+            if self.metrics is not None or self.span_hook is not None:
+                operation = re.match(r"\s*query\s+(\w+)", query)
+                template = "POST /api/graphql" + (f" {operation.group(1)}" if operation else "")
+            resp = self._request("POST", self.graphql_url, template, headers=self.headers,
+                                 json={"query": query, "variables": variables or {}},
+                                 timeout=30)
+            if resp.status_code >= 400:
+                self.last_error = f"{resp.status_code} - {resp.text}"
+                return None
+            body = resp.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.last_error = str(e)
+            return None
+        if body.get("errors"):
+            self.last_error = "; ".join(err.get("message", "") for err in body["errors"])
+            return None
+        return body.get("data")
+
     #this gets the current user info from /users/self
     def get_current_user(self):
         data = self._get("/users/self")
+        if data:
+            self.user = data
         return data
+
+    # id of the logged in user, only hits the API the first time
+    def _current_user_id(self):
+        if self.user is None:
+            self.get_current_user()
+        return self.user.get('id') if self.user else None
     
     #this gets the list of courses the user is enrolled in
     def get_courses(self, per_page=100, include=None):
@@ -65,12 +265,44 @@ class CanvasAPI:
 
         return courses
     
+    #generator over the pages of a list endpoint, follows the Link: rel="next" header
+    #so memory stays at one page no matter how long the list is. on an error it
+    #sets last_error and stops
+    def iter_pages(self, path, params=None, per_page=100):
+        url = f"{self.api_root}{path}"
+        template = self._template("GET", path)
+        params = dict(params or {}, per_page=per_page)
+        while url:
+            try:
+                resp = self._request("GET", url, template, headers=self.headers, params=params, timeout=10)
+                if resp.status_code >= 400:
+                    self.last_error = f"{resp.status_code} - {resp.text}"
+                    return
+                chunk = resp.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.last_error = str(e)
+                return
+            if not isinstance(chunk, list) or not chunk:
+                return
+            yield chunk
+            # the next link already carries every query parameter
+            url = resp.links.get("next", {}).get("url")
+            params = None
+
+    #one course at a time, across all pages
+    def iter_courses(self, per_page=100):
+        for chunk in self.iter_pages("/courses", per_page=per_page):
+            yield from chunk
+
     #this gets the assignments for a specific course ID
-    def get_assignments(self, course_id, per_page=100):
+    #assignment_ids limits the list to those assignments
+    def get_assignments(self, course_id, per_page=100, assignment_ids=None):
         assignments = []
         page = 1
         while True:
             params = {"per_page": per_page, "page": page}
+            if assignment_ids:
+                params["assignment_ids[]"] = list(assignment_ids)
             chunk = self._get(f"/courses/{course_id}/assignments", params=params)
             if chunk is None:
                 return None
@@ -82,42 +314,362 @@ class CanvasAPI:
             page += 1
         return assignments
     
+    #like get_courses but only reports changed=True when the course list differs
+    #from last time, returns (courses, changed)
+    def get_courses_if_changed(self, per_page=100):
+        return self._get_all_pages_if_changed("/courses", per_page)
+
+    #like get_assignments but uses conditional requests, returns (assignments, changed).
+    #when nothing changed every page comes back as an empty 304
+    def get_assignments_if_changed(self, course_id, per_page=100):
+        return self._get_all_pages_if_changed(f"/courses/{course_id}/assignments", per_page)
+
+    def _get_all_pages_if_changed(self, path, per_page, params=None):
+        items, any_changed, page = [], False, 1
+        while True:
+            chunk, changed = self._get_if_changed(path, params=dict(params or {}, per_page=per_page, page=page))
+            if chunk is None:
+                return None, False
+            any_changed = any_changed or changed
+            if not isinstance(chunk, list) or len(chunk) == 0:
+                break
+            items.extend(chunk)
+            if len(chunk) < per_page:
+                break
+            page += 1
+        return items, any_changed
+
     #this gets the current grade for a specific course ID for the overall course grade   
-    def get_course_grade(self, course_id):
+    def get_course_grade(self, course_id, refresh=False):
+        if not refresh and course_id in self.grade_cache and self._is_fresh("grades", course_id):
+            self._cache_hit("grades")
+            return self.grade_cache[course_id]
         enrollments = self._get(f"/courses/{course_id}/enrollments", 
                                params={"user_id": "self"})
         if enrollments and len(enrollments) > 0:
             enrollment = enrollments[0]
-            return {
+            grade = {
                 'current_score': enrollment.get('grades', {}).get('current_score'),
                 'current_grade': enrollment.get('grades', {}).get('current_grade'),
                 'final_score': enrollment.get('grades', {}).get('final_score'),
                 'final_grade': enrollment.get('grades', {}).get('final_grade')
             }
+            self.grade_cache[course_id] = grade
+            self.mark_fresh("grades", [course_id])
+            return grade
         return None
     
+    #conditional version of get_course_grade, returns (grade, changed). changed compares
+    #with grade_cache, which is left to the caller to update (the sync engine does it
+    #on the thread that reads it)
+    def get_course_grade_if_changed(self, course_id):
+        enrollments, changed = self._get_if_changed(f"/courses/{course_id}/enrollments",
+                                                    params={"user_id": "self"})
+        if not enrollments:
+            return None, False
+        grade = _grade(enrollments[0])
+        return grade, changed and grade != self.grade_cache.get(course_id)
+
+    #every course grade in one conditional request, returns ({course_id: grade}, changed)
+    #where changed is False when Canvas answered 304. grade_cache is not touched
+    def get_course_grades_if_changed(self, per_page=100):
+        enrollments, changed = self._get_all_pages_if_changed("/users/self/enrollments", per_page,
+                                                              {"type[]": "StudentEnrollment"})
+        if enrollments is None:
+            return None, False
+        return {e.get('course_id'): _grade(e) for e in enrollments if e.get('course_id') is not None}, changed
+
+    #submissions of the current user graded after the given ISO timestamp, across all pages,
+    #with conditional requests: returns (submissions, changed). asked again with the same
+    #since, an unchanged list is an empty 304. the ETags saved for an older since are dropped
+    def get_graded_submissions_since_if_changed(self, course_id, since, per_page=100):
+        user_id = self._current_user_id()
+        if not user_id:
+            return None, False
+        path = f"/courses/{course_id}/students/submissions"
+        url = f"{self.api_root}{path}"
+        for key in [k for k in list(self.etag_cache) if k[0] == url and dict(k[1]).get("graded_since") != since]:
+            self.etag_cache.pop(key, None)
+        return self._get_all_pages_if_changed(path, per_page, {"student_ids[]": user_id, "graded_since": since})
+
+    #every submission of the current user in a course, across all pages, without
+    #touching submission_cache (the sync engine diffs it against what is held)
+    def fetch_submissions(self, course_id):
+        user_id = self._current_user_id()
+        if not user_id:
+            return None
+        self.last_error = None
+        submissions = [s for page in self.iter_pages(f"/courses/{course_id}/students/submissions",
+                                                     params={"student_ids[]": user_id}) for s in page]
+        return None if self.last_error else submissions
+
     #this gets all assignment submissions for the current user in a course     
-    def get_assignment_submissions(self, course_id):
-        # First, get the user's enrollment to find their user ID
-        user = self.get_current_user()
-        if not user:
+    def get_assignment_submissions(self, course_id, refresh=False):
+        if not refresh and course_id in self.submission_cache and self._is_fresh("submissions", course_id):
+            self._cache_hit("submissions")
+            return self.submission_cache[course_id]
+
+        submissions = self.fetch_submissions(course_id)
+        if submissions is None:
             return []
-        
-        user_id = user.get('id')
-        
-        # Fetch submissions for this user
-        submissions = self._get(f"/courses/{course_id}/students/submissions", 
-                               params={
-                                   "student_ids[]": user_id, 
-                                   "per_page": 100
-                               })
-        return submissions if submissions else []
+        self.submission_cache[course_id] = submissions
+        self.mark_fresh("submissions", [course_id])
+        return submissions
     
+    #assignment groups of a course with their weights and drop rules, each with its
+    #assignments and the current user's submission on them, all in one (paginated) call.
+    #returns {'apply_weights': bool, 'groups': [...]} or None on an error
+    def get_assignment_groups(self, course_id, refresh=False):
+        data = self._assignment_groups(course_id, refresh)
+        if data is None:
+            return None
+        if data['apply_weights'] is None:
+            # only the grade calculation needs this, the detail view never asks for it
+            course = self._get(f"/courses/{course_id}")
+            if course is None:
+                return None
+            data['apply_weights'] = bool(course.get('apply_assignment_group_weights'))
+        return data
+
+    #every assignment of a course with the user's submission embedded under 'submission',
+    #joined by Canvas in the same request chain as get_assignment_groups. None on an error
+    def get_assignments_with_submissions(self, course_id, refresh=False):
+        data = self._assignment_groups(course_id, refresh)
+        if data is None:
+            return None
+        return [a for group in data['groups'] for a in group.get('assignments') or []]
+
+    def _assignment_groups(self, course_id, refresh=False):
+        if not refresh and course_id in self.group_cache and self._is_fresh("groups", course_id):
+            self._cache_hit("groups")
+            return self.group_cache[course_id]
+        self.last_error = None
+        groups = []
+        for chunk in self.iter_pages(f"/courses/{course_id}/assignment_groups",
+                                     params={"include[]": ["assignments", "submission"]}):
+            groups.extend(chunk)
+        if self.last_error:
+            return None
+        data = {'apply_weights': None, 'groups': groups}
+        self.group_cache[course_id] = data
+        self.mark_fresh("groups", [course_id])
+        return data
+
+    #past-due assignments the user hasn't submitted, across every course in one
+    #request chain. course_ids limits it to those courses. items the student marked
+    #done or dismissed in the planner are left out unless include_dismissed is set.
+    #each item is an assignment with its 'course' embedded, None on an error
+    def get_missing_submissions(self, course_ids=None, include_dismissed=False):
+        params = {"include[]": ["planner_overrides", "course"], "filter[]": "submittable"}
+        if course_ids:
+            params["course_ids[]"] = list(course_ids)
+        self.last_error = None
+        missing = []
+        for chunk in self.iter_pages("/users/self/missing_submissions", params=params):
+            for item in chunk:
+                override = item.get('planner_override') or {}
+                if not include_dismissed and (override.get('marked_complete') or override.get('dismissed')):
+                    continue
+                missing.append(item)
+        if self.last_error:
+            return None
+        return missing
+
+    #calendar events (exam dates, breaks) of the given courses, ten courses per request
+    #chain since that's as many context codes as Canvas takes. cached per set of courses,
+    #None on an error
+    def get_calendar_events(self, course_ids, refresh=False):
+        key = tuple(sorted(course_ids))
+        if not refresh and key in self.event_cache:
+            self._cache_hit("events")
+            return self.event_cache[key]
+        self.last_error = None
+        events = []
+        for i in range(0, len(key), 10):
+            params = {"context_codes[]": [f"course_{c}" for c in key[i:i + 10]], "type": "event",
+                      "all_events": "true"}
+            for chunk in self.iter_pages("/calendar_events", params=params):
+                events.extend(chunk)
+        if self.last_error:
+            return None
+        self.event_cache[key] = events
+        return events
+
     def get_single_assignment_submission(self, course_id, assignment_id):
-        user = self.get_current_user()
-        if not user:
+        user_id = self._current_user_id()
+        if not user_id:
             return None
         
-        user_id = user.get('id')
         submission = self._get(f"/courses/{course_id}/assignments/{assignment_id}/submissions/{user_id}")
-        return submission
\ No newline at end of file
+        return submission
+
+    #this loads everything the app needs at login: courses, assignments, the
+    #student's submissions and enrollment grades. Uses GraphQL when the instance
+    #supports it (1-2 POSTs total) and falls back to the REST calls otherwise.
+    #with_assignments=False skips the assignment lists (e.g. when they come from
+    #a cache shared between users), data['assignments'] is then empty
+    def load_login_data(self, page_size=100, with_assignments=True):
+        user_id = self._current_user_id()
+        if not user_id:
+            return None
+        data = self._load_login_data_graphql(user_id, page_size, with_assignments)
+        if data is None:
+            data = self._load_login_data_rest(with_assignments)
+        if data is None:
+            return None
+
+        # prime the caches so dashboard/grades/chatbot don't refetch per course
+        self.grade_cache.update(data['grades'])
+        self.submission_cache.update(data['submissions'])
+        self.mark_fresh("grades", data['grades'])
+        self.mark_fresh("submissions", data['submissions'])
+        data['user'] = self.user
+        return data
+
+    def _load_login_data_rest(self, with_assignments=True):
+        courses = self.get_courses(include=["sections"])
+        if courses is None:
+            return None
+        assignments, grades = {}, {}
+        for course in courses:
+            course_id = course.get('id')
+            course['section_ids'] = sorted(s.get('id') for s in course.get('sections') or [])
+            course_assignments = self.get_assignments(course_id) if with_assignments else None
+            if course_assignments:
+                assignments[course_id] = course_assignments
+            grade = self.get_course_grade(course_id, refresh=True)
+            if grade:
+                grades[course_id] = grade
+        # submissions are still loaded lazily per course on the REST path
+        return {'courses': courses, 'assignments': assignments,
+                'grades': grades, 'submissions': {}}
+
+    def _load_login_data_graphql(self, user_id, page_size, with_assignments=True):
+        data = self._graphql(LOGIN_QUERY, {"userId": str(user_id), "first": page_size,
+                                           "withAssignments": with_assignments})
+        if not data or not data.get("legacyNode"):
+            return None
+
+        courses, assignments, submissions, grades = [], {}, {}, {}
+        sections = {}  # course_id -> the sections the user is enrolled in
+        pending = []  # (course_id, connection name, cursor) still to page through
+        for enrollment in data["legacyNode"].get("enrollments") or []:
+            node = enrollment.get("course") or {}
+            course_id = _legacy_id(node.get("_id"))
+            if course_id is None:
+                continue
+            section_id = _legacy_id((enrollment.get("section") or {}).get("_id"))
+            if section_id is not None:
+                sections.setdefault(course_id, set()).add(section_id)
+            if course_id in assignments:
+                continue  # e.g. enrolled in two sections of the same course
+            courses.append({'id': course_id, 'name': node.get("name"),
+                            'course_code': node.get("courseCode")})
+            assignments[course_id] = []
+            submissions[course_id] = []
+            if enrollment.get("grades"):
+                grades[course_id] = _map_grades(enrollment["grades"])
+            for name in CONNECTION_FIELDS:
+                conn = node.get(f"{name}Connection") or {}
+                cursor = self._add_connection_page(name, course_id, conn, assignments, submissions)
+                if cursor:
+                    pending.append((course_id, name, cursor))
+
+        # follow every unfinished connection, batching all courses into one POST per round.
+        # ids and cursors go in as variables, never into the query text
+        while pending:
+            parts, declared = [], ["$first: Int!"]
+            variables = {"first": page_size}
+            if any(name == "submissions" for _, name, _ in pending):
+                declared.append("$userIds: [ID!]")
+                variables["userIds"] = [str(user_id)]
+            for i, (course_id, name, cursor) in enumerate(pending):
+                declared += [f"$c{i}: ID!", f"$a{i}: String"]
+                variables.update({f"c{i}": str(course_id), f"a{i}": cursor})
+                parts.append(
+                    f'p{i}: course(id: $c{i}) {{ {name}Connection('
+                    + ("studentIds: $userIds, " if name == "submissions" else "")
+                    + f'first: $first, after: $a{i}) '
+                    f'{{ pageInfo {{ hasNextPage endCursor }} nodes {{ {CONNECTION_FIELDS[name]} }} }} }}'
+                )
+            page = self._graphql(f"query MorePages({', '.join(declared)}) {{\n" + "\n".join(parts) + "\n}",
+                                 variables)
+            if page is None:
+                return None
+            next_pending = []
+            for i, (course_id, name, _) in enumerate(pending):
+                conn = (page.get(f"p{i}") or {}).get(f"{name}Connection") or {}
+                cursor = self._add_connection_page(name, course_id, conn, assignments, submissions)
+                if cursor:
+                    next_pending.append((course_id, name, cursor))
+            pending = next_pending
+
+        for course in courses:
+            course['section_ids'] = sorted(sections.get(course['id'], ()))
+        # drop empty entries so assignments_cache looks like the REST version
+        assignments = {cid: items for cid, items in assignments.items() if items}
+        return {'courses': courses, 'assignments': assignments,
+                'grades': grades, 'submissions': submissions}
+
+    # maps one page of a connection into the REST shaped lists, returns the
+    # cursor for the next page or None when the connection is finished
+    def _add_connection_page(self, name, course_id, conn, assignments, submissions):
+        for node in conn.get("nodes") or []:
+            if name == "assignments":
+                assignments[course_id].append(_map_assignment(node, course_id))
+            else:
+                submissions[course_id].append(_map_submission(node))
+        info = conn.get("pageInfo") or {}
+        if info.get("hasNextPage") and info.get("endCursor"):
+            return info["endCursor"]
+        return None
+
+
+# GraphQL returns legacy ids as strings, REST returns ints
+def _legacy_id(value):
+    if value is None:
+        return None
+    return int(value) if str(value).isdigit() else value
+
+# the grade of a REST enrollment
+def _grade(enrollment):
+    grades = enrollment.get('grades') or {}
+    return {
+        'current_score': grades.get('current_score'),
+        'current_grade': grades.get('current_grade'),
+        'final_score': grades.get('final_score'),
+        'final_grade': grades.get('final_grade')
+    }
+
+def _map_grades(grades):
+    return {
+        'current_score': grades.get('currentScore'),
+        'current_grade': grades.get('currentGrade'),
+        'final_score': grades.get('finalScore'),
+        'final_grade': grades.get('finalGrade')
+    }
+
+def _map_assignment(node, course_id):
+    return {
+        'id': _legacy_id(node.get('_id')),
+        'course_id': course_id,
+        'name': node.get('name'),
+        'due_at': node.get('dueAt'),
+        'points_possible': node.get('pointsPossible'),
+        'updated_at': node.get('updatedAt'),
+        'description': node.get('description'),
+        'html_url': node.get('htmlUrl'),
+    }
+
+def _map_submission(node):
+    return {
+        'id': _legacy_id(node.get('_id')),
+        'assignment_id': _legacy_id(node.get('assignmentId')),
+        'score': node.get('score'),
+        'grade': node.get('grade'),
+        'submitted_at': node.get('submittedAt'),
+        'graded_at': node.get('gradedAt'),
+        'workflow_state': node.get('state'),
+        'late': node.get('late'),
+        'missing': node.get('missing'),
+    }
@@ -1,13 +1,27 @@
 #!/usr/bin/env python3.11
 # gui.py - makes the GUI for the Canvas API Chatbot and handles user interactions and display
+import argparse
 import tkinter as tk
 from tkinter import messagebox
 import threading
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from Canvas_api import CanvasAPI
 from chatbot import CanvasChatBot
+import session_cache
+from timeframes import user_timezone
+from sync_engine import SyncEngine, NEW_COURSE, NEW_ASSIGNMENT, DUE_DATE_MOVED, ASSIGNMENT_REMOVED, ASSIGNMENT_UPDATED
+import reminders
+import calendar_feed
+import ui_profiler
+import views
+# grade history (and its sparklines) needs numpy
+try:
+    import grade_history
+    GRADE_HISTORY_AVAILABLE = True
+except ImportError:
+    GRADE_HISTORY_AVAILABLE = False
 from tkinter import messagebox
-import os, json, uuid
+import os, sys, json, time, uuid
 from datetime import datetime
 
 # Try to import NLTK
@@ -25,10 +39,17 @@ try:
 except ImportError:
     NLTK_AVAILABLE = False
 
+# How often the background sync checks Canvas for changes
+SYNC_INTERVAL_SECONDS = int(os.environ.get("CANVAS_SYNC_INTERVAL", "300"))
+
+# views that call CanvasAPI on the Tk thread. the chat worker uses the same API object, so
+# these wait for its answer like sync changes do (see _after_chat)
+API_VIEWS = ("show_grades", "show_grade_details", "show_all_assignments")
+
 
 class CanvasChatbotGUI:
-    # Initialize the GUI
-    def __init__(self, root):
+    # Initialize the GUI. profiler is an optional ui_profiler.UIProfiler
+    def __init__(self, root, profiler=None):
         self.root = root
         self.root.title("Canvas API Chatbot")
         self.root.geometry("1400x900")
@@ -43,6 +64,27 @@ class CanvasChatbotGUI:
         self.assignments_cache = {}
         self.last_sync_time = None
         self.chatbot = None  # Will be initialized after login
+        self.course_stats = None  # the chatbot's per-course summaries, read by the dashboard
+        self._response_stream = None  # fragments of the chat answer being shown
+        # held by the chat worker while it works out an answer from the shared data and the
+        # API, sync changes and the API_VIEWS wait for it (see _dispatch_sync, _after_chat)
+        self.chat_lock = threading.Lock()
+        self.syncing = False  # True while a snapshot is being revalidated
+        self.current_view = None
+        self.sync_engine = None
+        self.reminder_store = None
+        self.reminder_scheduler = None
+        self._reminder_sync = None  # thread creating the automatic reminders after login
+        self._due_reminders = []  # fired reminders waiting for the notice that shows them
+        self._reminder_notice = None  # set while that notice is scheduled or open
+        self.grade_history = None
+        self.calendar = None  # calendar_feed.CalendarFeed of this user, kept current after every sync
+        self.calendar_lock = threading.Lock()
+        for name in API_VIEWS:
+            setattr(self, name, self._after_chat(getattr(self, name)))
+        self.profiler = profiler
+        if profiler:
+            profiler.install(self)
         
         self.show_login_screen()
     #creats the login screen
@@ -88,42 +130,280 @@ class CanvasChatbotGUI:
             messagebox.showerror("Error", "Please enter both URL and token")
             return
         
+        # Show the last saved session right away and refresh it in the background
+        snapshot = session_cache.load_snapshot(url, token)
+        if snapshot:
+            self.api = self._new_api(url, token)
+            self.api.user = snapshot['user']
+            self.user_name = snapshot['user'].get('name') or 'User'
+            self._apply_session_data(snapshot, snapshot['last_sync'])
+            self.syncing = True
+            self.show_main_screen()
+            threading.Thread(target=self._do_login, args=(url, token, self.api), daemon=True).start()
+            return
+
         self.status_label.config(text="Logging in...", fg="blue", font=('Arial', 22, 'italic'))
         self.root.update()
         
         threading.Thread(target=self._do_login, args=(url, token), daemon=True).start()
     
-    # Perform login in background and fetch data
-    def _do_login(self, url, token):
+    def _new_api(self, url, token):
+        span_hook = self.profiler.network_span if self.profiler else None
+        return CanvasAPI(url, token, span_hook=span_hook)
+
+    # Perform login in background and fetch data. When api is passed the
+    # dashboard is already showing snapshot data and this just revalidates it
+    def _do_login(self, url, token, api=None):
+        revalidating = api is not None
         try:
-            self.api = CanvasAPI(url, token)
-            user = self.api.get_current_user()
+            if not revalidating:
+                api = self._new_api(url, token)
+                self.api = api
+            user = api.get_current_user()
             
             if not user:
-                self.root.after(0, lambda: messagebox.showerror("Error", "Authentication failed"))
+                if revalidating:
+                    session_cache.delete_snapshot(url, token)
+                    self.root.after(0, lambda: self._revalidation_failed(api, "Authentication failed"))
+                else:
+                    self.root.after(0, lambda: messagebox.showerror("Error", "Authentication failed"))
                 return
-            
-            self.user_name = user.get('name', 'User')
-            all_courses = self.api.get_courses()
-            
-            # Filter out courses with None or empty names 
-            self.courses = [c for c in all_courses if c.get('name') and c.get('name').strip().lower() != 'none']
-            
-            # Load all assignments and grades
-            for course in self.courses:
-                course_id = course.get('id')
-                assignments = self.api.get_assignments(course_id)
-                if assignments:
-                    self.assignments_cache[course_id] = assignments
-            
-            # Initialize chatbot with loaded data
-            self.chatbot = CanvasChatBot(self.api, self.courses, self.assignments_cache)
-            
-            self.last_sync_time = datetime.now()
-            self.root.after(0, self.show_main_screen)
+
+            # Load courses, assignments, submissions and grades in one go
+            # (GraphQL when available, otherwise the per course REST calls)
+            data = api.load_login_data()
+            if data is None:
+                if revalidating:
+                    # keep showing the snapshot, it is still the best we have
+                    self.root.after(0, lambda: self._revalidation_failed(api, None))
+                else:
+                    self.root.after(0, lambda: messagebox.showerror("Error", "Could not load your courses"))
+                return
+
+            synced_at = datetime.now()
+            try:
+                session_cache.save_snapshot(url, token, user, data['courses'], data['assignments'],
+                                            api.grade_cache, api.submission_cache, synced_at)
+            except OSError as e:
+                # the next launch just loads from Canvas again
+                print(f"[Login] Could not save the session snapshot: {e}")
+            self.root.after(0, lambda: self._finish_login(api, user, data, synced_at, revalidating))
             
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", str(e)))
+            if revalidating:
+                self.root.after(0, lambda: self._revalidation_failed(api, None))
+            else:
+                self.root.after(0, lambda: messagebox.showerror("Error", str(e)))
+
+    # Runs on the Tk thread once fresh data has been downloaded
+    def _finish_login(self, api, user, data, synced_at, revalidating):
+        if self.api is not api:
+            return  # logged out (or in as someone else) while we were loading
+        self.user_name = user.get('name', 'User')
+        self._apply_session_data(data, synced_at)
+        self.syncing = False
+        self._start_sync_engine()
+        if not revalidating:
+            self.show_main_screen()
+        elif self.current_view == 'dashboard':
+            self.show_dashboard()
+
+    def _revalidation_failed(self, api, message):
+        if self.api is not api:
+            return
+        self.syncing = False
+        if message:
+            messagebox.showerror("Error", message)
+            self.logout()
+        elif self.current_view == 'dashboard':
+            self.show_dashboard()
+
+    # Polls Canvas for changes in the background. It holds on to the current
+    # courses/assignments_cache, so it is restarted whenever those are replaced
+    def _start_sync_engine(self):
+        self._stop_sync_engine()
+        self.sync_engine = SyncEngine(self.api, self.courses, self.assignments_cache,
+                                      interval=SYNC_INTERVAL_SECONDS,
+                                      dispatch=self._dispatch_sync)
+        if self.grade_history:
+            self.sync_engine.add_listener(self.grade_history.record_events)
+        self.sync_engine.add_listener(self._on_sync_changes)
+        self.sync_engine.start()
+
+    # runs a sync apply step on the Tk thread, but never while a chat answer is being worked
+    # out from the same data on the chat worker: the Tk thread retries on a later tick
+    # instead of blocking on the lock, the sync thread waits for the step either way
+    def _dispatch_sync(self, fn):
+        def run():
+            if not self.chat_lock.acquire(blocking=False):
+                self.root.after(20, run)
+                return
+            try:
+                fn()
+            finally:
+                self.chat_lock.release()
+        self.root.after(0, run)
+
+    # wraps a view that uses CanvasAPI: opening it stops the chat answer being worked out and
+    # runs the view once the worker has let go of chat_lock, retrying on later Tk ticks like
+    # _dispatch_sync. so the API's session and caches are only used by one thread at a time
+    def _after_chat(self, view):
+        def run(*args):
+            self._response_stream = None
+            if not self.chat_lock.acquire(blocking=False):
+                self.root.after(20, run, *args)
+                return
+            try:
+                view(*args)
+            finally:
+                self.chat_lock.release()
+        run.__name__ = view.__name__
+        return run
+
+    def _stop_sync_engine(self):
+        if self.sync_engine:
+            self.sync_engine.stop()
+            self.sync_engine = None
+
+    # Called on the Tk thread after every background poll
+    def _on_sync_changes(self, events):
+        self.last_sync_time = self.sync_engine.last_sync if self.sync_engine else datetime.now()
+        self._update_assignment_reminders(events)
+        if self.course_stats:
+            self.course_stats.apply_events(events)
+        changed = {e.course_id for e in events
+                   if e.kind in (NEW_COURSE, NEW_ASSIGNMENT, DUE_DATE_MOVED, ASSIGNMENT_REMOVED, ASSIGNMENT_UPDATED)}
+        if changed and self.chatbot:
+            self.chatbot.refresh_courses(changed)
+        if changed:
+            self._update_calendar()
+        if events and self.current_view == 'dashboard':
+            self.show_dashboard()
+
+    # Swaps in a full data set (from a snapshot or a fresh download)
+    def _apply_session_data(self, data, synced_at):
+        # Filter out courses with None or empty names
+        self.courses = [c for c in data['courses'] if c.get('name') and c.get('name').strip().lower() != 'none']
+
+        self.assignments_cache = {}
+        for course in self.courses:
+            course_id = course.get('id')
+            if data['assignments'].get(course_id):
+                self.assignments_cache[course_id] = data['assignments'][course_id]
+        self.api.grade_cache.update(data['grades'])
+        self.api.submission_cache.update(data['submissions'])
+        self._start_grade_history(data['grades'])
+
+        # Initialize chatbot with loaded data
+        self.chatbot = CanvasChatBot(self.api, self.courses, self.assignments_cache, history=self.grade_history,
+                                     tz=user_timezone(self.api.user))
+        self.course_stats = self.chatbot.stats
+        self.last_sync_time = synced_at
+        self._start_reminders()
+
+    # Opens this user's grade history and adds the grades we just loaded to it
+    def _start_grade_history(self, grades):
+        if not GRADE_HISTORY_AVAILABLE:
+            return
+        folder = grade_history.history_dir(self.api.base_url, (self.api.user or {}).get('id'))
+        if self.grade_history is None or self.grade_history.folder != folder:
+            if self.grade_history:
+                self.grade_history.close()
+            self.grade_history = grade_history.GradeHistory(folder)
+        self.grade_history.record_grades(grades)
+
+    # Opens this user's reminder database, starts the scheduler and creates the
+    # automatic due date reminders in the background
+    def _start_reminders(self):
+        user_id = (self.api.user or {}).get('id')
+        path = reminders.reminder_db_path(self.api.base_url, user_id)
+        if self.reminder_store is None or self.reminder_store.path != path:
+            self._stop_reminders()
+            self.reminder_store = reminders.ReminderStore(path)
+            self.reminder_scheduler = reminders.ReminderScheduler(self.reminder_store, self._on_reminder_due)
+            self.reminder_scheduler.start()
+
+        store, scheduler = self.reminder_store, self.reminder_scheduler
+        courses, cache = list(self.courses), dict(self.assignments_cache)
+
+        def sync():
+            for reminder_id, due_ts in reminders.sync_assignment_reminders(store, courses, cache):
+                scheduler.schedule(reminder_id, due_ts)
+        if self._reminder_sync:
+            self._reminder_sync.join()
+        self._reminder_sync = threading.Thread(target=sync, daemon=True)
+        self._reminder_sync.start()
+        self._update_calendar()
+
+    # Rewrites the .ics file calendar apps can subscribe to, in the background. Only the
+    # courses whose assignments changed since the last export are rendered again
+    def _update_calendar(self, done=None):
+        folder = calendar_feed.feed_dir(self.api.base_url, (self.api.user or {}).get('id'))
+        if self.calendar is None or self.calendar.folder != folder:
+            self.calendar = calendar_feed.CalendarFeed(self.api.base_url, folder)
+        feed, store = self.calendar, self.reminder_store
+        courses, cache = list(self.courses), dict(self.assignments_cache)
+
+        def export():
+            with self.calendar_lock:
+                # the store is closed under this lock at logout
+                feed.update(courses, cache, store.manual() if store and store is self.reminder_store else ())
+                path = feed.write(os.path.join(feed.folder, "due-dates.ics"))
+            if done:
+                self.root.after(0, lambda: done(path))
+        threading.Thread(target=export, daemon=True).start()
+
+    # Stops everything that uses the reminder store before closing it
+    def _stop_reminders(self):
+        if self.reminder_scheduler:
+            self.reminder_scheduler.stop()
+            self.reminder_scheduler = None
+        if self._reminder_sync:
+            self._reminder_sync.join()
+            self._reminder_sync = None
+        if self.reminder_store:
+            store, self.reminder_store = self.reminder_store, None
+            with self.calendar_lock:
+                store.close()
+
+    # Keeps the automatic reminders in step with what the sync engine saw
+    def _update_assignment_reminders(self, events):
+        if not self.reminder_store:
+            return
+        courses_by_id = {c.get('id'): c for c in self.courses}
+        for event in events:
+            if event.kind == ASSIGNMENT_REMOVED:
+                self.reminder_store.remove_source(
+                    reminders.assignment_source_key(event.course_id, event.item.get('id')))
+            elif event.kind in (NEW_ASSIGNMENT, DUE_DATE_MOVED):
+                item = reminders.assignment_reminder(courses_by_id.get(event.course_id, {}), event.item)
+                if item:
+                    for reminder_id, due_ts in self.reminder_store.upsert_sources([item]):
+                        self.reminder_scheduler.schedule(reminder_id, due_ts)
+
+    # Called from the scheduler thread when a reminder is due
+    def _on_reminder_due(self, reminder):
+        self.root.after(0, self._queue_reminder, reminder)
+
+    # Reminders that fire together (all the ones that came due while the app was closed,
+    # at login) are shown in one notice instead of one dialog each
+    def _queue_reminder(self, reminder):
+        self._due_reminders.append(reminder)
+        if self._reminder_notice is None:
+            self._reminder_notice = self.root.after(500, self._show_due_reminders)
+
+    def _show_due_reminders(self):
+        due, self._due_reminders = self._due_reminders, []
+        if len(due) == 1:
+            message = due[0]['title'] + (f"\n\n{due[0]['note']}" if due[0]['note'] else "")
+        else:
+            lines = [f"- {r['title']}" + (f" ({r['note']})" if r['note'] else "") for r in due[:10]]
+            if len(due) > 10:
+                lines.append(f"...and {len(due) - 10} more")
+            message = f"{len(due)} reminders:\n\n" + "\n".join(lines)
+        messagebox.showinfo("Reminders" if len(due) > 1 else "Reminder", message)
+        # the ones that fired while the notice was open come in the next one
+        self._reminder_notice = self.root.after(0, self._show_due_reminders) if self._due_reminders else None
     
     #creates a tutorial popup for new users        
     def tutorial_popup(self):
@@ -261,12 +541,14 @@ class CanvasChatbotGUI:
 
     #clears the main content area after a button is clicked
     def clear_content(self):
+        self.current_view = None
         for widget in self.content_frame.winfo_children():
             widget.destroy()
     
     #creates the dashboard view for the main screen
     def show_dashboard(self):
         self.clear_content()
+        self.current_view = 'dashboard'
         
         tk.Label(self.content_frame, text=f"Welcome back, {self.user_name}", 
                 font=('Arial', 18, 'bold'), bg=self.main_bg, fg='#2C1810').pack(pady=(0, 20))
@@ -274,16 +556,22 @@ class CanvasChatbotGUI:
         # Upcoming Assignments
         self.create_section("Upcoming Assignment", self.get_upcoming_assignments())
         
+        # Due this week and past-due work per course
+        self.create_section("This Week", views.week_lines(self.course_stats))
+        
         # Grades
         self.create_section("Grades", self.get_grades_display())
         
         # Reminders
-        self.create_section("Active Reminders", ["Lab Report Due tomorrow"])
+        self.create_section("Active Reminders", self.get_active_reminders())
         
         # Last sync
         if self.last_sync_time:
             mins = int((datetime.now() - self.last_sync_time).total_seconds() / 60)
-            tk.Label(self.content_frame, text=f"Last synced to canvas, {mins} minutes ago",
+            sync_text = f"Last synced to canvas, {mins} minutes ago"
+            if self.syncing:
+                sync_text += " (refreshing...)"
+            tk.Label(self.content_frame, text=sync_text,
                     font=('Arial', 10), bg=self.main_bg, fg='#6B6B6B').pack(pady=(20, 0))
         
         # Update scroll region
@@ -301,63 +589,22 @@ class CanvasChatbotGUI:
             tk.Label(self.content_frame, text=item, 
                     font=('Arial', 12), bg=self.main_bg, fg='#2C1810').pack(anchor='w', pady=3)
     
-    #computes the upcoming assignment for the dashboard that are due in 10 days or less 
+    #the next three assignments due for the dashboard, merged from the per-course summary table
     def get_upcoming_assignments(self):
-        upcoming = []
-        now = datetime.now(timezone.utc)
-        ten_days_from_now = now + timedelta(days=10)
-
-        for course in self.courses:
-            course_name = course.get('name', '')
-            course_id = course.get('id')
-
-            for assignment in self.assignments_cache.get(course_id, []):
-                due_at = assignment.get('due_at')
-                if not due_at:
-                    continue
-
-                try:
-                    due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                except Exception:
-                    continue
-
-                if due_date > now:
-                    delta = due_date - now
-                    days = delta.days
-                    hours = delta.seconds // 3600
-                    course_code = course_name[:20].strip()
-                    if days == 0:
-                        time_str = f"Due in {hours} hours"
-                    else:
-                        time_str = f"Due in {days} days"
-
-                    upcoming.append((due_date, f"{course_code} - {assignment.get('name', 'Untitled')} ({time_str})"))
-
-        upcoming.sort(key=lambda x: x[0])
-
+        return views.upcoming_lines(self.course_stats)
+    
+    #the next few reminders for the dashboard, straight from the due time index
+    def get_active_reminders(self):
+        if not self.reminder_store:
+            return ["No reminders yet"]
+        upcoming = self.reminder_store.upcoming(limit=3)
         if not upcoming:
-            return ["No upcoming assignments"]
+            return ["No reminders yet"]
+        return [f"{r['title']} ({r['when'].astimezone().strftime('%b %d, %I:%M %p')})" for r in upcoming]
 
-        return [entry[1] for entry in upcoming[:3]]
-    
     #gets the grades for display on the dashboard when clicked on the grades button
     def get_grades_display(self):
-        grades_display = []
-        for course in self.courses:  # Show all courses
-            course_id = course.get('id')
-            course_name = course.get('name', 'Unknown Course')
-            
-            # Get grade
-            grade_info = self.api.get_course_grade(course_id)
-            
-            if grade_info and grade_info.get('current_score') is not None:
-                score = grade_info.get('current_score')
-                letter = grade_info.get('current_grade', '')
-                grades_display.append(f"{course_name} - {score:.1f}% {letter}")
-            else:
-                grades_display.append(f"{course_name} - No grade yet")
-        
-        return grades_display if grades_display else ["No grades available"]
+        return views.grade_lines(self.course_stats)
     
     from datetime import datetime, timezone
 
@@ -384,80 +631,68 @@ class CanvasChatbotGUI:
         now = datetime.now(timezone.utc)
         found_any = False
 
-        for course in self.courses:
-            course_id = course.get('id')
-            course_name = course.get('name', 'Unnamed Course')
-            
-            # Get submissions to check what's been submitted
-            submissions = self.api.get_assignment_submissions(course_id)
-            submitted_ids = set()
-
-            if submissions:
-                for sub in submissions:
-                    # If submitted (has a submitted_at date or state is "submitted")
-                    if sub.get('submitted_at') or sub.get('workflow_state') == 'submitted':
-                        submitted_ids.add(sub.get('assignment_id'))
-            
-            # Filter upcoming or undated assignments
-            upcoming_assignments = []
-            for assignment in self.assignments_cache.get(course_id, []):
-                assignment_id = assignment.get('id')
-                due_at = assignment.get('due_at')
+        # Past-due work never turned in (one request chain for every course) and open work from the caches
+        missing, upcoming = views.assignment_lists(self.api, self.assignments_cache, self.course_stats, now)
+        if missing:
+            found_any = True
+            course_names = {c.get('id'): c.get('name') for c in self.courses}
+            tk.Label(
+                self.content_frame, 
+                text=f"\n>> Missing ({len(missing)})", 
+                font=('Arial', 14, 'bold'), 
+                bg=self.main_bg, 
+                fg='#A00000'
+            ).pack(anchor='w')
+            for assignment in missing:
+                course_name = (assignment.get('course') or {}).get('name') or course_names.get(assignment.get('course_id'), '')
+                due_text = ""
+                if assignment.get('due_at'):
+                    try:
+                        due_date = datetime.fromisoformat(assignment['due_at'].replace('Z', '+00:00'))
+                        due_text = f" (Overdue by {(now - due_date).days} days)"
+                    except Exception:
+                        due_text = " (Invalid date)"
+                tk.Label(
+                    self.content_frame, 
+                    text=f"  - {assignment.get('name', 'Untitled')} - {course_name}{due_text}", 
+                    font=('Arial', 11), 
+                    bg=self.main_bg, 
+                    fg='#A00000'
+                ).pack(anchor='w', pady=2)
 
-                # Skip if submitted
-                if assignment_id in submitted_ids:
-                    continue
+        # Upcoming work comes from the caches, no request per course
+        for course_name, upcoming_assignments in upcoming:
+            found_any = True
+            tk.Label(
+                self.content_frame, 
+                text=f"\n>> {course_name}", 
+                font=('Arial', 14, 'bold'), 
+                bg=self.main_bg, 
+                fg='#2C1810'
+            ).pack(anchor='w')
 
-                # Include if no due date or due date is in the future
-                if not due_at:
-                    upcoming_assignments.append(assignment)
-                else:
+            for assignment in upcoming_assignments:
+                due_at = assignment.get('due_at')
+                if due_at:
                     try:
                         due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                        if due_date > now:
-                            upcoming_assignments.append(assignment)
+                        days_until = (due_date - now).days
+                        if days_until >= 0:
+                            due_text = f" (Due in {days_until} days)"
+                        else:
+                            due_text = f" (Overdue by {-days_until} days)"
                     except Exception:
-                        # If date parsing fails, still include (to avoid missing valid assignments)
-                        upcoming_assignments.append(assignment)
-            
-            # Display course and its assignments if any
-            if upcoming_assignments:
-                found_any = True
+                        due_text = " (Invalid date)"
+                else:
+                    due_text = " (No due date)"
+                    
                 tk.Label(
                     self.content_frame, 
-                    text=f"\n>> {course_name}", 
-                    font=('Arial', 14, 'bold'), 
+                    text=f"  - {assignment.get('name', 'Untitled')}{due_text}", 
+                    font=('Arial', 11), 
                     bg=self.main_bg, 
                     fg='#2C1810'
-                ).pack(anchor='w')
-                
-                # Sort assignments by due date for readability
-                upcoming_assignments.sort(
-                    key=lambda a: a.get('due_at') or '9999-12-31'
-                )
-
-                for assignment in upcoming_assignments:
-                    due_at = assignment.get('due_at')
-                    if due_at:
-                        try:
-                            due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                            days_until = (due_date - now).days
-                            if days_until >= 0:
-                                due_text = f" (Due in {days_until} days)"
-                            else:
-                                due_text = f" (Overdue by {-days_until} days)"
-                        except Exception:
-                            due_text = " (Invalid date)"
-                    else:
-                        due_text = " (No due date)"
-                    
-                    tk.Label(
-                        self.content_frame, 
-                        text=f"  - {assignment.get('name', 'Untitled')}{due_text}", 
-                        font=('Arial', 11), 
-                        bg=self.main_bg, 
-                        fg='#2C1810'
-                    ).pack(anchor='w', pady=2)
+                ).pack(anchor='w', pady=2)
         
         if not found_any:
             tk.Label(
@@ -481,18 +716,21 @@ class CanvasChatbotGUI:
         tk.Label(self.content_frame, text="-" * 40, 
                 font=('Arial', 12), bg=self.main_bg, fg='#6B6B6B').pack(anchor='w', pady=(0, 10))
         
-        # Fetch and display grades for each course
-        for course in self.courses:
+        # Fetch and display the overall grade for each course
+        for course, grade_info in views.course_grades(self.api, self.courses):
             course_id = course.get('id')
             course_name = course.get('name', 'Unknown Course')
             
-            # Get the overall grade for this course
-            grade_info = self.api.get_course_grade(course_id)
-            
             if grade_info and grade_info.get('current_score') is not None:
                 score = grade_info.get('current_score')
                 letter = grade_info.get('current_grade', '')
                 grade_text = f"{course_name} - {score:.1f}% {letter}"
+                if self.grade_history:
+                    # the last 30 days of this course's grade as a small trend line. grades are
+                    # recorded at login and from the sync engine's grade events, never from a view
+                    _, scores = self.grade_history.series(course_id, since=time.time() - 30 * 86400)
+                    if len(scores) > 1:
+                        grade_text += f"   {grade_history.sparkline(scores)}"
             else:
                 grade_text = f"{course_name} - No grade available"
             
@@ -521,46 +759,26 @@ class CanvasChatbotGUI:
         
         self.root.update()  # Update UI to show loading message
 
-        assignments = self.assignments_cache.get(course_id, [])
+        # One request chain: Canvas returns every assignment with the student's submission embedded
+        assignments = views.grade_details(self.api, self.assignments_cache, course_id)
+
+        # Clear the loading message
+        for widget in self.content_frame.winfo_children():
+            if "Loading" in str(widget.cget('text')):
+                widget.destroy()
+
         if not assignments:
             tk.Label(self.content_frame, text="No assignments found.",
                     font=('Arial', 12), bg=self.main_bg, fg='#2C1810').pack(anchor='w', pady=10)
         else:
-            # Try bulk fetch first
-            submissions = self.api.get_assignment_submissions(course_id)
-            
-            # Create a mapping of assignment_id -> submission data
-            submission_map = {}
-            
-            if submissions:
-                for sub in submissions:
-                    assignment_id = sub.get('assignment_id')
-                    if assignment_id:
-                        submission_map[assignment_id] = sub
-            
-            # Clear the loading message
-            for widget in self.content_frame.winfo_children():
-                if "Loading" in str(widget.cget('text')):
-                    widget.destroy()
-            
             now = datetime.now(timezone.utc)
 
-            # Sort by due date if available
-            assignments.sort(key=lambda a: a.get('due_at') or '9999-12-31T00:00:00Z')
-
             for a in assignments:
                 name = a.get("name", "Untitled Assignment")
                 due = a.get("due_at")
-                assignment_id = a.get("id")
                 possible = a.get("points_possible")
                 
-                # Get submission - try map first, then fetch individually if not found
-                submission = submission_map.get(assignment_id)
-                if not submission:
-                    # Fallback: fetch individual submission
-                    submission = self.api.get_single_assignment_submission(course_id, assignment_id)
-                    if not submission:
-                        submission = {}
+                submission = a.get('submission') or {}
                 
                 score = submission.get("score")
                 submitted = submission.get("submitted_at") is not None or submission.get("workflow_state") == "submitted"
@@ -622,10 +840,6 @@ class CanvasChatbotGUI:
 
         self.clear_content()
 
-        # In-memory list for this session only
-        if not hasattr(self, "_reminders_tmp"):
-            self._reminders_tmp = []
-
         # Title
         tk.Label(self.content_frame, text="Reminders",
         font=('Arial', 20, 'bold'), bg=self.main_bg, fg='#2C1810').pack(pady=(0, 20))
@@ -642,7 +856,8 @@ class CanvasChatbotGUI:
             # wipe previous contents
             for w in list_frame.winfo_children():
                 w.destroy()
-            items = sorted(self._reminders_tmp, key=lambda r: r.get("when", ""))
+            # already sorted by due time by the store's index
+            items = self.reminder_store.upcoming(limit=50) if self.reminder_store else []
             if not items:
                 tk.Label(list_frame, text="No reminders yet.", bg=self.main_bg).pack(anchor='w')
                 return
@@ -650,31 +865,61 @@ class CanvasChatbotGUI:
                 row = tk.Frame(list_frame, bg=self.main_bg, highlightbackground='#DDD', highlightthickness=1, padx=8, pady=6)
                 row.pack(fill='x', pady=6)
                 tk.Label(row, text=r.get("title", "(untitled)"), bg=self.main_bg, font=('Arial', 12, 'bold')).pack(anchor='w')
-                tk.Label(row, text=f"When: {r.get('when','')}", bg=self.main_bg).pack(anchor='w')
+                when_text = r['when'].astimezone().strftime('%Y-%m-%d %H:%M')
+                tk.Label(row, text=f"When: {when_text}", bg=self.main_bg).pack(anchor='w')
                 if r.get("note"):
                     tk.Label(row, text=r["note"], bg=self.main_bg, fg="#3C3C3C").pack(anchor='w')
+                tk.Button(row, text="Delete", relief='flat', bg=self.button_color,
+                          command=lambda rid=r['id']: on_delete(rid)).pack(anchor='e')
 
         def on_add():
+            if not self.reminder_store:
+                messagebox.showerror("Reminders", "Please log in first.")
+                return
             title = simpledialog.askstring("Add Reminder", "Title:", parent=self.root)
             if not title:
                 return
             when = simpledialog.askstring("Add Reminder", "When (YYYY-MM-DDTHH:MM):", parent=self.root)
             if not when:
                 return
+            try:
+                when_dt = datetime.fromisoformat(when.strip())
+            except ValueError:
+                messagebox.showerror("Reminders", "Please use the format YYYY-MM-DDTHH:MM")
+                return
             note = simpledialog.askstring("Add Reminder", "Note (optional):", parent=self.root) or ""
-            self._reminders_tmp.append({"title": title.strip(), "when": when.strip(), "note": note.strip()})
+            reminder_id = self.reminder_store.add(title.strip(), when_dt, note.strip())
+            self.reminder_scheduler.schedule(reminder_id, self.reminder_store.get(reminder_id)['when'].timestamp())
+            self._update_calendar()
             messagebox.showinfo("Reminders", "Saved.")
             render_list()  # show the new item
 
+        def on_delete(reminder_id):
+            self.reminder_store.remove(reminder_id)
+            self._update_calendar()
+            render_list()
+
         def on_view():
             render_list()
 
+        def on_export():
+            if not self.api:
+                messagebox.showerror("Reminders", "Please log in first.")
+                return
+            self._update_calendar(done=lambda path: messagebox.showinfo(
+                "Calendar", f"Due dates and reminders were saved to:\n{path}\n\n"
+                            "Import or subscribe to this file in your calendar app. "
+                            "It is kept up to date while the app runs."))
+
         tk.Button(btns, text="Add Reminder", command=on_add,
             bg=self.sidebar_color, relief='flat', padx=20, pady=10).grid(row=0, column=0, padx=10, pady=10)
 
         tk.Button(btns, text="View Reminders", command=on_view,
         bg=self.sidebar_color, relief='flat', padx=20, pady=10).grid(row=0, column=1, padx=10, pady=10)
 
+        tk.Button(btns, text="Export Calendar", command=on_export,
+        bg=self.sidebar_color, relief='flat', padx=20, pady=10).grid(row=0, column=2, padx=10, pady=10)
+
         # Back
         tk.Button(self.content_frame, text="<- Back", command=self.show_dashboard,
         bg=self.sidebar_color, relief='flat', padx=10, pady=6).pack(anchor='w', padx=10, pady=(20, 0))
@@ -697,6 +942,12 @@ class CanvasChatbotGUI:
     
     #handles the logout process
     def logout(self):
+        self._stop_sync_engine()
+        self._stop_reminders()
+        self.calendar = None
+        if self.grade_history:
+            self.grade_history.close()
+            self.grade_history = None
         self.api = None
         self.show_login_screen()
     
@@ -713,12 +964,14 @@ class CanvasChatbotGUI:
         
         # Use chatbot to process query
         if self.chatbot:
-            response = self.chatbot.process_query(query)
+            # one conversation per window, so follow-ups like "what about Biology?" work
+            response = self.chatbot.stream_query(query, session_id="gui")
         else:
             response = "Chatbot not initialized. Please try logging in again."
         
         self.show_results(query, response)
     
+    #response is the answer text or an iterator of its fragments (CanvasChatBot.stream_query)
     def show_results(self, query, response):
         self.clear_content()
         
@@ -742,9 +995,10 @@ class CanvasChatbotGUI:
         
         tk.Label(response_frame, text="Assistant:", 
                 font=('Arial', 10, 'bold'), bg='#F8F8FF', fg=self.sidebar_color).pack(anchor='w', padx=10, pady=(5, 0))
-        tk.Label(response_frame, text=response, 
+        response_label = tk.Label(response_frame, text="...",
                 font=('Arial', 12), bg='#F8F8FF', fg='#2C1810', 
-                wraplength=700, justify='left').pack(anchor='w', padx=10, pady=(5, 10))
+                wraplength=700, justify='left')
+        response_label.pack(anchor='w', padx=10, pady=(5, 10))
         
         # Buttons
         button_frame = tk.Frame(self.content_frame, bg=self.main_bg)
@@ -760,6 +1014,34 @@ class CanvasChatbotGUI:
         
         # Update scroll region
         self.update_scroll_region()
+        self._stream_response(response_label, iter([response]) if isinstance(response, str) else response)
+
+    # Works the answer out on a worker thread, so waiting on Canvas (missing work, what-if
+    # assignment groups, calendar events) never freezes the window, and appends each fragment
+    # to label on the Tk thread as soon as it exists. sync changes to the data the chatbot
+    # reads, and the views that call the API themselves, wait until the answer is done
+    # (chat_lock). a newer question, or opening one of those views, stops the old answer
+    def _stream_response(self, label, fragments):
+        self._response_stream = fragments
+        shown = []
+
+        def show(fragment):
+            if self._response_stream is not fragments or not label.winfo_exists():
+                return
+            shown.append(fragment)
+            label.config(text="".join(shown))
+            self.update_scroll_region()
+
+        def work():
+            with self.chat_lock:
+                try:
+                    for fragment in fragments:
+                        if self._response_stream is not fragments:
+                            return
+                        self.root.after(0, show, fragment)
+                except Exception as e:
+                    self.root.after(0, show, f"Sorry, something went wrong: {e}")
+        threading.Thread(target=work, daemon=True).start()
     
     def focus_search(self):
         self.show_dashboard()
@@ -769,9 +1051,24 @@ class CanvasChatbotGUI:
 
 # the entry point for the application
 def main():
+    # --profile [path] (or CANVAS_PROFILE) writes a UI trace for this session
+    parser = argparse.ArgumentParser(description="Canvas chatbot")
+    parser.add_argument("--profile", nargs="?", const="", metavar="PATH",
+                        help="write a Chrome trace of the UI (default location when PATH is left out)")
+    args = parser.parse_args()
+    trace_path = ui_profiler.trace_path_from_env()
+    if args.profile is not None:
+        trace_path = args.profile or ui_profiler.default_trace_path()
+    profiler = ui_profiler.UIProfiler(trace_path) if trace_path else None
+
     root = tk.Tk()
-    app = CanvasChatbotGUI(root)
-    root.mainloop()
+    app = CanvasChatbotGUI(root, profiler)
+    try:
+        root.mainloop()
+    finally:
+        if profiler:
+            profiler.close()
+            print(f"[Profiler] {profiler.views} views traced, trace written to {profiler.path}")
 
 # the main function is called when the script is executed
 if __name__ == "__main__":
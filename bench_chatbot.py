@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# bench_chatbot.py - microbenchmarks for CanvasChatBot's in-memory query paths, no network involved
+# run:     python bench_chatbot.py --out chatbot.json
+# compare: python bench_chatbot.py --compare chatbot.json
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from bench_common import compare, git_commit
+from chatbot import CanvasChatBot, INTENT_CLASSIFIER_AVAILABLE
+from synthetic import (StaticGrades, assignment_groups, calendar_events, fill_history, generate, intent_eval_set,
+                       query_corpus)
+
+SCALING_COURSES = (4, 8, 16, 32)
+SCALING_ASSIGNMENTS = (25, 100, 400)
+
+
+#pytest-benchmark style: grows the loop until one round takes min_round seconds,
+#then times `rounds` rounds and reports per-call statistics in microseconds
+def measure(func, rounds=7, min_round=0.02):
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_round / elapsed) + 1))
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - started) / loops * 1e6)
+    return {"min_us": round(min(samples), 2), "median_us": round(statistics.median(samples), 2),
+            "stddev_us": round(statistics.stdev(samples), 2) if len(samples) > 1 else 0.0,
+            "queries_per_second": round(1e6 / statistics.median(samples), 1), "loops": loops}
+
+
+#memory one call allocates: peak bytes above the starting point and blocks still held after
+def allocations(func):
+    func()  # first call may fill caches, don't count those
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    blocks = sys.getallocatedblocks()
+    func()
+    after, peak = tracemalloc.get_traced_memory()
+    retained_blocks = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+    return {"alloc_peak_bytes": peak - before, "retained_bytes": max(0, after - before),
+            "retained_blocks": max(0, retained_blocks)}
+
+
+def make_bot(n_courses, n_assignments, seed=0):
+    courses, assignments_cache, grades = generate(n_courses, n_assignments, seed)
+    groups = assignment_groups(courses, assignments_cache, seed)
+    return CanvasChatBot(StaticGrades(grades, groups, calendar_events(courses)), courses, assignments_cache)
+
+
+#every query of the corpus through process_query, grouped by intent
+def bench_queries(bot, rounds):
+    results = {}
+    for intent, case, query in query_corpus(bot.courses):
+        q = query.lower()
+        detected = bot._classify_intent(q)
+        row = measure(lambda: bot.process_query(query), rounds)
+        row.update(allocations(lambda: bot.process_query(query)))
+        row["detected_intent"] = detected
+        results.setdefault(intent, {})[case] = row
+    return results
+
+
+#the internal steps of an assignment query on their own
+def bench_stages(bot, rounds):
+    now = datetime.now(timezone.utc)
+    query = f"what homework is due this week for {bot.courses[0]['name'].split()[0].lower()}?"
+    timeframe, start, end = bot._extract_timeframe(query, now)
+    course = bot._extract_course_name(query)
+    # the formatter is measured on the no-course list, which is the longest response
+    everything = bot._collect_assignments(None, now, end + (end - start) * 2, now)
+    stages = {
+        "_detect_intent": lambda: bot._detect_intent(query),
+        "_extract_timeframe": lambda: bot._extract_timeframe(query, now),
+        "_extract_course_name": lambda: bot._extract_course_name(query),
+        "_collect_assignments": lambda: bot._collect_assignments(course, start, end, now),
+        "_format_assignment_response": lambda: "".join(bot._format_assignment_response(everything, timeframe,
+                                                                                          None)),
+        # what the chat view waits for before it shows anything, next to the whole answer
+        "stream_first_fragment": lambda: next(bot.stream_query("how are my grades?")),
+        "stream_whole_answer": lambda: bot.process_query("how are my grades?"),
+    }
+    results = {}
+    for name, func in stages.items():
+        results[name] = measure(func, rounds)
+        results[name].update(allocations(func))
+    return results
+
+
+#follow-up questions in a session (answered from the previous result set) next to
+#the same question asked in full without one
+def bench_followups(bot, rounds):
+    subject = bot.courses[-1]['name'].split()[0].lower()
+    pairs = {"course": ("what's due this week?", f"what about {subject}?",
+                        f"what's due this week for {subject}?"),
+             "narrower": ("what's due this week?", "only the ones due tomorrow", "what's due tomorrow?"),
+             "grades_course": ("how are my grades?", f"what about {subject}?", f"what's my grade in {subject}?")}
+    results = {}
+    for name, (first, follow_up, full) in pairs.items():
+        bot.process_query(first, session_id=name)
+        row = {"follow_up": measure(lambda: bot.process_query(follow_up, session_id=name), rounds)["median_us"],
+               "full_query": measure(lambda: bot.process_query(full), rounds)["median_us"]}
+        results[name] = {f"{k}_us": v for k, v in row.items()}
+    return results
+
+
+#grade history after a synthetic year: bytes on disk, the dedup check every sync does,
+#and the trend queries, on their own and through the chatbot
+def bench_history(bot, rounds):
+    try:
+        from grade_history import GradeHistory, sparkline
+    except ImportError:
+        return {}
+    with tempfile.TemporaryDirectory() as folder:
+        history = GradeHistory(folder)
+        rows = fill_history(history, bot.courses)
+        course_id = bot.courses[0]['id']
+        subject = bot.courses[0]['name'].split()[0].lower()
+        last = history.change(course_id)[1]
+        month = time.time() - 30 * 86400
+        bot.history = history
+        stages = {
+            "record_unchanged": lambda: history.record(course_id, 0, last),
+            "series_month": lambda: history.series(course_id, since=month),
+            "biggest_drop_month": lambda: history.biggest_drop(month),
+            "biggest_drop_year": lambda: history.biggest_drop(),
+            "sparkline_year": lambda: sparkline(history.series(course_id)[1]),
+            "query_course_month": lambda: bot.process_query(f"how has my grade in {subject} changed this month?"),
+            "query_biggest_drop": lambda: bot.process_query("what was my biggest drop this semester?"),
+        }
+        results = {"rows": rows, "bytes": history.size_bytes()}
+        for name, func in stages.items():
+            results[name] = measure(func, rounds)
+        bot.history = None
+        history.close()
+    return results
+
+
+#the .ics feed: rendering every course, an update after one course changed, an update
+#with nothing changed (what a polling calendar app costs) and streaming the file out
+def bench_calendar(bot, rounds):
+    from calendar_feed import CalendarFeed
+    courses, cache = bot.courses, bot.assignments_cache
+    changed = dict(cache)
+    course_id = courses[0]['id']
+    changed[course_id] = [dict(a, updated_at="2030-01-01T00:00:00Z") for a in cache[course_id]]
+    with tempfile.TemporaryDirectory() as folder:
+        feed = CalendarFeed("https://canvas.example.edu", folder)
+        state = {"cache": cache}
+
+        def full():
+            feed.fingerprints.clear()
+            feed.update(courses, cache)
+
+        def one_course():
+            state["cache"] = changed if state["cache"] is cache else cache
+            feed.update(courses, state["cache"])
+
+        stages = {"render_all": full, "update_one_course": one_course,
+                  "update_unchanged": lambda: feed.update(courses, cache),
+                  "stream_file": lambda: sum(len(c) for c in feed.chunks())}
+        results = {name: measure(func, rounds) for name, func in stages.items()}
+        results["bytes"] = sum(len(c) for c in feed.chunks())
+        results["memory_feed"] = measure(lambda: CalendarFeed("https://canvas.example.edu").update(courses, cache),
+                                         rounds)
+    return results
+
+
+#the per-course summary table: building it, the dashboard's next three due items from it
+#against the scan over every assignment it replaced, the per-course due summary, applying
+#one moved due date, and the comparative grade questions answered from it
+def bench_course_stats(bot, rounds):
+    from sync_engine import ChangeEvent, DUE_DATE_MOVED
+    stats, courses, cache = bot.stats, bot.courses, bot.assignments_cache
+    now = datetime.now(timezone.utc)
+
+    def scan_upcoming():
+        upcoming = []
+        for course in courses:
+            for assignment in cache.get(course['id'], []):
+                if assignment.get('due_at'):
+                    due = datetime.fromisoformat(assignment['due_at'].replace('Z', '+00:00'))
+                    if due > now:
+                        upcoming.append((due, assignment.get('name')))
+        return sorted(upcoming, key=lambda x: x[0])[:3]
+
+    def rebuild():
+        stats.invalidate()
+        stats.rows()
+
+    course_id = courses[0]['id']
+    original = cache[course_id][0]
+    moved = [dict(original, due_at="2031-01-01T00:00:00Z"), original]
+
+    def move_one():
+        moved.reverse()
+        stats.apply_events([ChangeEvent(DUE_DATE_MOVED, course_id, moved[0], None, moved[0]['due_at'])])
+
+    stages = {"build": rebuild,
+              "upcoming_scan": scan_upcoming,
+              "upcoming_table": lambda: stats.upcoming(3, now.timestamp()),
+              "due_summary": lambda: stats.due_summary(now.timestamp()),
+              "apply_due_moved": move_one,
+              "lowest_grade_query": lambda: bot.process_query("what is my lowest grade?"),
+              "passing_query": lambda: bot.process_query("am I passing all my classes?")}
+    results = {name: measure(func, rounds) for name, func in stages.items()}
+    stats.invalidate()
+    return results
+
+
+#intent detection on held-out phrasings: accuracy of the keyword rules, the classifier
+#alone and the two combined (what process_query uses), plus classifier throughput one
+#query at a time and in batches of batch_size
+def bench_intents(bot, rounds, batch_size=1000):
+    labeled = intent_eval_set(bot.courses)
+    queries = [q.lower() for _, q in labeled]
+
+    def accuracy(detect):
+        return round(sum(1 for (intent, _), q in zip(labeled, queries) if detect(q) == intent) / len(labeled), 3)
+
+    results = {"examples": len(labeled), "rules_accuracy": accuracy(bot._detect_intent)}
+    if not INTENT_CLASSIFIER_AVAILABLE:
+        return results
+    from intent_classifier import cross_validate, training_examples
+    classifier = bot.classifier
+    results["classifier_accuracy"] = accuracy(lambda q: classifier.classify(q)[0])
+    results["combined_accuracy"] = accuracy(bot._classify_intent)
+    results["cv_accuracy"] = round(cross_validate(training_examples()), 3)
+    results["single"] = measure(lambda: classifier.classify(queries[0]), rounds)
+    batch = (queries * (batch_size // len(queries) + 1))[:batch_size]
+    row = measure(lambda: classifier.classify_batch(batch), rounds)
+    results["batch"] = {"size": batch_size, "median_us": row["median_us"],
+                        "queries_per_second": round(row["queries_per_second"] * batch_size, 1)}
+    return results
+
+
+#process_query latency as the number of courses (n) and assignments per course (m) grow,
+#plus the log-log slope against n*m (1.0 = linear in the amount of data)
+def bench_scaling(rounds, courses=SCALING_COURSES, assignments=SCALING_ASSIGNMENTS):
+    queries = {"assignments": "what assignments are due this week?",
+               "assignments+course": None,
+               "grades": "how are my grades?",
+               "whatif": None}
+    results = {}
+    for name in queries:
+        points = []
+        for n in courses:
+            for m in assignments:
+                bot = make_bot(n, m)
+                subject = bot.courses[-1]['name'].split()[0].lower()
+                query = queries[name] or (f"what do I need to get a B in {subject}?" if name == "whatif"
+                                          else f"what is due this week for {subject}?")
+                stats = measure(lambda: bot.process_query(query), rounds=max(3, rounds // 2), min_round=0.01)
+                points.append({"courses": n, "assignments": m, "median_us": stats["median_us"]})
+        xs = [math.log(p["courses"] * p["assignments"]) for p in points]
+        ys = [math.log(p["median_us"]) for p in points]
+        mean_x, mean_y = statistics.mean(xs), statistics.mean(ys)
+        slope = (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+                 / sum((x - mean_x) ** 2 for x in xs))
+        results[name] = {"points": points, "loglog_slope": round(slope, 3)}
+    return results
+
+
+def run(config):
+    bot = make_bot(config["courses"], config["assignments"], config["seed"])
+    results = {"queries": bench_queries(bot, config["rounds"]),
+               "stages": bench_stages(bot, config["rounds"]),
+               "intents": bench_intents(bot, config["rounds"]),
+               "followups": bench_followups(bot, config["rounds"]),
+               "history": bench_history(bot, config["rounds"]),
+               "calendar": bench_calendar(bot, config["rounds"]),
+               "course_stats": bench_course_stats(bot, config["rounds"])}
+    if config["scaling"]:
+        results["scaling"] = bench_scaling(config["rounds"])
+    return {"meta": {"commit": git_commit(), "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                     "python": platform.python_version(), "platform": platform.platform()},
+            "config": config, "results": results}
+
+
+def print_report(result):
+    print(f"{'intent / case':36} {'median us':>10} {'q/s':>10} {'peak B':>8} {'detected':>12}", file=sys.stderr)
+    for intent, cases in result["results"]["queries"].items():
+        for case, row in cases.items():
+            print(f"{intent + ' / ' + case:36} {row['median_us']:>10} {row['queries_per_second']:>10} "
+                  f"{row['alloc_peak_bytes']:>8} {row['detected_intent']:>12}", file=sys.stderr)
+    print(file=sys.stderr)
+    for name, row in result["results"]["stages"].items():
+        print(f"{name:36} {row['median_us']:>10} {row['queries_per_second']:>10} {row['alloc_peak_bytes']:>8}",
+              file=sys.stderr)
+    intents = result["results"]["intents"]
+    print(f"\nintent accuracy on {intents['examples']} held-out queries: rules {intents['rules_accuracy']}, "
+          f"classifier {intents.get('classifier_accuracy')}, combined {intents.get('combined_accuracy')} "
+          f"(training cv {intents.get('cv_accuracy')})", file=sys.stderr)
+    if "batch" in intents:
+        print(f"classifier: {intents['single']['queries_per_second']} q/s one at a time, "
+              f"{intents['batch']['queries_per_second']} q/s in batches of {intents['batch']['size']}", file=sys.stderr)
+    for name, row in result["results"]["followups"].items():
+        print(f"follow-up {name:27} {row['follow_up_us']:>10} us, asked in full {row['full_query_us']} us",
+              file=sys.stderr)
+    history = result["results"]["history"]
+    if history:
+        print(f"\ngrade history: {history['rows']} rows in {history['bytes']} bytes after a year", file=sys.stderr)
+        for name, row in history.items():
+            if isinstance(row, dict):
+                print(f"  {name:34} {row['median_us']:>10} us", file=sys.stderr)
+    calendar = result["results"]["calendar"]
+    print(f"\ncalendar feed: {calendar['bytes']} bytes", file=sys.stderr)
+    for name, row in calendar.items():
+        if isinstance(row, dict):
+            print(f"  {name:34} {row['median_us']:>10} us", file=sys.stderr)
+    print("\ncourse summary table:", file=sys.stderr)
+    for name, row in result["results"]["course_stats"].items():
+        print(f"  {name:34} {row['median_us']:>10} us", file=sys.stderr)
+    for name, curve in result["results"].get("scaling", {}).items():
+        print(f"\nscaling {name} (slope {curve['loglog_slope']} vs courses*assignments)", file=sys.stderr)
+        for p in curve["points"]:
+            print(f"  {p['courses']:>3} courses x {p['assignments']:>4} assignments: {p['median_us']:>10} us",
+                  file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CanvasChatBot microbenchmarks on synthetic data")
+    parser.add_argument("--courses", type=int, default=8)
+    parser.add_argument("--assignments", type=int, default=60, help="per course")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--no-scaling", action="store_true", help="skip the n x m scaling grid")
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 = 10%%")
+    args = parser.parse_args()
+
+    config = {"courses": args.courses, "assignments": args.assignments, "seed": args.seed,
+              "rounds": args.rounds, "scaling": not args.no_scaling}
+    result = run(config)
+    print_report(result)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    elif not args.compare:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        if regressions:
+            print(f"[Bench] {len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
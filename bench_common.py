@@ -0,0 +1,56 @@
+# bench_common.py - helpers shared by benchmarks.py and bench_chatbot.py: the commit a run
+# was made on and the comparison of a run against a baseline results file
+import os
+import subprocess
+import sys
+
+# metrics where a bigger number is better, everything else is compared as lower-is-better
+HIGHER_IS_BETTER = ("queries_per_second", "rules_accuracy", "classifier_accuracy", "combined_accuracy",
+                    "cv_accuracy")
+
+
+#the short hash of the checked out commit, None outside a git checkout
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _flatten(tree, prefix=""):
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+#prints every metric next to the baseline, returns the names that got worse by more than threshold
+def compare(baseline, current, threshold=0.10):
+    if baseline.get("config") != current.get("config"):
+        print("[Bench] warning: baseline was run with a different config", file=sys.stderr)
+    old, new = _flatten(baseline["results"]), _flatten(current["results"])
+    regressions = []
+    print(f"{'metric':45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(new):
+        if name not in old:
+            continue
+        before, after = old[name], new[name]
+        change = (after - before) / before if before else 0.0
+        worse = -change if name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change
+        flag = ""
+        # request counts are exact, any increase is a regression. sub-millisecond
+        # timing differences are noise, whatever the percentage
+        if name.endswith("requests"):
+            regressed = after > before
+        else:
+            regressed = worse > threshold and not (name.endswith("_ms") and abs(after - before) < 0.5)
+        if regressed:
+            regressions.append(name)
+            flag = "  <-- worse"
+        print(f"{name:45} {before:>12} {after:>12} {change:>+7.1%}{flag}")
+    return regressions
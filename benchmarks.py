@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# benchmarks.py - offline benchmark suite against the local mock Canvas, writes JSON results
+# run:     python benchmarks.py --preset medium --out bench.json
+# compare: python benchmarks.py --preset medium --compare bench.json   (exit code 1 on a regression)
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from bench_common import compare, git_commit
+from Canvas_api import CanvasAPI, HTTP2_AVAILABLE
+from chatbot import CanvasChatBot
+from course_stats import CourseStats
+from loadtest import QUERIES
+from mock_canvas import H2_AVAILABLE, start_mock_canvas, build_fixtures
+import views
+
+PRESETS = {
+    "small": {"courses": 4, "assignments": 20},
+    "medium": {"courses": 8, "assignments": 60},
+    "large": {"courses": 12, "assignments": 250},
+}
+
+
+# each GUI view's data, through the same views functions Gui_app draws, without building widgets.
+# state looks like the GUI object after login (api, courses, assignments_cache, course_stats)
+def screen_dashboard(state):
+    views.upcoming_lines(state.course_stats)
+    views.week_lines(state.course_stats)
+    views.grade_lines(state.course_stats)
+
+
+def screen_grades(state):
+    views.course_grades(state.api, state.courses)
+
+
+def screen_all_assignments(state):
+    views.assignment_lists(state.api, state.assignments_cache, state.course_stats, datetime.now(timezone.utc))
+
+
+def screen_grade_details(state):
+    for course in state.courses:
+        views.grade_details(state.api, state.assignments_cache, course.get('id'))
+
+
+SCREENS = {"dashboard": screen_dashboard, "grades": screen_grades,
+           "all_assignments": screen_all_assignments, "grade_details": screen_grade_details}
+
+
+#what Gui_app does between pressing Login and the dashboard being filled in
+def login(base_url):
+    api = CanvasAPI(base_url, "bench-token")
+    user = api.get_current_user()
+    data = api.load_login_data()
+    if not user or data is None:
+        raise RuntimeError(f"login against the mock failed: {api.last_error}")
+    courses = [c for c in data['courses'] if c.get('name') and c.get('name').strip().lower() != 'none']
+    state = SimpleNamespace(api=api, courses=courses, assignments_cache=data['assignments'])
+    state.course_stats = CourseStats(api, courses, state.assignments_cache)
+    screen_dashboard(state)
+    return state
+
+
+def bench_login(server, repeat):
+    times, requests = [], []
+    for _ in range(repeat):
+        server.reset_counts()
+        started = time.perf_counter()
+        state = login(server.url)
+        times.append(time.perf_counter() - started)
+        requests.append(server.total_requests())
+        state.api.close()
+    return {"login_to_dashboard_ms": round(statistics.median(times) * 1000, 2),
+            "login_to_dashboard_min_ms": round(min(times) * 1000, 2),
+            "requests": max(requests)}
+
+
+#requests each screen sends on first open and on a second open right after
+def bench_screens(server):
+    state = login(server.url)
+    result = {}
+    for name, screen in SCREENS.items():
+        row = {}
+        for visit in ("first", "again"):
+            server.reset_counts()
+            started = time.perf_counter()
+            screen(state)
+            row[f"{visit}_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            row[f"{visit}_requests"] = server.total_requests()
+        result[name] = row
+    state.api.close()
+    return result
+
+
+def bench_chatbot(server, seconds):
+    state = login(server.url)
+    bot = CanvasChatBot(state.api, state.courses, state.assignments_cache)
+    for query in QUERIES:  # warm the api caches so this measures the chatbot itself
+        bot.process_query(query)
+    server.reset_counts()
+    count = 0
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for query in QUERIES:
+            started = time.perf_counter()
+            bot.process_query(query)
+            latencies.append(time.perf_counter() - started)
+        count += len(QUERIES)
+    state.api.close()
+    latencies.sort()
+    return {"queries": count,
+            "queries_per_second": round(count / sum(latencies), 1),
+            "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+            "p99_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6, 1),
+            "requests": server.total_requests()}
+
+
+#a login followed by a parallel prefetch of every course's assignments, submissions, grade
+#and assignment groups on `workers` threads sharing one CanvasAPI, once per transport.
+#reports the connections the mock accepted and the latency of the individual requests
+def bench_transport(server, workers):
+    transports = ["http1"] + (["http2"] if HTTP2_AVAILABLE and H2_AVAILABLE else [])
+    result = {}
+    for transport in transports:
+        latencies = []
+
+        @contextmanager
+        def timed(template, method):
+            started = time.perf_counter()
+            yield
+            latencies.append(time.perf_counter() - started)
+
+        api = CanvasAPI(server.url, "bench-token", span_hook=timed, http2=transport == "http2")
+        server.reset_counts()
+        started = time.perf_counter()
+        api.get_current_user()
+        data = api.load_login_data()
+        tasks = [task for course in data['courses'] for task in (
+            lambda c=course['id']: api.get_assignments(c),
+            lambda c=course['id']: api.fetch_submissions(c),
+            lambda c=course['id']: api.get_course_grade(c, refresh=True),
+            lambda c=course['id']: api.get_assignment_groups(c, refresh=True))]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda task: task(), tasks))
+        elapsed = time.perf_counter() - started
+        api.close()
+        latencies.sort()
+        result[transport] = {"connections": sum(server.connections.values()),
+                             "requests": server.total_requests(),
+                             "wall_ms": round(elapsed * 1000, 2),
+                             "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+                             "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+                             "max_ms": round(latencies[-1] * 1000, 2)}
+    return result
+
+
+#peak Python heap while logging in and opening every screen once
+def bench_memory(server):
+    tracemalloc.start()
+    state = login(server.url)
+    for screen in SCREENS.values():
+        screen(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    state.api.close()
+    result = {"peak_traced_kb": round(peak / 1024, 1)}
+    try:
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+        result["max_rss_kb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1024, 1)
+    except ImportError:
+        pass
+    return result
+
+
+def run_benchmarks(config):
+    fixtures = build_fixtures(config["courses"], config["assignments"], config["seed"], config["submitted"])
+    server = start_mock_canvas(fixtures, latency=config["latency_ms"] / 1000, per_page=config["per_page"],
+                               rate_limit=config["rate_limit"], connect_latency=config["connect_latency_ms"] / 1000)
+    try:
+        results = {"login": bench_login(server, config["repeat"]),
+                   "screens": bench_screens(server),
+                   "chatbot": bench_chatbot(server, config["chatbot_seconds"]),
+                   "memory": bench_memory(server),
+                   "transport": bench_transport(server, config["transport_workers"]),
+                   "throttled": server.throttled}
+    finally:
+        server.shutdown()
+    return {"meta": {"commit": git_commit(), "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                     "python": platform.python_version(), "platform": platform.platform()},
+            "config": config, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local mock Canvas")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    parser.add_argument("--courses", type=int, help="overrides the preset")
+    parser.add_argument("--assignments", type=int, help="per course, overrides the preset")
+    parser.add_argument("--submitted", type=float, default=0.8, help="share of past-due work turned in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every mock response")
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0,
+                        help="added to every new mock connection (TCP/TLS handshakes)")
+    parser.add_argument("--per-page", type=int, default=10, help="mock default REST page size")
+    parser.add_argument("--rate-limit", type=float, default=None, help="mock rate limit bucket size")
+    parser.add_argument("--repeat", type=int, default=5, help="login runs, the median is reported")
+    parser.add_argument("--chatbot-seconds", type=float, default=2.0)
+    parser.add_argument("--transport-workers", type=int, default=16,
+                        help="threads of the parallel prefetch in the HTTP/1.1 vs HTTP/2 comparison")
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 = 10%%")
+    args = parser.parse_args()
+
+    config = dict(PRESETS[args.preset], preset=args.preset, seed=args.seed, submitted=args.submitted,
+                  latency_ms=args.latency_ms, connect_latency_ms=args.connect_latency_ms, per_page=args.per_page,
+                  rate_limit=args.rate_limit, repeat=args.repeat, chatbot_seconds=args.chatbot_seconds,
+                  transport_workers=args.transport_workers)
+    if args.courses:
+        config["courses"] = args.courses
+    if args.assignments:
+        config["assignments"] = args.assignments
+
+    result = run_benchmarks(config)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        if regressions:
+            print(f"[Bench] {len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
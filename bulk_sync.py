@@ -0,0 +1,198 @@
+# bulk_sync.py - non-interactive batch sync of many Canvas tokens, exports each account's upcoming work and grades
+# used through main.py:  python main.py --manifest tokens.csv --out results.jsonl --workers 4
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime, timezone, timedelta
+from urllib.parse import urlparse
+
+from Canvas_api import CanvasAPI
+
+CSV_FIELDS = ["account_id", "status", "kind", "course", "name", "due_at", "points_possible",
+              "submitted", "score", "grade", "error"]
+
+
+#reads the token manifest: a CSV with account_id,base_url,token columns or JSON lines with the same keys
+def read_manifest(path):
+    accounts = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl") or path.endswith(".json"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for i, row in enumerate(rows, start=1):
+            if not row.get("base_url") or not row.get("token"):
+                raise ValueError(f"manifest line {i}: base_url and token are required")
+            accounts.append({"account_id": str(row.get("account_id") or i),
+                             "base_url": row["base_url"].strip(), "token": row["token"].strip()})
+    return accounts
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def account_host(account):
+    return urlparse(account["base_url"]).netloc
+
+
+# ---- worker process side ----
+
+#syncs one account and returns its export record, never raises. host_limit is the
+#semaphore of the account's Canvas host, shared by every worker process (None for no limit)
+def sync_account(account, days=14, host_limit=None):
+    started = time.perf_counter()
+    record = {"account_id": account["account_id"], "status": "ok", "error": None,
+              "user": None, "grades": [], "upcoming": []}
+    with host_limit if host_limit is not None else nullcontext():
+        api = CanvasAPI(account["base_url"], account["token"])
+        try:
+            user = api.get_current_user()
+            if not user:
+                raise RuntimeError(f"authentication failed: {api.last_error}")
+            data = api.load_login_data()
+            if data is None:
+                raise RuntimeError(f"could not load data: {api.last_error}")
+        except Exception as e:
+            record.update(status="failed", error=str(e))
+            record["seconds"] = round(time.perf_counter() - started, 3)
+            return record
+        finally:
+            api.close()
+
+    record["user"] = {"id": user.get("id"), "name": user.get("name")}
+    now = datetime.now(timezone.utc)
+    horizon = now + timedelta(days=days)
+    for course in data["courses"]:
+        course_id = course.get("id")
+        grade = data["grades"].get(course_id) or {}
+        record["grades"].append({"course": course.get("name"), "score": grade.get("current_score"),
+                                 "grade": grade.get("current_grade")})
+        submitted = {s.get("assignment_id") for s in data["submissions"].get(course_id, [])
+                     if s.get("submitted_at") or s.get("workflow_state") == "submitted"}
+        for a in data["assignments"].get(course_id, []):
+            due_at = a.get("due_at")
+            if not due_at:
+                continue
+            try:
+                due_date = datetime.fromisoformat(due_at.replace("Z", "+00:00"))
+                upcoming = now < due_date <= horizon
+            except (ValueError, TypeError):
+                continue  # an unreadable due date, skipped like the GUI does
+            if upcoming:
+                record["upcoming"].append({"course": course.get("name"), "name": a.get("name"),
+                                           "due_at": due_at, "points_possible": a.get("points_possible"),
+                                           "submitted": a.get("id") in submitted})
+    record["upcoming"].sort(key=lambda u: u["due_at"])
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+# runs in a pool process: syncs a chunk of accounts on threads and streams
+# every finished account back through the queue right away
+def _sync_chunk(accounts, results, days, host_limits, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(sync_account, a, days, host_limits[account_host(a)]) for a in accounts]
+        for future in as_completed(futures):
+            results.put(future.result())
+    return len(accounts)
+
+
+# ---- parent process side ----
+
+class ResultWriter:
+    def __init__(self, path, fmt, append=False):
+        self.fmt = fmt
+        self.file = sys.stdout if path in (None, "-") else open(path, "a" if append else "w",
+                                                                newline="", encoding="utf-8")
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            if not append or self.file.tell() == 0:
+                self.csv.writeheader()
+
+    def write(self, record):
+        if self.fmt == "jsonl":
+            self.file.write(json.dumps(record) + "\n")
+        else:
+            base = {"account_id": record["account_id"], "status": record["status"], "error": record["error"]}
+            rows = [dict(base, kind="grade", course=g["course"], score=g["score"], grade=g["grade"])
+                    for g in record["grades"]]
+            rows += [dict(base, kind="upcoming", course=u["course"], name=u["name"], due_at=u["due_at"],
+                          points_possible=u["points_possible"], submitted=u["submitted"])
+                     for u in record["upcoming"]]
+            self.csv.writerows(rows or [base])
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+#runs the whole batch, returns the summary dict (also printed to stderr)
+def run_bulk_sync(manifest, out=None, fmt="jsonl", workers=None, threads=4, per_host=4,
+                  checkpoint=None, days=14):
+    accounts = read_manifest(manifest)
+    done = read_checkpoint(checkpoint)
+    todo = [a for a in accounts if a["account_id"] not in done]
+    workers = workers or os.cpu_count() or 2
+
+    writer = ResultWriter(out, fmt, append=bool(done))
+    checkpoint_file = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+    summary = {"accounts": len(accounts), "skipped": len(accounts) - len(todo),
+               "ok": 0, "failed": 0, "failures": []}
+    started = time.perf_counter()
+    try:
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=workers) as pool:
+            results = manager.Queue()
+            # one semaphore per Canvas host in the manager process, so per_host caps the
+            # accounts of a host synced at once across every worker, not inside each one
+            host_limits = {host: manager.BoundedSemaphore(per_host) for host in {account_host(a) for a in todo}}
+            # small chunks keep every worker busy until the end of the batch
+            chunks = [todo[i:i + threads] for i in range(0, len(todo), threads)]
+            futures = [pool.submit(_sync_chunk, chunk, results, days, host_limits, threads) for chunk in chunks]
+            received = 0
+            while received < len(todo):
+                try:
+                    record = results.get(timeout=0.5)
+                except queue.Empty:
+                    # surface a crashed worker instead of waiting forever
+                    for future in futures:
+                        if future.done() and future.exception():
+                            raise future.exception()
+                    continue
+                received += 1
+                writer.write(record)
+                if record["status"] == "ok":
+                    summary["ok"] += 1
+                    if checkpoint_file:
+                        checkpoint_file.write(record["account_id"] + "\n")
+                        checkpoint_file.flush()
+                else:
+                    summary["failed"] += 1
+                    summary["failures"].append({"account_id": record["account_id"], "error": record["error"]})
+            for future in futures:
+                future.result()
+    finally:
+        writer.close()
+        if checkpoint_file:
+            checkpoint_file.close()
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 2)
+    summary["accounts_per_second"] = round(len(todo) / elapsed, 2) if elapsed else None
+    print(f"\n[Bulk sync] {summary['ok']} ok, {summary['failed']} failed, {summary['skipped']} skipped "
+          f"(checkpoint) in {summary['seconds']}s - {summary['accounts_per_second']} accounts/s",
+          file=sys.stderr)
+    for failure in summary["failures"]:
+        print(f"  - {failure['account_id']}: {failure['error']}", file=sys.stderr)
+    return summary
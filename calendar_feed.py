@@ -0,0 +1,295 @@
+# calendar_feed.py - iCalendar (.ics) feed of assignment due dates and reminders, for calendar apps
+# each course's events are rendered once into a fragment and only re-rendered when that course's
+# assignments change, the feed itself is streamed out fragment by fragment
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from reminders import DEFAULT_LEAD
+from utils import app_data_dir
+
+# bump when the rendered events change, every fragment is then rebuilt once
+FEED_VERSION = 1
+PRODID = "-//Canvas API Chatbot//Due dates//EN"
+CHUNK_SIZE = 64 * 1024
+REMINDERS = "reminders"  # fragment key of the user's own reminders, course fragments use the course id
+MAX_LINE_OCTETS = 75  # RFC 5545 folds longer content lines
+DEFAULT_NAME = "Canvas due dates"
+CALENDAR_END = "END:VCALENDAR\r\n"
+
+# only these assignment fields end up in an event, a change to anything else doesn't rebuild a course
+EVENT_FIELDS = ("id", "name", "due_at", "updated_at", "points_possible", "html_url")
+
+
+#the host name event UIDs are made from, for a Canvas URL or a bare host name
+def feed_host(base_url):
+    return urlparse(base_url if "//" in base_url else f"//{base_url}").hostname or "canvas"
+
+
+#one feed folder per Canvas instance and user, like the reminder database
+def feed_dir(base_url, user_id):
+    key = hashlib.sha256(f"{base_url.rstrip('/')}\n{user_id}".encode()).hexdigest()[:32]
+    return os.path.join(app_data_dir(), f"calendar-{key}")
+
+
+def escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+#one content line, folded every 75 octets without splitting a UTF-8 character
+def content_line(name, value):
+    line = f"{name}:{value}"
+    if len(line) <= MAX_LINE_OCTETS and line.isascii():
+        return line + "\r\n"
+    data = line.encode()
+    parts, start, limit = [], 0, MAX_LINE_OCTETS
+    while len(data) - start > limit:
+        end = start + limit
+        while data[end] & 0xC0 == 0x80:  # a continuation byte, back up to the character start
+            end -= 1
+        parts.append(data[start:end].decode())
+        start, limit = end, MAX_LINE_OCTETS - 1  # the leading space counts
+    parts.append(data[start:].decode())
+    return "\r\n ".join(parts) + "\r\n"
+
+
+#Canvas ISO time -> iCalendar UTC time, None when missing or unreadable
+def ical_time(iso):
+    if not iso:
+        return None
+    try:
+        when = datetime.fromisoformat(iso.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _trigger(lead):
+    minutes = int(lead.total_seconds() // 60)
+    return f"-PT{minutes // 60}H{minutes % 60}M" if minutes % 60 else f"-PT{minutes // 60}H"
+
+
+#the VEVENT of one assignment as text, None when it has no due date. the UID only
+#depends on the Canvas host, course and assignment so calendar apps update it in place
+def assignment_event(host, course, assignment, lead=DEFAULT_LEAD):
+    due = ical_time(assignment.get('due_at'))
+    if due is None:
+        return None
+    name = assignment.get('name') or "Assignment"
+    course_name = course.get('name') or ""
+    stamp = ical_time(assignment.get('updated_at')) or due
+    details = course_name
+    if assignment.get('points_possible') is not None:
+        details += f" - {assignment['points_possible']:g} points"
+    lines = [
+        "BEGIN:VEVENT\r\n",
+        content_line("UID", f"assignment-{course.get('id')}-{assignment.get('id')}@{host}"),
+        content_line("DTSTAMP", stamp),
+        content_line("LAST-MODIFIED", stamp),
+        content_line("DTSTART", due),
+        content_line("DTEND", due),
+        content_line("SUMMARY", escape(f"{name} due")),
+        content_line("DESCRIPTION", escape(details)),
+        content_line("CATEGORIES", escape(course_name)) if course_name else "",
+        content_line("URL", assignment['html_url']) if (assignment.get('html_url') or "").startswith("http") else "",
+        "TRANSP:TRANSPARENT\r\n",
+    ]
+    if lead:
+        lines += ["BEGIN:VALARM\r\n", "ACTION:DISPLAY\r\n",
+                  content_line("DESCRIPTION", escape(f"{name} is due soon")),
+                  content_line("TRIGGER", _trigger(lead)), "END:VALARM\r\n"]
+    lines.append("END:VEVENT\r\n")
+    return "".join(lines)
+
+
+#the VEVENT of a reminder the user made themselves (a ReminderStore row)
+def reminder_event(host, reminder):
+    when = reminder['when'].astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VEVENT\r\n",
+        content_line("UID", f"reminder-{reminder['id']}@{host}"),
+        content_line("DTSTAMP", when),
+        content_line("DTSTART", when),
+        content_line("DTEND", when),
+        content_line("SUMMARY", escape(reminder['title'])),
+        content_line("DESCRIPTION", escape(reminder['note'])) if reminder.get('note') else "",
+        "BEGIN:VALARM\r\n", "ACTION:DISPLAY\r\n",
+        content_line("DESCRIPTION", escape(reminder['title'])),
+        "TRIGGER:PT0M\r\n", "END:VALARM\r\n",
+        "END:VEVENT\r\n",
+    ]
+    return "".join(lines)
+
+
+#the lines a .ics file starts with, up to its first event. it ends with CALENDAR_END
+def calendar_header(name=DEFAULT_NAME):
+    return ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + content_line("PRODID", PRODID)
+            + "CALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n" + content_line("X-WR-CALNAME", escape(name)))
+
+
+#a hash of exactly what a course's events are rendered from. one repr of everything
+#is hashed in a single call, which is what keeps an update with nothing changed cheap
+def course_fingerprint(course, assignments, lead=DEFAULT_LEAD):
+    rows = [tuple(a.get(k) for k in EVENT_FIELDS) for a in assignments or []]
+    key = repr((FEED_VERSION, course.get('name'), lead.total_seconds() if lead else 0, rows))
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def reminders_fingerprint(items):
+    rows = [(r['id'], r['title'], r.get('note'), r['when'].timestamp()) for r in items]
+    return hashlib.blake2b(repr((FEED_VERSION, rows)).encode(), digest_size=16).hexdigest()
+
+
+#the feed of one user. update() re-renders only the fragments whose fingerprint changed;
+#with a folder the fragments are files (and survive restarts, so the first export after a
+#launch only rebuilds what changed meanwhile), without one they are kept in memory
+class CalendarFeed:
+    def __init__(self, base_url, folder=None, lead=DEFAULT_LEAD, name=DEFAULT_NAME):
+        self.host = feed_host(base_url)
+        self.folder = folder
+        self.lead = lead
+        self.name = name
+        self.fingerprints = {}  # fragment key -> fingerprint, in feed order
+        self._fragments = {}  # fragment key -> text, only without a folder
+        self.etag = None
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+            self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.vevents")
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.folder, "index.json"), encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get("version") != FEED_VERSION:
+            return
+        self.fingerprints = {k: fp for k, fp in index["fragments"]
+                             if os.path.exists(self._path(k))}
+        self._set_etag()
+
+    def _save_index(self):
+        path = os.path.join(self.folder, "index.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": FEED_VERSION, "fragments": list(self.fingerprints.items())}, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _set_etag(self):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((FEED_VERSION, self.host, self.name)).encode())
+        for key, fp in self.fingerprints.items():
+            h.update(f"{key}:{fp}\n".encode())
+        self.etag = f'"{h.hexdigest()}"'
+
+    #brings the feed in line with the courses, their assignments (course_id -> list, like
+    #assignments_cache) and the user's own reminders. returns the keys that were re-rendered
+    def update(self, courses, assignments_cache, reminders=()):
+        fingerprints, rebuilt = {}, []
+        for course in courses:
+            key = str(course.get('id'))
+            assignments = assignments_cache.get(course.get('id')) or []
+            fp = course_fingerprint(course, assignments, self.lead)
+            if self.fingerprints.get(key) != fp:
+                events = (assignment_event(self.host, course, a, self.lead) for a in assignments)
+                self._write_fragment(key, events)
+                rebuilt.append(key)
+            fingerprints[key] = fp
+        reminders = [r for r in reminders if not r.get('source_key')]
+        if reminders:
+            fp = reminders_fingerprint(reminders)
+            if self.fingerprints.get(REMINDERS) != fp:
+                self._write_fragment(REMINDERS, (reminder_event(self.host, r) for r in reminders))
+                rebuilt.append(REMINDERS)
+            fingerprints[REMINDERS] = fp
+
+        for key in set(self.fingerprints) - set(fingerprints):
+            self._drop_fragment(key)
+        changed = rebuilt or list(fingerprints) != list(self.fingerprints)
+        self.fingerprints = fingerprints
+        if changed or self.etag is None:
+            self._set_etag()
+            if self.folder:
+                self._save_index()
+        return rebuilt
+
+    # events are written one at a time, a course is never held in memory as a whole
+    def _write_fragment(self, key, events):
+        if self.folder is None:
+            self._fragments[key] = "".join(e for e in events if e)
+            return
+        path = self._path(key)
+        with open(f"{path}.tmp", "w", encoding="utf-8", newline="") as f:
+            for event in events:
+                if event:
+                    f.write(event)
+        os.replace(f"{path}.tmp", path)
+
+    def _drop_fragment(self, key):
+        self._fragments.pop(key, None)
+        if self.folder:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    #the whole .ics file as bytes chunks of at most about CHUNK_SIZE. without a folder it is
+    #the feed as it is now: a later update() swaps fragments out without touching these, so
+    #the chunks can be sent after the caller let go of the feed. only one chunk is encoded at a time
+    def chunks(self):
+        if self.folder is None:
+            return self._text_chunks([self._fragments.get(key, "") for key in self.fingerprints])
+        return self._file_chunks(list(self.fingerprints))
+
+    def _text_chunks(self, fragments):
+        yield calendar_header(self.name).encode()
+        for text in fragments:
+            for start in range(0, len(text), CHUNK_SIZE):
+                yield text[start:start + CHUNK_SIZE].encode()
+        yield CALENDAR_END.encode()
+
+    def _file_chunks(self, keys):
+        yield calendar_header(self.name).encode()
+        for key in keys:
+            with open(self._path(key), "rb") as f:
+                while True:
+                    data = f.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    yield data
+        yield CALENDAR_END.encode()
+
+    #writes the feed to path atomically, e.g. a file a calendar app subscribes to
+    def write(self, path):
+        with open(f"{path}.tmp", "wb") as f:
+            for chunk in self.chunks():
+                f.write(chunk)
+        os.replace(f"{path}.tmp", path)
+        return path
+
+
+#streams a one-off .ics to a file object straight from Canvas, one assignment page at a
+#time, for the command line export. returns how many events were written.
+#raises RuntimeError if Canvas failed part way, like export.export
+def write_calendar(api, file, lead=DEFAULT_LEAD):
+    host = feed_host(api.base_url)
+    api.last_error = None
+    file.write(calendar_header())
+    count = 0
+    for course in api.iter_courses():
+        for page in api.iter_pages(f"/courses/{course.get('id')}/assignments"):
+            events = [e for e in (assignment_event(host, course, a, lead) for a in page) if e]
+            file.write("".join(events))
+            file.flush()
+            count += len(events)
+    file.write(CALENDAR_END)
+    if api.last_error:
+        raise RuntimeError(f"export stopped early: {api.last_error}")
+    return count
@@ -1,23 +1,117 @@
 #!/usr/bin/env python3
 # chatbot.py - Intelligent chatbot for Canvas LMS queries
+import re
+import time
 from datetime import datetime, timezone, timedelta
 
+from conversation import ALL_COURSES_RE, FOLLOW_UP_RE, ConversationStore, all_courses_only
+from course_stats import CourseStats
+from search_index import SearchIndex, tokenize
+from timeframes import UPCOMING_DAYS, find_milestone, has_timeframe, resolve
+
+# What-if grades need numpy, everything else works without it
+try:
+    from grade_engine import GradeModel, GRADING_SCHEME, letter_for, parse_target
+    GRADE_ENGINE_AVAILABLE = True
+except ImportError:
+    GRADE_ENGINE_AVAILABLE = False
+
+# grade trends come from a GradeHistory, which needs numpy as well
+try:
+    from grade_history import sparkline
+    GRADE_HISTORY_AVAILABLE = True
+except ImportError:
+    GRADE_HISTORY_AVAILABLE = False
+
+# the trained intent classifier needs numpy too, without it the keyword rules decide alone
+try:
+    from intent_classifier import default_classifier
+    INTENT_CLASSIFIER_AVAILABLE = True
+except ImportError:
+    INTENT_CLASSIFIER_AVAILABLE = False
+
+# "what if I get 80% on the final", "what if i got a b+ on exam 2", "what if I score 45/50 on lab 3"
+WHAT_IF_RE = re.compile(r"what if i (?:get|got|score|make|earn)\s+(?:an?\s+)?"
+                        r"(\d+(?:\.\d+)?\s*(?:%|/\s*\d+(?:\.\d+)?|points?)?|[abcdf][+-]?)\s+"
+                        r"(?:on|in|for)\s+(?:the\s+|my\s+)?(.+?)\s*\??$")
+# "... to get a B", "... to keep an a-", "... to finish with 85%"
+TARGET_RE = re.compile(r"(?:to|for)\s+(?:get|keep|end up with|finish with|have)\s+(?:an?\s+)?"
+                       r"([abcdf][+-]?|\d+(?:\.\d+)?\s*%?)(?=[^a-z0-9%+-]|$)")
+# words that frame a search question rather than describe the assignment
+SEARCH_FILLER = frozenset("""which assignment assignments find search look up about one was is did
+show where called named""".split())
+
+# how far back a trend question looks, by the first of these words in it
+HISTORY_SPANS = [('today', 1), ('week', 7), ('month', 30), ('semester', 120), ('term', 120), ('year', 365)]
+
+# a change word is only a trend question next to a grade word: "has my grade improved" is one,
+# "what changed in my assignments" isn't
+CHANGE_RE = re.compile(r"\b(?:chang(?:e|ed|es|ing)|improv(?:e|ed|ing)|drop(?:s|ped)?|fell|moved|went (?:up|down))\b")
+GRADE_WORD_RE = re.compile(r"\b(?:grades?|scores?|gpa|average)\b")
+# "biggest drop", "did my grade fall" - not "this fall" or "fall break"
+DROP_RE = re.compile(r"\b(?:drop(?:s|ped)?|fell|falling|fallen|worst)\b|\bgrades? fall\b")
+
+# "need on the final", "need for exam 2"
+NEED_ON_RE = re.compile(r"need (?:on|for) (?:the |my )?(.+?)\s+(?:to|for|in)\s")
+
 
 class CanvasChatBot:
     
-    def __init__(self, api, courses, assignments_cache):
+    def __init__(self, api, courses, assignments_cache, history=None, tz=None):
         self.api = api
         self.courses = courses
         self.assignments_cache = assignments_cache
+        self.history = history  # GradeHistory, for questions about how grades changed
+        self.tz = tz  # the user's time zone, "tomorrow" is their tomorrow (None: this machine's)
+        self._grade_models = {}  # course_id -> (assignment group data, GradeModel)
+        self.search_index = None  # built on the first search question
+        self.stats = CourseStats(api, courses, assignments_cache)  # per-course summaries for grade questions
+        self.classifier = default_classifier() if INTENT_CLASSIFIER_AVAILABLE else None
+        self.conversations = ConversationStore()  # session_id -> Conversation
     
-    def process_query(self, query):
+    #with a session_id, follow-ups ("what about Biology?", "only the ones due tomorrow")
+    #refine that session's previous answer
+    def process_query(self, query, session_id=None):
+        return "".join(self.stream_query(query, session_id))
+
+    #process_query's answer in fragments, each yielded as soon as it is worked out: a header,
+    #one line per course or assignment, then the summary. answers that aren't lists come
+    #as a single fragment
+    def stream_query(self, query, session_id=None):
+        response = self._respond(query, session_id)
+        if isinstance(response, str):
+            yield response
+        else:
+            yield from response
+
+    # the handlers return a str, or a generator of fragments for list answers
+    def _respond(self, query, session_id):
         query_lower = query.lower()
+        conversation = self.conversations.get(session_id) if session_id is not None else None
         
         # Detect intent
-        intent = self._detect_intent(query_lower)
+        intent = self._classify_intent(query_lower)
+        
+        if conversation is not None:
+            # a follow-up has no intent of its own, or the same one as before, or only widens
+            # the previous question to every course
+            if conversation.intent and (intent in (conversation.intent, "unknown") or all_courses_only(query_lower)):
+                response = self._handle_follow_up(query_lower, conversation)
+                if response is not None:
+                    return response
+            if intent != "unknown":  # "thanks" or small talk keeps the context
+                conversation.remember(intent, query_lower)
         
-        if intent == "assignments":
-            return self._handle_assignment_query(query_lower)
+        if intent == "whatif":
+            return self._handle_what_if_query(query_lower)
+        elif intent == "missing":
+            return self._handle_missing_query(query_lower, conversation)
+        elif intent == "search":
+            return self._handle_search_query(query_lower)
+        elif intent == "trend":
+            return self._handle_trend_query(query_lower)
+        elif intent == "assignments":
+            return self._handle_assignment_query(query_lower, conversation)
         elif intent == "grades":
             return self._handle_grade_query(query_lower)
         elif intent == "courses":
@@ -27,6 +121,14 @@ class CanvasChatBot:
         else:
             return self._generate_fallback_response(query)
     
+    #the classifier's intent when it's confident enough, otherwise the keyword rules
+    def _classify_intent(self, query):
+        if self.classifier is not None:
+            intent, confidence = self.classifier.classify(query)
+            if confidence >= self.classifier.min_confidence:
+                return intent
+        return self._detect_intent(query)
+
     def _detect_intent(self, query):
         # Define keyword sets for each intent
         assignment_keywords = ['assignment', 'homework', 'hw', 'due', 'deadline', 
@@ -35,6 +137,13 @@ class CanvasChatBot:
                           'failing', 'gpa', 'doing']
         course_keywords = ['course', 'class', 'taking', 'enrolled']
         help_keywords = ['help', 'can you', 'what can', 'how do']
+        what_if_keywords = ['what if', 'need on', 'need to get', 'need to keep', 'need to pass']
+        missing_keywords = ['missing', 'overdue', 'past due', 'late work', 'late assignment', "haven't submitted",
+                            'havent submitted', 'not submitted', "didn't submit", 'didnt submit', 'forgot']
+        trend_keywords = ['trend', 'over time', 'biggest drop', 'dropped the most', 'going up', 'going down',
+                          'grade history']
+        search_keywords = ['which assignment', 'which homework', 'which lab', 'which project', 'which essay',
+                           'find', 'search', 'look up', 'look for', 'was about', 'is about', 'assignment about']
         
         # Count keyword matches
         assignment_count = sum(1 for kw in assignment_keywords if kw in query)
@@ -43,6 +152,14 @@ class CanvasChatBot:
         help_count = sum(1 for kw in help_keywords if kw in query)
         
         # Determine primary intent
+        if any(kw in query for kw in what_if_keywords) or ('need' in query and TARGET_RE.search(query)):
+            return "whatif"
+        if any(kw in query for kw in missing_keywords):
+            return "missing"
+        if any(kw in query for kw in trend_keywords) or (CHANGE_RE.search(query) and GRADE_WORD_RE.search(query)):
+            return "trend"
+        if any(kw in query for kw in search_keywords):
+            return "search"
         if help_count > 0:
             return "help"
         elif grade_count > assignment_count and grade_count > course_count:
@@ -60,7 +177,58 @@ class CanvasChatBot:
         
         return "unknown"
     
-    def _handle_assignment_query(self, query):
+    #answers from the conversation's previous result set when the query only changes
+    #the course or narrows the time window. None when it isn't a follow-up we can answer
+    def _handle_follow_up(self, query, conversation):
+        all_courses = ALL_COURSES_RE.search(query) is not None
+        if not FOLLOW_UP_RE.match(query) and len(query.split()) > 2 and not all_courses_only(query):
+            return None
+        course = self._extract_course_name(query)
+        new_timeframe = has_timeframe(query)
+        if not (course or all_courses or new_timeframe):
+            return None
+        course = None if all_courses else course or conversation.course
+
+        if conversation.intent == "assignments" and conversation.results is not None:
+            now = datetime.now(timezone.utc)
+            if new_timeframe:
+                timeframe, start_time, end_time = self._extract_timeframe(query, now)
+            else:
+                timeframe, (start_time, end_time) = conversation.timeframe, conversation.period
+            window_start, window_end = conversation.window
+            if conversation.covers(course) and start_time >= window_start and end_time <= window_end:
+                pool, window, scope = conversation.results, conversation.window, conversation.scope
+            else:
+                # another course or a wider window than the results cover, collect again
+                pool, window = self._collect_assignments(course, start_time, end_time, now), (start_time, end_time)
+                scope = course.get('id') if course else None
+            conversation.remember("assignments", conversation.query, course, timeframe,
+                                  (start_time, end_time), window, pool, scope)
+            assignments = self._filter_assignments(pool, course, start_time, end_time, now)
+            return self._format_assignment_response(assignments, timeframe, course)
+
+        if new_timeframe:
+            return None  # only assignments have a time window
+        if conversation.intent == "missing" and conversation.results is not None:
+            if not conversation.covers(course):
+                missing = self.api.get_missing_submissions([course.get('id')] if course else None)
+                if missing is None:
+                    return "I couldn't check your missing work right now. Please try again in a moment."
+                conversation.results, conversation.scope = missing, (course.get('id') if course else None)
+            conversation.course = course
+            return self._format_missing(conversation.results, course)
+        if conversation.intent == "grades":
+            conversation.course = course
+            return self._get_course_grade(course) if course else self._get_grade_overview()
+        if conversation.intent == "whatif" and course:
+            conversation.course = course
+            return self._handle_what_if_query(conversation.query, course)
+        if conversation.intent == "search":
+            conversation.course = course
+            return self._handle_search_query(conversation.query, course)
+        return None
+
+    def _handle_assignment_query(self, query, conversation=None):
         now = datetime.now(timezone.utc)
         
         # Detect time frame
@@ -73,22 +241,35 @@ class CanvasChatBot:
         assignments = self._collect_assignments(
             specific_course, start_time, end_time, now
         )
+        if conversation is not None:
+            # only what was asked for is collected, a follow-up about more collects again
+            conversation.remember("assignments", query, specific_course, timeframe, (start_time, end_time),
+                                  results=assignments, scope=specific_course.get('id') if specific_course else None)
         
         # Generate conversational response
         return self._format_assignment_response(
             assignments, timeframe, specific_course
         )
     
+    #(label, start, end) for the date expression in the query ("next friday", "in 3 days",
+    #"before midterms"), the next two weeks when there is none
     def _extract_timeframe(self, query, now):
-        if 'today' in query:
-            return 'today', now, now + timedelta(days=1)
-        elif 'tomorrow' in query:
-            start = now + timedelta(days=1)
-            return 'tomorrow', start, now + timedelta(days=2)
-        elif 'this week' in query or 'week' in query:
-            return 'this week', now, now + timedelta(days=7)
-        else:
-            return 'upcoming', now, now + timedelta(days=14)
+        window = resolve(query, now, self.tz, milestone=lambda name: self._milestone(name, query, now))
+        if window is None:
+            return 'upcoming', now, now + timedelta(days=UPCOMING_DAYS)
+        return window
+
+    #when e.g. the "midterm" next happens in the course named in the query (or any course):
+    #from the calendar events, else from an assignment with that name
+    def _milestone(self, name, query, now):
+        course = self._extract_course_name(query)
+        courses = [course] if course else self.courses
+        events = self.api.get_calendar_events([c.get('id') for c in courses]) or []
+        when = find_milestone(name, [(e.get('title'), e.get('start_at')) for e in events], now)
+        if when is None:
+            when = find_milestone(name, [(a.get('name'), a.get('due_at')) for c in courses
+                                         for a in self.assignments_cache.get(c.get('id'), [])], now)
+        return when
     
     def _extract_course_name(self, query):
         for course in self.courses:
@@ -132,6 +313,7 @@ class CanvasChatBot:
                     assignments.append({
                         'name': assignment.get('name'),
                         'course': course_name,
+                        'course_id': course_id,
                         'days_until': days_until,
                         'due_date': due_date
                     })
@@ -140,6 +322,14 @@ class CanvasChatBot:
         assignments.sort(key=lambda x: x['due_date'])
         return assignments
     
+    #the part of a _collect_assignments result in one course (or all) and time window,
+    #days_until counted again from now
+    def _filter_assignments(self, assignments, course, start_time, end_time, now):
+        course_id = course.get('id') if course else None
+        return [dict(a, days_until=(a['due_date'] - now).days) for a in assignments
+                if (course_id is None or a['course_id'] == course_id)
+                and start_time <= a['due_date'] <= end_time and a['due_date'] > now]
+
     def _format_assignment_response(self, assignments, timeframe, specific_course):
         if not assignments:
             if specific_course:
@@ -152,16 +342,16 @@ class CanvasChatBot:
             a = assignments[0]
             time_str = self._format_time_until(a['days_until'])
             return f"You have 1 assignment {timeframe}: {a['name']} in {a['course']}, due {time_str}."
-        
-        response = f"You have {len(assignments)} assignments {timeframe}:\n\n"
+        return self._stream_assignment_list(assignments, timeframe)
+
+    def _stream_assignment_list(self, assignments, timeframe):
+        yield f"You have {len(assignments)} assignments {timeframe}:\n\n"
         for a in assignments[:5]:  # Limit to 5 for readability
             time_str = self._format_time_until(a['days_until'])
-            response += f"- {a['name']} ({a['course']}) - due {time_str}\n"
+            yield f"- {a['name']} ({a['course']}) - due {time_str}\n"
         
         if len(assignments) > 5:
-            response += f"\n...and {len(assignments) - 5} more. Check 'View Upcoming Assignments' for the full list!"
-        
-        return response
+            yield f"\n...and {len(assignments) - 5} more. Check 'View Upcoming Assignments' for the full list!"
     
     def _format_time_until(self, days):
         if days == 0:
@@ -221,7 +411,7 @@ class CanvasChatBot:
     
     def _check_passing_status(self):
         grades = self._collect_all_grades()
-        failing = [g for g in grades if g['score'] < 60]  # 60% is passing threshold
+        failing = [g for g in grades if g['failing']]
         
         if not grades:
             return "I don't have enough grade information yet to check your passing status."
@@ -240,29 +430,271 @@ class CanvasChatBot:
         
         if not grades:
             return "I don't have grade information available yet. Grades will appear here once your assignments are graded."
-        
-        avg_score = sum(g['score'] for g in grades) / len(grades)
-        response = "Here's your grade overview:\n\n"
+        return self._stream_grade_overview(grades)
+
+    def _stream_grade_overview(self, grades):
+        yield "Here's your grade overview:\n\n"
         
         for g in grades:
-            response += f"- {g['course']}: {g['score']:.1f}% ({g['letter']})\n"
-        
-        response += f"\nYour average across all courses is {avg_score:.1f}%."
+            yield f"- {g['course']}: {g['score']:.1f}% ({g['letter']})\n"
         
-        return response
+        avg_score = sum(g['score'] for g in grades) / len(grades)
+        yield f"\nYour average across all courses is {avg_score:.1f}%."
     
+    #from the summary table, so comparing courses never waits on Canvas
     def _collect_all_grades(self):
-        grades = []
-        for course in self.courses:
-            grade_info = self.api.get_course_grade(course.get('id'))
-            if grade_info and grade_info.get('current_score') is not None:
-                grades.append({
-                    'course': course.get('name'),
-                    'score': grade_info.get('current_score'),
-                    'letter': grade_info.get('current_grade', '')
-                })
-        return grades
+        return self.stats.grades()
     
+    #the course's GradeModel, rebuilt only when the API hands back new assignment group data
+    def _grade_model(self, course_id):
+        data = self.api.get_assignment_groups(course_id)
+        if data is None:
+            return None
+        cached = self._grade_models.get(course_id)
+        if cached and cached[0] is data:
+            return cached[1]
+        model = GradeModel.from_canvas(data)
+        self._grade_models[course_id] = (data, model)
+        return model
+
+    def _handle_what_if_query(self, query, course=None):
+        if not GRADE_ENGINE_AVAILABLE:
+            return "What-if grade questions need numpy installed (pip install numpy)."
+        course = course or self._extract_course_name(query)
+        if not course and len(self.courses) == 1:
+            course = self.courses[0]
+        if not course:
+            return "Which course do you mean? Try 'What do I need on the final to get a B in Biology?'"
+        course_name = course.get('name')
+        model = self._grade_model(course.get('id'))
+        if model is None or not len(model.points):
+            return f"I couldn't load the assignment groups for {course_name}."
+        current = model.current()
+        current_text = f"{current:.1f}% ({letter_for(current)})" if current == current else "no graded work yet"
+
+        scenario = WHAT_IF_RE.search(query)
+        if scenario:
+            value, phrase = scenario.groups()
+            phrase = self._assignment_phrase(phrase, course)
+            matches = model.find_assignments(phrase)
+            if not matches:
+                return f"I couldn't find an assignment matching '{phrase}' in {course_name}."
+            if len(matches) > 1:
+                return self._which_assignment(model, matches, course_name)
+            index = matches[0]
+            fraction = self._score_fraction(value, model.points[index])
+            if fraction is None:
+                return f"I didn't understand the score '{value}'."
+            grade = float(model.what_if([index], [fraction])[0])
+            return (f"If you get {fraction * 100:.1f}% on {model.names[index]}, your grade in {course_name} "
+                    f"would be {grade:.1f}% ({letter_for(grade)}). Right now it's {current_text}.")
+
+        target_match = TARGET_RE.search(query)
+        target = parse_target(target_match.group(1)) if target_match else (60.0 if 'pass' in query else None)
+        if target is None:
+            return ("Tell me the grade you're aiming for, e.g. 'What do I need on the final to get a B "
+                    f"in {course_name}?' or 'What if I get 85% on the final?'")
+        letter = target_match.group(1).upper() if target_match else None
+        if letter in dict(GRADING_SCHEME):
+            target_text = f"a{'n' if letter[0] in 'AF' else ''} {letter} ({target:g}%)"
+        else:
+            target_text = f"{target:g}%"
+
+        need_on = NEED_ON_RE.search(query)
+        matches = model.find_assignments(self._assignment_phrase(need_on.group(1), course)) if need_on else []
+        if len(matches) > 1:
+            return self._which_assignment(model, matches, course_name)
+        if matches:
+            indices, what = matches, model.names[matches[0]]
+        else:
+            indices = model.ungraded
+            what = f"your {len(indices)} remaining assignments" if len(indices) != 1 else model.names[indices[0]]
+        if not len(indices):
+            return (f"Everything in {course_name} is already graded, your grade is {current_text}. "
+                    f"{'You made it!' if current >= target else 'There is nothing left to change it.'}")
+
+        fraction, grade = model.required(indices, target)
+        if fraction is None:
+            return (f"Even full marks on {what} would only bring {course_name} to {grade:.1f}% "
+                    f"({letter_for(grade)}), so {target_text} is out of reach. You're at {current_text}.")
+        if fraction == 0.0:
+            return (f"You're safe: even with a 0 on {what} you'd finish {course_name} at {grade:.1f}%, "
+                    f"which keeps {target_text}.")
+        average = " on average" if len(indices) > 1 else ""
+        points = f" ({fraction * model.points[indices[0]]:.1f}/{model.points[indices[0]]:g} points)" if len(indices) == 1 else ""
+        return (f"You need at least {fraction * 100:.1f}%{average} on {what}{points} to finish {course_name} "
+                f"with {target_text}. You're at {current_text} right now.")
+
+    #the assignment part of "the final in biology": a trailing "in <course>" is cut off so the
+    #course's name isn't taken for words of the assignment's
+    def _assignment_phrase(self, phrase, course):
+        course_words = set(re.findall(r"[a-z0-9]+", (course.get('name') or "").lower()))
+        course_words |= set(re.findall(r"[a-z0-9]+", (course.get('course_code') or "").lower()))
+        tail = re.search(r"\s+(?:in|for|of)\s+(?:my\s+|the\s+)?([a-z0-9 ]+?)(?:\s+(?:class|course))?$", phrase)
+        if tail and set(tail.group(1).split()) <= course_words:
+            return phrase[:tail.start()]
+        return phrase
+
+    #several assignments have all the words asked about, rather than guess one the question names them
+    def _which_assignment(self, model, matches, course_name):
+        names = [model.names[i] for i in matches[:5]]
+        more = f" (and {len(matches) - 5} more)" if len(matches) > 5 else ""
+        return (f"Which assignment in {course_name} do you mean: {', '.join(names[:-1])} or {names[-1]}{more}? "
+                f"Ask again with its full name.")
+
+    #"85%", "45/50", "8 points", "b+" or a plain number (a percentage) -> fraction of the points
+    def _score_fraction(self, value, possible):
+        value = value.replace(" ", "")
+        if value.endswith("%"):
+            return float(value[:-1]) / 100
+        if "/" in value:
+            score, out_of = value.split("/")
+            return float(score) / float(out_of) if float(out_of) else None
+        if value.endswith("points") or value.endswith("point"):
+            return float(re.sub(r"points?$", "", value)) / possible if possible else None
+        if value[0].isdigit():
+            return float(value) / 100
+        cutoff = parse_target(value)
+        return cutoff / 100 if cutoff is not None else None
+
+    #past-due work that was never turned in, one request across all courses
+    def _handle_missing_query(self, query, conversation=None):
+        course = self._extract_course_name(query)
+        missing = self.api.get_missing_submissions([course.get('id')] if course else None)
+        if missing is None:
+            return "I couldn't check your missing work right now. Please try again in a moment."
+        if conversation is not None:
+            # only the course asked about, a follow-up about another one asks Canvas again
+            conversation.remember("missing", query, course, results=missing,
+                                  scope=course.get('id') if course else None)
+        return self._format_missing(missing, course)
+
+    def _format_missing(self, missing, course):
+        if course:
+            missing = [a for a in missing if a.get('course_id') == course.get('id')]
+        where = f" in {course.get('name')}" if course else ""
+        if not missing:
+            return f"You're not missing any assignments{where}. Nice work staying on top of things!"
+
+        points = sum(a.get('points_possible') or 0 for a in missing)
+        count = f"{len(missing)} missing assignment{'s' if len(missing) != 1 else ''}"
+        return self._stream_missing(missing, f"You have {count}{where}, worth {points:g} points:\n\n")
+
+    def _stream_missing(self, missing, header):
+        yield header
+        names = {c.get('id'): c.get('name') for c in self.courses}
+        now = datetime.now(timezone.utc)
+        separator = ""  # lines are joined with newlines, there is none after the last
+        for a in missing[:8]:
+            course_name = (a.get('course') or {}).get('name') or names.get(a.get('course_id'), 'Unknown course')
+            overdue = ""
+            if a.get('due_at'):
+                days = (now - datetime.fromisoformat(a['due_at'].replace('Z', '+00:00'))).days
+                overdue = " - due today" if days == 0 else f" - {days} day{'s' if days != 1 else ''} overdue"
+            yield f"{separator}- {a.get('name')} ({course_name}){overdue}"
+            separator = "\n"
+        if len(missing) > 8:
+            yield f"\n\n...and {len(missing) - 8} more. Check 'View Upcoming Assignments' for the full list."
+
+    #how course grades moved over a period ("this month", "this semester"), or the biggest drop
+    def _handle_trend_query(self, query):
+        if self.history is None or not GRADE_HISTORY_AVAILABLE:
+            return "I don't have a grade history yet. I start keeping one once you're logged in with numpy installed."
+        days = next((d for word, d in HISTORY_SPANS if word in query), None)
+        since = time.time() - days * 86400 if days else None
+        period = f"over the last {days} day{'s' if days != 1 else ''}" if days else "since I started tracking"
+        names = {c.get('id'): c.get('name') for c in self.courses}
+
+        if DROP_RE.search(query):
+            drop = self.history.biggest_drop(since, list(names))
+            if drop is None:
+                return f"None of your grades dropped {period}."
+            course_id, peak, trough, peak_ts, trough_ts = drop
+            return (f"Your biggest drop {period} was in {names[course_id]}: from {peak:.1f}% on "
+                    f"{datetime.fromtimestamp(peak_ts):%b %d} to {trough:.1f}% on "
+                    f"{datetime.fromtimestamp(trough_ts):%b %d} ({trough - peak:+.1f} points).")
+
+        # "grade history" would otherwise pick a History course
+        course = self._extract_course_name(query.replace('grade history', ''))
+        if course is None:
+            return self._stream_trends(period, since)
+        _, scores = self.history.series(course.get('id'), since=since)
+        if not len(scores):
+            return f"I don't have any grade history for {course.get('name')} yet."
+        if len(scores) == 1:
+            return f"Your grade in {course.get('name')} has stayed at {scores[0]:.1f}% {period}."
+        return (f"Your grade in {course.get('name')} went from {scores[0]:.1f}% to {scores[-1]:.1f}% "
+                f"({scores[-1] - scores[0]:+.1f}) {period}.  {sparkline(scores)}")
+
+    # one line per course as its history is read, the header goes out with the first one
+    def _stream_trends(self, period, since):
+        found = False
+        for c in self.courses:
+            _, scores = self.history.series(c.get('id'), since=since)
+            if not len(scores):
+                continue
+            if not found:
+                yield f"How your grades moved {period}:\n\n"
+                found = True
+            yield (f"- {c.get('name')}: {scores[0]:.1f}% -> {scores[-1]:.1f}% "
+                   f"({scores[-1] - scores[0]:+.1f})  {sparkline(scores)}\n")
+        if not found:
+            yield "I don't have any grade history for your courses yet."
+
+    #the assignments of these courses changed (e.g. after a sync), re-index only them
+    def refresh_courses(self, course_ids):
+        # result sets kept for follow-ups may include the old assignments
+        self.conversations.clear()
+        if self.search_index is None:
+            return
+        for course_id in course_ids:
+            self.search_index.update_course(course_id, self.assignments_cache.get(course_id))
+
+    #refresh_courses for a caller on another thread than the questions (the headless
+    #service): the index is dropped and rebuilt by the next search, never changed under one.
+    #the summary rows of course_ids (all when None) are rebuilt when next read
+    def invalidate_courses(self, course_ids=None):
+        self.conversations.clear()
+        self.search_index = None
+        self.stats.invalidate(course_ids)
+
+    def _get_search_index(self):
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+            for course in self.courses:
+                self.search_index.update_course(course.get('id'), self.assignments_cache.get(course.get('id')))
+        return self.search_index
+
+    #full-text search over assignment names and descriptions
+    def _handle_search_query(self, query, course=None):
+        # a follow-up passes its own course, the one named in the query isn't a search term either
+        named = self._extract_course_name(query)
+        course = course or named
+        ignore = set(SEARCH_FILLER)
+        for c in (course, named):
+            if c:
+                ignore.update(tokenize(c.get('name', '')))
+        terms = [w for w in tokenize(query) if w not in ignore]
+        if not terms:
+            return "What should I look for? Try 'Which assignment was the lab report about enzymes?'"
+
+        results = self._get_search_index().search(" ".join(terms), limit=5,
+                                                  course_ids=[course.get('id')] if course else None)
+        where = f" in {course.get('name')}" if course else ""
+        if not results:
+            return f"I couldn't find any assignment{where} matching '{' '.join(terms)}'."
+
+        names = {c.get('id'): c.get('name') for c in self.courses}
+        lines = []
+        for score, course_id, a in results:
+            due = ""
+            if a.get('due_at'):
+                due_date = datetime.fromisoformat(a['due_at'].replace('Z', '+00:00'))
+                due = f" - due {due_date.strftime('%b %d')}"
+            lines.append(f"- {a.get('name')} ({names.get(course_id, 'Unknown course')}){due}")
+        best = "Here's the best match" if len(results) == 1 else "Here are the best matches"
+        return f"{best}{where} for '{' '.join(terms)}':\n\n" + "\n".join(lines)
+
     def _handle_course_query(self, query):
         if 'how many' in query or 'list' in query:
             response = f"You're enrolled in {len(self.courses)} courses:\n\n"
@@ -277,6 +709,10 @@ class CanvasChatBot:
 
 - Assignments - "What's due this week?" or "Show assignments for Math"
 - Grades - "What's my grade in Biology?" or "What's my lowest grade?"
+- Search - "Which assignment was the lab report about enzymes?"
+- Missing work - "What am I missing?" or "Do I have overdue work in History?"
+- Trends - "How has my grade in Chemistry changed this month?" or "What was my biggest drop?"
+- What-if - "What do I need on the final to get a B in Biology?" or "What if I get 85% on Exam 2?"
 - Courses - "What courses am I taking?"
 
 Try asking me something!"""
@@ -0,0 +1,91 @@
+# conversation.py - per-session chatbot context, so a follow-up refines the previous answer
+# instead of starting over ("what's due this week?" -> "what about Biology?" -> "only tomorrow")
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_TTL = 30 * 60  # seconds of inactivity before a session's context is forgotten
+
+# openers that mark a question as a refinement of the previous one
+FOLLOW_UP_RE = re.compile(r"^(?:ok(?:ay)?,? |and |but |so )?(?:what about|how about|what of|and|only|just|now)\b")
+# "for all my classes", "everything" -> drop the course filter
+ALL_COURSES_RE = re.compile(r"\b(?:all (?:my |of my )?(?:courses|classes)|every (?:course|class)|everything)\b")
+
+
+#"for all my classes", "everything?": a question that only widens the previous one to every
+#course. it is a follow-up whatever intent the words alone would get ("classes" reads as courses)
+def all_courses_only(query):
+    match = ALL_COURSES_RE.search(query)
+    return match is not None and len((query[:match.start()] + query[match.end():]).split()) <= 2
+
+
+#what the chatbot remembers about one session: the last intent and the query it came
+#from, the course and time period it was answered for, and the result set it was
+#answered from. the result set covers a window that can be wider than the period and
+#one course or every course (scope), so narrowing either is only a filter
+class Conversation:
+    def __init__(self):
+        self.intent = None
+        self.query = None
+        self.course = None
+        self.timeframe = None
+        self.period = None  # (start, end) of the last answer
+        self.window = None  # (start, end) the assignments in results were collected for
+        self.results = None  # assignments or missing submissions
+        self.scope = None  # id of the one course results were collected for, None for every course
+        self.updated = 0.0
+
+    def remember(self, intent, query, course=None, timeframe=None, period=None, window=None, results=None,
+                 scope=None):
+        self.intent, self.query, self.course = intent, query, course
+        self.timeframe, self.period = timeframe, period
+        self.window, self.results, self.scope = window or period, results, scope
+
+    #whether results hold everything about course (None: every course)
+    def covers(self, course):
+        return self.scope is None or (course is not None and course.get('id') == self.scope)
+
+
+#session id -> Conversation, least recently used first. holds at most max_sessions and
+#forgets a session after ttl seconds without a question. safe to share between threads
+class ConversationStore:
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    #the session's conversation, a fresh one if it's new or has expired
+    def get(self, session_id):
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            conversation = self._sessions.pop(session_id, None) or Conversation()
+            conversation.updated = now
+            self._sessions[session_id] = conversation
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return conversation
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    #forgets every session's result sets, e.g. after the assignments changed
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def _expire(self, now):
+        # oldest first, so stop at the first one that is still fresh
+        while self._sessions:
+            session_id, conversation = next(iter(self._sessions.items()))
+            if now - conversation.updated < self.ttl:
+                break
+            del self._sessions[session_id]
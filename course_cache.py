@@ -0,0 +1,114 @@
+# course_cache.py - course level data (assignment definitions) shared between all users of one process
+import threading
+import time
+
+# assignment fields that depend on who is asking, they never go into the shared cache
+PER_USER_FIELDS = ("submission", "locked_for_user", "lock_explanation", "lock_info",
+                   "unlock_at_for_user", "can_submit", "planner_override")
+
+# an assignment with one of these set can have dates (or visibility) for single students
+# or groups, it is never shared: every user gets their own copy from Canvas
+OVERRIDE_FLAGS = ("has_overrides", "only_visible_to_overrides")
+
+DEFAULT_MAX_AGE = 10 * 60  # seconds before a shared course is downloaded again
+
+
+class _Entry:
+    def __init__(self):
+        self.definitions = None  # shared assignment dicts, replaced (never changed) on a refresh
+        self.overridden = frozenset()  # ids left out of definitions, see OVERRIDE_FLAGS
+        self.loaded_at = 0.0
+        self.refs = 0
+        self.lock = threading.Lock()  # only one user downloads a course at a time
+
+
+#assignment definitions keyed by (Canvas instance, course_id, the user's sections in it),
+#reference counted by the sessions using them. per-user data (submissions, grades) stays
+#with each user. Canvas returns the due/unlock/lock dates of a section's overrides in the
+#assignment itself, so only users in the same sections of a course share definitions, and
+#assignments that can be overridden per student are fetched by every user for themselves.
+#acquire hands each user a list of their own: the shared dicts (which nobody changes in
+#place) plus their own copies of the overridden assignments, so a user's sync can replace
+#entries of that list without touching anyone else's.
+#on_refresh(instance, course_id, sections) is called after a download replaced the shared
+#definitions, outside any lock here, so the users holding them can take the new ones (see
+#refreshed). a user can only pull a course into the cache, or read it from there, if that
+#course is in the course list their own token returned
+class SharedCourseCache:
+    def __init__(self, max_age=DEFAULT_MAX_AGE, on_refresh=None):
+        self.max_age = max_age
+        self.on_refresh = on_refresh
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.upstream_loads = 0  # how many times a course was actually downloaded
+
+    #returns the caller's assignment list for a course or None if it couldn't be loaded.
+    #sections are the ids of the user's sections in the course. every successful acquire
+    #needs a release with the same sections
+    def acquire(self, api, course_id, visible_course_ids, sections=()):
+        if course_id not in visible_course_ids:
+            raise PermissionError(f"course {course_id} is not visible to this user")
+        key = (api.base_url, course_id, tuple(sorted(sections)))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            entry.refs += 1
+
+        own, notify = None, None
+        with entry.lock:
+            if entry.definitions is None or time.monotonic() - entry.loaded_at > self.max_age:
+                # downloaded with the caller's own token, which we know can read the course
+                assignments = api.get_assignments(course_id)
+                if assignments is None and entry.definitions is None:
+                    self.release(api.base_url, course_id, sections)
+                    return None
+                if assignments is not None:
+                    refreshed = entry.definitions is not None
+                    self.upstream_loads += 1
+                    own = [a for a in assignments if _overridden(a)]
+                    # a new list, whoever holds the old one keeps a consistent copy
+                    entry.definitions = [_definition(a) for a in assignments if not _overridden(a)]
+                    entry.overridden = frozenset(a.get('id') for a in own)
+                    entry.loaded_at = time.monotonic()
+                    if refreshed and self.on_refresh:
+                        notify = key
+            definitions, overridden = entry.definitions, entry.overridden
+
+        if own is None:
+            # this user's own dates for the assignments that aren't shared
+            own = api.get_assignments(course_id, assignment_ids=sorted(overridden)) if overridden else []
+        if notify:
+            self.on_refresh(*notify)
+        return list(definitions) + list(own or [])
+
+    #the current shared definitions and overridden ids of a key, for users taking a refresh
+    def refreshed(self, instance, course_id, sections=()):
+        entry = self._entries.get((instance, course_id, tuple(sorted(sections))))
+        if entry is None or entry.definitions is None:
+            return None, frozenset()
+        return entry.definitions, entry.overridden
+
+    def release(self, instance, course_id, sections=()):
+        key = (instance, course_id, tuple(sorted(sections)))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs <= 0:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {'courses': len(self._entries),
+                    'refs': sum(e.refs for e in self._entries.values()),
+                    'upstream_loads': self.upstream_loads}
+
+
+def _overridden(assignment):
+    return any(assignment.get(flag) for flag in OVERRIDE_FLAGS)
+
+
+def _definition(assignment):
+    return {k: v for k, v in assignment.items() if k not in PER_USER_FIELDS}
@@ -0,0 +1,235 @@
+# course_stats.py - per-course summary table (next due item, due this week, unsubmitted, current
+# score, failing) for the dashboard and the chatbot's grade answers. it is kept up to date from
+# the sync engine's ChangeEvents, so reading it is a lookup per course: no network, no rescan
+import heapq
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from itertools import islice
+
+from sync_engine import (ASSIGNMENT_REMOVED, ASSIGNMENT_UPDATED, DUE_DATE_MOVED, GRADE_POSTED, NEW_ASSIGNMENT,
+                         NEW_COURSE, SUBMITTED)
+
+PASSING_SCORE = 60  # a current score below this is failing
+WEEK_SECONDS = 7 * 24 * 3600
+# a submission in one of these states (or with a submitted_at) counts as handed in
+SUBMITTED_STATES = ("submitted", "graded", "pending_review")
+# assignments that can't be handed in through Canvas are never counted as unsubmitted
+NO_SUBMISSION_TYPES = {"none", "on_paper", "not_graded"}
+
+
+#an assignment's due date as unix time, None when it has none
+def due_ts(assignment):
+    due_at = assignment.get('due_at')
+    if not due_at:
+        return None
+    try:
+        return datetime.fromisoformat(due_at.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def is_submitted(submission):
+    return (bool(submission.get('submitted_at')) or submission.get('workflow_state') in SUBMITTED_STATES
+            or bool(submission.get('excused')))
+
+
+def _takes_submissions(assignment):
+    return not set(assignment.get('submission_types') or ()) & NO_SUBMISSION_TYPES
+
+
+#one course's row. due dates are kept sorted as (due, assignment id) pairs, so everything
+#that depends on the current time is a bisect instead of a pass over the assignments.
+#submissions_known is False while the user's submissions in the course haven't been
+#loaded (the REST login path loads them per course, later), the unsubmitted count is
+#None until then rather than every past-due assignment
+class CourseSummary:
+    __slots__ = ("course", "assignments", "due", "open", "submitted", "submissions_known", "score", "letter")
+
+    def __init__(self, course):
+        self.course = course
+        self.assignments = {}  # assignment id -> assignment dict
+        self.due = []  # (due, id) of every assignment with a due date
+        self.open = []  # (due, id) of the ones that take submissions and weren't handed in yet
+        self.submitted = set()  # assignment ids handed in
+        self.submissions_known = False
+        self.score = None
+        self.letter = None
+
+    @property
+    def course_id(self):
+        return self.course.get('id')
+
+    @property
+    def name(self):
+        return self.course.get('name')
+
+    @property
+    def failing(self):
+        return self.score is not None and self.score < PASSING_SCORE
+
+    def put_assignment(self, assignment):
+        self.drop_assignment(assignment.get('id'))
+        assignment_id = assignment.get('id')
+        self.assignments[assignment_id] = assignment
+        due = due_ts(assignment)
+        if due is not None:
+            insort(self.due, (due, assignment_id))
+            if assignment_id not in self.submitted and _takes_submissions(assignment):
+                insort(self.open, (due, assignment_id))
+
+    def drop_assignment(self, assignment_id):
+        old = self.assignments.pop(assignment_id, None)
+        due = due_ts(old) if old else None
+        if due is not None:
+            _remove(self.due, (due, assignment_id))
+            _remove(self.open, (due, assignment_id))
+
+    def mark_submitted(self, assignment_id):
+        if assignment_id in self.submitted:
+            return
+        self.submitted.add(assignment_id)
+        assignment = self.assignments.get(assignment_id)
+        due = due_ts(assignment) if assignment else None
+        if due is not None:
+            _remove(self.open, (due, assignment_id))
+
+    def set_grade(self, grade):
+        grade = grade or {}
+        self.score = grade.get('current_score')
+        self.letter = grade.get('current_grade') or ''
+
+    #the first assignment due after now, None when nothing is
+    def next_due(self, now):
+        i = bisect_right(self.due, (now, float('inf')))
+        return self.assignments[self.due[i][1]] if i < len(self.due) else None
+
+    #how many assignments are due between start and end
+    def due_between(self, start, end):
+        return bisect_right(self.due, (end, float('inf'))) - bisect_right(self.due, (start, float('inf')))
+
+    #past-due assignments that were never handed in, None while submissions aren't loaded
+    def unsubmitted(self, now):
+        if not self.submissions_known:
+            return None
+        return bisect_right(self.open, (now, float('inf')))
+
+    #(due, assignment) pairs after now, soonest first
+    def upcoming(self, now):
+        for i in range(bisect_right(self.due, (now, float('inf'))), len(self.due)):
+            due, assignment_id = self.due[i]
+            yield due, self.assignments[assignment_id]
+
+
+#(due, i, course, assignment) for a row's upcoming pairs. a function, so each stream
+#keeps its own i and course (a generator expression would see the last row's)
+def _tagged(upcoming, i, course):
+    for due, assignment in upcoming:
+        yield due, i, course, assignment
+
+
+def _remove(rows, row):
+    i = bisect_left(rows, row)
+    if i < len(rows) and rows[i] == row:
+        del rows[i]
+
+
+#the table for one user over the same courses/assignments_cache objects the chatbot and GUI
+#hold, plus the API's submission and grade caches. apply_events is a SyncEngine listener;
+#invalidate marks courses to rebuild on the next read, for changes made by somebody else's
+#engine (the headless service shares assignment lists between users). thread safe
+class CourseStats:
+    def __init__(self, api, courses, assignments_cache):
+        self.api = api
+        self.courses = courses
+        self.assignments_cache = assignments_cache
+        self._rows = {}  # course_id -> CourseSummary
+        self._dirty = set()
+        self._lock = threading.RLock()
+
+    #builds a course's row from the caches, the only place that scans its assignments
+    def _build(self, course):
+        course_id = course.get('id')
+        row = CourseSummary(course)
+        submissions = self.api.submission_cache.get(course_id)
+        row.submissions_known = submissions is not None
+        row.submitted = {s.get('assignment_id') for s in submissions or [] if is_submitted(s)}
+        for assignment in list(self.assignments_cache.get(course_id) or []):
+            row.put_assignment(assignment)
+        self._rows[course_id] = row
+        self._dirty.discard(course_id)
+        return row
+
+    #the grade is read through api.grade_cache on every read, whatever refreshed it
+    #(get_course_grade(refresh=True), a sync refetch) doesn't have to tell the table
+    def _row(self, course):
+        row = self._rows.get(course.get('id'))
+        if row is None or row.course_id in self._dirty or row.course is not course:
+            row = self._build(course)
+        row.set_grade(self.api.grade_cache.get(row.course_id))
+        return row
+
+    def invalidate(self, course_ids=None):
+        with self._lock:
+            if course_ids is None:
+                self._rows.clear()
+            else:
+                self._dirty.update(course_ids)
+
+    #SyncEngine listener, each event touches only the row of its course
+    def apply_events(self, events):
+        with self._lock:
+            for event in events:
+                row = self._rows.get(event.course_id)
+                if row is None or event.course_id in self._dirty:
+                    continue  # built from the caches when it's first read
+                if event.kind == NEW_COURSE:
+                    self._dirty.add(event.course_id)
+                elif event.kind in (NEW_ASSIGNMENT, ASSIGNMENT_UPDATED, DUE_DATE_MOVED):
+                    row.put_assignment(event.item)
+                elif event.kind == ASSIGNMENT_REMOVED:
+                    row.drop_assignment(event.item.get('id'))
+                elif event.kind == GRADE_POSTED or (event.kind == SUBMITTED and is_submitted(event.item)):
+                    row.mark_submitted(event.item.get('assignment_id'))
+
+    #loads the submissions of the courses (default all) that have none cached yet, through
+    #the API's submission cache, and rebuilds their rows. this is network, call it off the
+    #paths that must stay lookups
+    def load_submissions(self, course_ids=None):
+        with self._lock:
+            courses = [c for c in self.courses if course_ids is None or c.get('id') in course_ids]
+        missing = [c.get('id') for c in courses if c.get('id') not in self.api.submission_cache]
+        for course_id in missing:
+            self.api.get_assignment_submissions(course_id)
+        self.invalidate(missing)
+
+    #every course's row, in course order
+    def rows(self):
+        with self._lock:
+            return [self._row(course) for course in self.courses]
+
+    def summary(self, course_id):
+        with self._lock:
+            course = next((c for c in self.courses if c.get('id') == course_id), None)
+            return self._row(course) if course else None
+
+    #courses with a current score as {'course', 'score', 'letter', 'failing'}, in course order
+    def grades(self):
+        return [{'course': row.name, 'score': row.score, 'letter': row.letter, 'failing': row.failing}
+                for row in self.rows() if row.score is not None]
+
+    #the next limit assignments due after now (unix time, default now) over every course,
+    #as (due, course, assignment). merges the courses' sorted due lists, O(courses + limit)
+    def upcoming(self, limit=3, now=None):
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        with self._lock:
+            streams = [_tagged(row.upcoming(now), i, row.course) for i, row in enumerate(self.rows())]
+            merged = heapq.merge(*streams, key=lambda item: item[:2])
+            return [(due, course, assignment) for due, _, course, assignment in islice(merged, limit)]
+
+    #{course_id: (next due assignment, due in the coming week, past due and not handed in)}.
+    #the count is None for a course whose submissions aren't loaded, see load_submissions
+    def due_summary(self, now=None):
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        return {row.course_id: (row.next_due(now), row.due_between(now, now + WEEK_SECONDS), row.unsubmitted(now))
+                for row in self.rows()}
@@ -0,0 +1,83 @@
+# export.py - streaming export of assignments, grades or submissions as JSON lines or CSV
+# used through main.py:  python main.py --export assignments --format csv --base-url ... --token ...
+import csv
+import json
+
+FIELDS = {
+    "assignments": ["course_id", "course_name", "id", "name", "due_at", "points_possible",
+                    "updated_at", "html_url"],
+    "grades": ["course_id", "course_name", "current_score", "current_grade", "final_score", "final_grade"],
+    "submissions": ["course_id", "course_name", "assignment_id", "score", "grade", "submitted_at",
+                    "graded_at", "workflow_state", "late", "missing"],
+}
+
+
+def _course_names(api):
+    return {c.get("id"): c.get("name") for c in api.iter_courses()}
+
+
+#generators of row batches, one batch per API page so the caller can write and
+#flush each page as soon as it arrives
+def assignment_batches(api):
+    for course in api.iter_courses():
+        course_id = course.get("id")
+        for page in api.iter_pages(f"/courses/{course_id}/assignments"):
+            yield [dict({k: a.get(k) for k in FIELDS["assignments"]},
+                        course_id=course_id, course_name=course.get("name")) for a in page]
+
+
+def grade_batches(api):
+    # course names are the only thing kept in memory, one small dict per course
+    names = _course_names(api)
+    for page in api.iter_pages("/users/self/enrollments", params={"type[]": "StudentEnrollment"}):
+        yield [dict({k: (e.get("grades") or {}).get(k) for k in FIELDS["grades"][2:]},
+                    course_id=e.get("course_id"), course_name=names.get(e.get("course_id")))
+               for e in page]
+
+
+def submission_batches(api):
+    user = api.user or api.get_current_user()
+    user_id = user.get("id") if user else None
+    if not user_id:
+        return
+    for course in api.iter_courses():
+        course_id = course.get("id")
+        for page in api.iter_pages(f"/courses/{course_id}/students/submissions",
+                                   params={"student_ids[]": user_id}):
+            yield [dict({k: s.get(k) for k in FIELDS["submissions"]},
+                        course_id=course_id, course_name=course.get("name")) for s in page]
+
+
+BATCHES = {"assignments": assignment_batches, "grades": grade_batches, "submissions": submission_batches}
+
+
+#writes rows of one kind to a file object as JSON lines or CSV
+class RowWriter:
+    def __init__(self, file, fmt, fields):
+        self.file = file
+        self.fmt = fmt
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+            self.csv.writeheader()
+
+    def write_rows(self, rows):
+        if self.csv:
+            self.csv.writerows(rows)
+        else:
+            self.file.writelines(json.dumps(row) + "\n" for row in rows)
+        self.file.flush()
+
+
+#streams one export to the file object, returns how many rows were written.
+#raises RuntimeError if Canvas failed part way (rows written so far stay written)
+def export(api, kind, file, fmt="jsonl"):
+    writer = RowWriter(file, fmt, FIELDS[kind])
+    api.last_error = None
+    count = 0
+    for rows in BATCHES[kind](api):
+        writer.write_rows(rows)
+        count += len(rows)
+    if api.last_error:
+        raise RuntimeError(f"export stopped early: {api.last_error}")
+    return count
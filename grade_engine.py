@@ -0,0 +1,183 @@
+# grade_engine.py - what-if and target grade calculations from a course's assignment groups
+# needs numpy; every question is answered for a whole array of hypothetical scores at once
+import re
+
+import numpy as np
+
+# Canvas' default grading scheme: lowest percentage for each letter
+GRADING_SCHEME = [("A", 94.0), ("A-", 90.0), ("B+", 87.0), ("B", 84.0), ("B-", 80.0), ("C+", 77.0),
+                  ("C", 74.0), ("C-", 70.0), ("D+", 67.0), ("D", 64.0), ("D-", 61.0), ("F", 0.0)]
+
+# hypothetical scores tried per pass: a coarse sweep over 0-100% and a fine one inside
+# the step where the target was crossed, 65 x 65 gives ~0.025% resolution
+SWEEP_STEPS = 65
+
+# words in an assignment phrase that don't name the assignment ("the final", "my lab report")
+FILLER_WORDS = frozenset("the my our and".split())
+
+
+def letter_for(percent):
+    for letter, cutoff in GRADING_SCHEME:
+        if percent >= cutoff:
+            return letter
+    return "F"
+
+
+#"B", "b+", "85", "85%" -> lowest percentage that counts, or None
+def parse_target(text):
+    text = text.strip().rstrip(".?!").upper()
+    number = re.fullmatch(r"(\d+(?:\.\d+)?)\s*%?", text)
+    if number:
+        return float(number.group(1))
+    return dict(GRADING_SCHEME).get(text)
+
+
+#one course's gradebook as arrays, one slot per assignment:
+#  points[a], scores[a] (nan = not graded yet), group[a], never_drop[a]
+#and per group: weights[g], drop_lowest[g], drop_highest[g].
+#grades() takes a (scenarios, assignments) score matrix and returns one course
+#percentage per scenario, following Canvas: ungraded work doesn't count toward
+#the current grade, group percentages are weighted when the course uses weights
+#(rescaled over groups that have graded work) and otherwise all points are pooled.
+#drop rules remove the lowest/highest score percentages in a group, keeping at least one
+class GradeModel:
+    def __init__(self, groups, apply_weights=False):
+        names, points, scores, group, never_drop = [], [], [], [], []
+        self.assignment_ids = []
+        self.group_names = []
+        weights, drop_lowest, drop_highest = [], [], []
+        for g, grp in enumerate(groups):
+            rules = grp.get('rules') or {}
+            never = set(rules.get('never_drop') or [])
+            self.group_names.append(grp.get('name'))
+            weights.append(float(grp.get('group_weight') or 0))
+            drop_lowest.append(int(rules.get('drop_lowest') or 0))
+            drop_highest.append(int(rules.get('drop_highest') or 0))
+            for a in grp.get('assignments') or []:
+                if a.get('omit_from_final_grade') or a.get('points_possible') is None:
+                    continue
+                sub = a.get('submission') or {}
+                score = sub.get('score')
+                excused = sub.get('excused')
+                if excused:
+                    continue  # excused work counts for nothing either way
+                self.assignment_ids.append(a.get('id'))
+                names.append(a.get('name') or "Untitled")
+                points.append(float(a.get('points_possible')))
+                scores.append(np.nan if score is None else float(score))
+                group.append(g)
+                never_drop.append(a.get('id') in never)
+
+        self.names = names
+        self.points = np.array(points, dtype=float)
+        self.scores = np.array(scores, dtype=float)
+        self.group = np.array(group, dtype=int)
+        self.never_drop = np.array(never_drop, dtype=bool)
+        self.weights = np.array(weights, dtype=float)
+        self.drop_lowest = np.array(drop_lowest, dtype=int)
+        self.drop_highest = np.array(drop_highest, dtype=int)
+        self.apply_weights = apply_weights and self.weights.sum() > 0
+        # assignments x groups, sums per group become one matrix product
+        self.membership = np.zeros((len(points), len(groups)))
+        self.membership[np.arange(len(points)), self.group] = 1.0
+
+    @classmethod
+    def from_canvas(cls, data):
+        return cls(data['groups'], data['apply_weights'])
+
+    @property
+    def ungraded(self):
+        return np.flatnonzero(np.isnan(self.scores))
+
+    def current(self):
+        return float(self.grades(self.scores[None, :])[0])
+
+    #course percentage for every row of scores (nan where no graded work counts)
+    def grades(self, scores):
+        scores = np.atleast_2d(scores)
+        counted = ~np.isnan(scores)
+        counted &= ~self._dropped(scores, counted)
+        earned = np.where(counted, scores, 0.0) @ self.membership
+        possible = np.where(counted, self.points, 0.0) @ self.membership
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if self.apply_weights:
+                active = possible > 0
+                share = np.where(active, earned / np.where(active, possible, 1.0), 0.0)
+                weight = np.where(active, self.weights, 0.0)
+                return (share * weight).sum(axis=1) / weight.sum(axis=1) * 100
+            return earned.sum(axis=1) / possible.sum(axis=1) * 100
+
+    #mask of (scenario, assignment) entries removed by the drop rules
+    def _dropped(self, scores, counted):
+        dropped = np.zeros(scores.shape, dtype=bool)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = scores / np.where(self.points > 0, self.points, np.nan)
+        for g in np.flatnonzero((self.drop_lowest > 0) | (self.drop_highest > 0)):
+            cols = np.flatnonzero(self.group == g)
+            droppable = counted[:, cols] & ~self.never_drop[cols] & ~np.isnan(ratio[:, cols])
+            # always keep at least one graded assignment in the group
+            available = np.maximum(droppable.sum(axis=1) - 1, 0)
+            low = np.minimum(self.drop_lowest[g], available)
+            if self.drop_lowest[g]:
+                key = np.where(droppable, ratio[:, cols], np.inf)
+                rank = np.argsort(np.argsort(key, axis=1, kind="stable"), axis=1)
+                dropped[:, cols] |= droppable & (rank < low[:, None])
+            if self.drop_highest[g]:
+                high = np.minimum(self.drop_highest[g], available - low)
+                remaining = droppable & ~dropped[:, cols]
+                key = np.where(remaining, -ratio[:, cols], np.inf)
+                rank = np.argsort(np.argsort(key, axis=1, kind="stable"), axis=1)
+                dropped[:, cols] |= remaining & (rank < high[:, None])
+        return dropped
+
+    #course percentage if the given assignments got these fractions of their points:
+    #fractions is an array of scenarios, each scenario sets the same fraction on all of them
+    def what_if(self, indices, fractions):
+        fractions = np.asarray(fractions, dtype=float)
+        scores = np.repeat(self.scores[None, :], len(fractions), axis=0)
+        scores[:, indices] = fractions[:, None] * self.points[indices]
+        return self.grades(scores)
+
+    #smallest fraction of their points the assignments need (all the same fraction) for
+    #the course to reach target percent. returns (fraction, grade at that fraction),
+    #fraction 0.0 when even zeros reach it and None when even full marks fall short
+    def required(self, indices, target):
+        low, high = 0.0, 1.0
+        for _ in range(2):
+            fractions = np.linspace(low, high, SWEEP_STEPS)
+            results = self.what_if(indices, fractions)
+            reached = np.flatnonzero(results >= target - 1e-9)
+            if len(reached) == 0:
+                return None, float(results[-1])
+            first = reached[0]
+            if first == 0:
+                break
+            # the course grade only goes up with the score, so the answer is in this step
+            low, high = fractions[first - 1], fractions[first]
+        return float(fractions[first]), float(results[first])
+
+    #every assignment whose name has all the words in text, best first: work that's still
+    #open, then the one worth the most points. numbers have to match too ("quiz 3" never
+    #picks Quiz 6 or Homework 3) and "final exam" never picks Exam 2. a name that is
+    #exactly the words in text wins alone, so "exam 2" isn't also "Exam 2 Corrections"
+    def find_assignments(self, text):
+        words = {w for w in re.findall(r"[a-z0-9]+", text.lower())
+                 if (len(w) > 2 and w not in FILLER_WORDS) or w.isdigit()}
+        if not words:
+            return []
+        matches, exact = [], []
+        for i in range(len(self.names)):
+            name_words = set(re.findall(r"[a-z0-9]+", self.names[i].lower()))
+            if not all(w in name_words or (w.endswith("s") and w[:-1] in name_words) for w in words):
+                continue
+            matches.append(i)
+            if len(name_words) == len(words):
+                exact.append(i)
+        if len(exact) == 1:
+            return exact
+        return sorted(matches, key=lambda i: (not np.isnan(self.scores[i]), -self.points[i]))
+
+    #the one assignment text names, None when no name or more than one has all its words
+    def find_assignment(self, text):
+        matches = self.find_assignments(text)
+        return matches[0] if len(matches) == 1 else None
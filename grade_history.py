@@ -0,0 +1,182 @@
+# grade_history.py - append-only time series of every course grade and submission score the app sees
+# needs numpy; each course is three column files (time, item, score) that are only ever appended
+# to, in time order, and memory-mapped for the trend queries
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+from sync_engine import COURSE_GRADE_CHANGED, GRADE_POSTED
+from utils import app_data_dir
+
+COURSE_GRADE = 0  # item id the course's current score is stored under, others are assignment ids
+
+# 16 bytes a row. seconds since the epoch fit uint32 until 2106
+COLUMNS = (("ts", np.uint32), ("item", np.int64), ("score", np.float32))
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+#one history folder per Canvas instance and user, like the reminder database
+def history_dir(base_url, user_id):
+    key = hashlib.sha256(f"{base_url.rstrip('/')}\n{user_id}".encode()).hexdigest()[:32]
+    return os.path.join(app_data_dir(), f"history-{key}")
+
+
+#unicode bar chart of values squeezed into width characters (the last value of each
+#bucket), scaled between their own min and max
+def sparkline(values, width=12):
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return ""
+    if len(values) > width:
+        values = values[np.linspace(0, len(values) - 1, width).round().astype(int)]
+    low, high = values.min(), values.max()
+    if high - low < 1e-9:
+        return SPARK_CHARS[3] * len(values)
+    levels = ((values - low) / (high - low) * (len(SPARK_CHARS) - 1)).round().astype(int)
+    return "".join(SPARK_CHARS[i] for i in levels)
+
+
+#writes only happen when a score differs from the last one stored for that item, so
+#a sync every five minutes adds nothing until a grade actually changes
+class GradeHistory:
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self._maps = {}  # course_id -> (ts, item, score) memory-mapped columns
+        self._last = {}  # course_id -> {item: last stored score}
+        self._lock = threading.Lock()
+
+    def _path(self, course_id, column):
+        return os.path.join(self.folder, f"{course_id}.{column}")
+
+    def courses(self):
+        return sorted({int(name.split(".")[0]) for name in os.listdir(self.folder) if name.endswith(".ts")})
+
+    #appends the (item, score) pairs that changed, all stamped with when (default now).
+    #returns how many rows were written
+    def record_many(self, course_id, rows, when=None):
+        stamp = int(when if when is not None else time.time())
+        with self._lock:
+            last = self._last_scores(course_id)
+            changed = {}
+            for item, score in rows:
+                if score is None:
+                    continue
+                score = float(np.float32(score))
+                if last.get(item) != score:
+                    changed[item] = score
+            if not changed:
+                return 0
+            ts, _, _ = self._columns(course_id)
+            # keep the file sorted by time even if the clock stepped back
+            stamp = max(stamp, int(ts[-1])) if len(ts) else stamp
+            values = {"ts": np.full(len(changed), stamp), "item": list(changed), "score": list(changed.values())}
+            for column, dtype in COLUMNS:
+                with open(self._path(course_id, column), "ab") as f:
+                    f.write(np.asarray(values[column], dtype=dtype).tobytes())
+            last.update(changed)
+            self._maps.pop(course_id, None)
+            return len(changed)
+
+    def record(self, course_id, item, score, when=None):
+        return self.record_many(course_id, [(item, score)], when)
+
+    #course_id -> enrollment grades dict, as CanvasAPI.grade_cache holds them
+    def record_grades(self, grades, when=None):
+        for course_id, grade in grades.items():
+            if grade:
+                self.record(course_id, COURSE_GRADE, grade.get('current_score'), when)
+
+    #SyncEngine listener: new course grades and newly graded submissions
+    def record_events(self, events):
+        for event in events:
+            if event.kind == COURSE_GRADE_CHANGED and event.new:
+                self.record(event.course_id, COURSE_GRADE, event.new.get('current_score'))
+            elif event.kind == GRADE_POSTED:
+                self.record(event.course_id, event.item.get('assignment_id'), event.new)
+
+    #(times, scores) of one item since the unix time `since` (all of it when None),
+    #plus the last value before since so a change can be measured from it
+    def series(self, course_id, item=COURSE_GRADE, since=None):
+        with self._lock:
+            ts, items, scores = self._columns(course_id)
+        mask = items == item
+        ts, scores = ts[mask], scores[mask]
+        if since is not None:
+            start = max(int(np.searchsorted(ts, since)) - 1, 0)
+            ts, scores = ts[start:], scores[start:]
+        return ts.astype(np.int64), scores.astype(float)
+
+    #(first score, last score, first time, last time) of the course grade over the period,
+    #None when there's nothing stored
+    def change(self, course_id, since=None):
+        ts, scores = self.series(course_id, COURSE_GRADE, since)
+        if not len(ts):
+            return None
+        return float(scores[0]), float(scores[-1]), int(ts[0]), int(ts[-1])
+
+    #the largest peak-to-trough fall of a course grade since `since`, over the given
+    #courses (default all) as (course_id, peak, trough, peak time, trough time), None if no grade fell
+    def biggest_drop(self, since=None, course_ids=None):
+        best = None
+        for course_id in course_ids if course_ids is not None else self.courses():
+            ts, scores = self.series(course_id, COURSE_GRADE, since)
+            if len(scores) < 2:
+                continue
+            peaks = np.maximum.accumulate(scores)
+            fall = peaks - scores
+            trough = int(fall.argmax())
+            if fall[trough] <= 0 or (best is not None and fall[trough] <= best[1] - best[2]):
+                continue
+            peak = int(np.flatnonzero(scores[:trough + 1] == peaks[trough])[-1])
+            best = (course_id, float(scores[peak]), float(scores[trough]), int(ts[peak]), int(ts[trough]))
+        return best
+
+    def size_bytes(self):
+        return sum(os.path.getsize(os.path.join(self.folder, name)) for name in os.listdir(self.folder))
+
+    def close(self):
+        with self._lock:
+            self._maps.clear()
+
+    #the columns of a course, memory-mapped and cut to the rows every column has
+    def _columns(self, course_id):
+        cached = self._maps.get(course_id)
+        if cached is not None:
+            return cached
+        columns = []
+        for column, dtype in COLUMNS:
+            path = self._path(course_id, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            rows = size // np.dtype(dtype).itemsize
+            columns.append(np.memmap(path, dtype=dtype, mode="r", shape=(rows,)) if rows
+                           else np.empty(0, dtype=dtype))
+        rows = min(len(c) for c in columns)
+        cached = tuple(c[:rows] for c in columns)
+        self._maps[course_id] = cached
+        return cached
+
+    #last score per item, read once per course before its first write. a write cut short
+    #by a crash leaves the columns at different lengths, they are trimmed back in step here
+    def _last_scores(self, course_id):
+        last = self._last.get(course_id)
+        if last is not None:
+            return last
+        ts, items, scores = self._columns(course_id)
+        # the last occurrence of every item is the first one in the reversed column
+        unique, first = np.unique(items[::-1], return_index=True)
+        last = {int(item): float(scores[::-1][i]) for item, i in zip(unique, first)}
+        rows = len(ts)
+        del ts, items, scores
+        for column, dtype in COLUMNS:
+            path = self._path(course_id, column)
+            if os.path.exists(path) and os.path.getsize(path) != rows * np.dtype(dtype).itemsize:
+                self._maps.pop(course_id, None)  # unmapped before the file shrinks
+                with open(path, "r+b") as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+        self._last[course_id] = last
+        return last
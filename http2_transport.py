@@ -0,0 +1,38 @@
+# http2_transport.py - optional HTTP/2 transport for CanvasAPI: every concurrent request to a Canvas
+# host is multiplexed over one connection instead of taking an HTTP/1.1 connection each
+# needs httpx with HTTP/2 support (pip install "httpx[http2]"), Canvas_api falls back to requests without it
+import h2  # noqa: F401 - httpx only fails on the first HTTP/2 request without it, fail at import instead
+import httpx
+import requests
+
+
+#stands in for requests.Session in CanvasAPI._request. plain http:// URLs (the mock Canvas)
+#use HTTP/2 with prior knowledge, https negotiates it through TLS ALPN and falls back to
+#HTTP/1.1 when the server doesn't offer it. httpx responses read like requests ones
+#(status_code, headers, text, json(), links), errors are raised as the requests exceptions
+#the callers already handle. like requests, redirects are followed. a body that isn't JSON
+#makes json() raise a plain ValueError, which CanvasAPI catches next to RequestException
+class Http2Session:
+    def __init__(self, base_url, pool_size=10):
+        prior_knowledge = base_url.startswith("http://")
+        self.client = httpx.Client(http2=True, http1=not prior_knowledge, follow_redirects=True,
+                                   limits=httpx.Limits(max_connections=pool_size,
+                                                       max_keepalive_connections=pool_size))
+
+    def request(self, method, url, params=None, headers=None, json=None, data=None, timeout=None):
+        if isinstance(params, dict):
+            # requests leaves out parameters that are None, httpx would send them empty
+            params = {k: v for k, v in params.items() if v is not None}
+        try:
+            resp = self.client.request(method, url, params=params, headers=headers, json=json, data=data,
+                                       timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except (httpx.NetworkError, httpx.RemoteProtocolError) as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(str(e)) from e
+        return resp
+
+    def close(self):
+        self.client.close()
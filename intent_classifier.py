@@ -0,0 +1,267 @@
+# intent_classifier.py - TF-IDF + linear model intent classifier for the chatbot, trained offline
+# needs numpy only: features are a hand-rolled CSR matrix, scoring a batch is one sparse x dense product
+import math
+import re
+
+import numpy as np
+
+INTENTS = ("assignments", "grades", "courses", "help", "whatif", "missing", "search", "trend", "unknown")
+
+# below this softmax probability the chatbot falls back to its keyword rules
+MIN_CONFIDENCE = 0.4
+
+# training: full-batch gradient descent on softmax cross-entropy with L2
+EPOCHS = 300
+LEARNING_RATE = 2.0
+L2 = 1e-4
+
+# fills {course} in the examples, so a subject name ends up with no pull toward any intent
+SAMPLE_COURSES = ["biology", "calculus", "chem 210", "english lit", "world history", "psych", "stats",
+                  "spanish 2"]
+
+# the bundled labeled set, written as students actually phrase things
+EXAMPLES = {
+    "assignments": [
+        "what assignments are due this week", "what's due tomorrow", "what homework do I have",
+        "anything due today", "what do I have due for {course}", "when is the next assignment due",
+        "what's next", "what's coming up", "upcoming deadlines", "show my assignments",
+        "do I have homework tonight", "what do I need to turn in this week", "what should I work on",
+        "list my homework for {course}", "when is {course} homework due", "is anything due soon",
+        "what's due in {course} this week", "deadlines this week", "any assignments due tomorrow",
+        "what do I have to submit", "hw due today", "what's on my plate this week",
+        "do I have anything due for {course} tomorrow", "next deadline", "what work is due",
+        "when do I have to submit the {course} assignment", "what's due next week",
+        "what homework is due for {course}", "what do i need to do for homework",
+        "what's the next thing due in {course}", "what is due", "show upcoming work",
+        "any quizzes coming up", "when is my next quiz", "what's due before friday",
+        "what changed in my assignments", "did any due dates change", "what's new in {course}",
+        "which deadlines changed this week", "what's due this fall", "is anything due before fall break",
+    ],
+    "grades": [
+        "what's my grade in {course}", "how are my grades", "what's my lowest grade",
+        "what is my best score", "am I passing all my classes", "am I failing anything",
+        "how am I doing in class", "how am I doing in {course}", "what's my gpa",
+        "show my grades", "what percent do I have in {course}", "my current score in {course}",
+        "which class is my worst", "what's my highest grade", "am I passing {course}",
+        "how's my performance this semester", "grade overview", "what did I get in {course}",
+        "how well am I doing", "am I failing {course}", "what are my scores",
+        "which course has my best grade", "what's my standing in {course}", "how bad are my grades",
+        "check my grades", "what letter grade do I have in {course}", "how am I doing overall",
+        "am I doing ok in my classes", "where do my grades stand", "what's my average",
+        "give me my grades", "report card", "how am I doing in all my courses",
+        # finding or changing things is not a trend question without a change in grades
+        "find my grade in {course}", "look up my score in {course}",
+    ],
+    "courses": [
+        "what classes am I taking", "list the courses I'm enrolled in", "what courses do I have",
+        "which classes am I in", "show my courses", "how many classes am I taking",
+        "what am I enrolled in", "my class list", "what's my schedule this semester",
+        "course list", "which courses am I registered for", "what subjects am I taking",
+        "tell me about my courses", "what classes do I have this term", "am I enrolled in {course}",
+        "how many courses do I have", "list my classes", "show enrolled courses",
+        "which courses are on my canvas", "what am I taking this semester",
+    ],
+    "help": [
+        "help", "what can you do", "how do I use this", "can you help me", "what can I ask you",
+        "what questions can you answer", "how does this work", "show me what you can do",
+        "i need help", "what are your features", "how do i ask about grades", "help me out",
+        "what kind of things can you answer", "instructions", "can you explain how to use you",
+        "what commands are there", "options",
+    ],
+    "whatif": [
+        "what do I need on exam 2 to get a b in {course}", "what do I need to get an a- in {course}",
+        "what if I get 85% on exam 2 in {course}", "what if i got a b+ on the final",
+        "what do i need on the final to pass {course}", "what score do I need to keep an a",
+        "what if I score 45/50 on lab 3", "how much do I need on the final to get a c",
+        "what do I need to pass {course}", "what grade do I need on the project to get a b",
+        "if I get 70 on the midterm what's my grade", "what do i need for an a in {course}",
+        "what if I fail the final in {course}", "can I still get an a in {course}",
+        "what would my grade be if I got 90% on the next quiz", "is an a still possible in {course}",
+        "what do I need on the rest of my work to finish with 80%", "what if I get 100 on the final",
+        "minimum score on the exam to keep a b", "what do I need to end up with a b- in {course}",
+        "how low can I score on the final and still pass", "what if i got 8 points on homework 5",
+        "what would happen if I bombed the final", "grade calculator for {course}",
+        "what do I need on quiz 4 to get a c+",
+    ],
+    "missing": [
+        "what am I missing", "do I have overdue work in {course}", "what haven't I submitted",
+        "any missing assignments", "what did I forget to turn in", "show my late work",
+        "what's past due", "did I miss anything", "missing work in {course}", "what's overdue",
+        "anything I didn't submit", "list missing assignments", "what have I not turned in",
+        "am I behind on anything", "what assignments did I skip", "do I owe anything in {course}",
+        "what's late", "unsubmitted work", "what did I miss in {course}", "overdue homework",
+    ],
+    "search": [
+        "which assignment was about enzymes", "find the assignment on thermodynamics",
+        "search {course} for sorting algorithms", "which homework covered recursion",
+        "look up the lab report on photosynthesis", "find the essay about the french revolution",
+        "which assignment is the one on supply and demand", "where is the project on plate tectonics",
+        "search for cell division", "find anything about probability", "which lab was on titration",
+        "look for the reading response about the cold war", "find the assignment called final project",
+        "which quiz covered linear regression", "search assignments for poetry",
+        "find the {course} assignment on market equilibrium", "where's the essay about the civil war",
+        "which one was about organic compounds", "is there an assignment about stacks",
+        "find the homework with the derivatives problems",
+    ],
+    "trend": [
+        "how has my grade in {course} changed this month", "what was my biggest drop",
+        "is my grade going up in {course}", "show my grade history", "how have my grades changed",
+        "grade trend for {course}", "has my {course} grade improved", "which class dropped the most",
+        "how did my grades change this semester", "is my grade going down", "how has {course} gone over time",
+        "did my grade in {course} drop this week", "compare my grades to last month",
+        "how much did my {course} grade change", "when did my grade drop", "am I improving in {course}",
+        "trend of my grades this term", "biggest grade drop this month", "are my scores trending down",
+    ],
+    "unknown": [
+        "tell me a joke", "hello", "hi there", "thanks", "thank you", "what's the weather",
+        "who are you", "good morning", "lol", "ok", "cool", "what time is it", "i'm bored",
+        "nice", "bye", "what's your name", "are you a robot", "play some music",
+        "how old are you", "what's for lunch",
+        # bare follow-ups carry no intent of their own, the conversation supplies it
+        "what about {course}", "how about {course}", "and {course}", "what about {course} then",
+        "and for {course}", "what about all my classes", "how about everything",
+    ],
+}
+
+_WORD = re.compile(r"[a-z0-9]+(?:[+-](?![a-z0-9]))?|%")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+#lowercased words with apostrophes dropped and every number turned into "0",
+#so "exam 2" and "exam 3" are the same feature. letter grades keep their +/-
+def words(text):
+    text = _NUMBER.sub("0", text.lower().replace("'", "").replace("’", ""))
+    return _WORD.findall(text)
+
+
+#unigrams and bigrams
+def features(text):
+    w = words(text)
+    return w + [f"{a} {b}" for a, b in zip(w, w[1:])]
+
+
+#(text, intent) pairs from EXAMPLES with {course} filled in, cycling through SAMPLE_COURSES
+def training_examples():
+    examples = []
+    for intent, texts in EXAMPLES.items():
+        for i, text in enumerate(texts):
+            examples.append((text.format(course=SAMPLE_COURSES[i % len(SAMPLE_COURSES)]), intent))
+    return examples
+
+
+#compressed sparse rows: row r has values data[indptr[r]:indptr[r+1]] in columns indices[...]
+class CSRMatrix:
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+
+    #self @ dense: every stored value times its column's row of dense, summed per row.
+    #a prefix sum over the products makes the per-row sums two gathers, empty rows included
+    def dot(self, dense):
+        products = self.data[:, None] * dense[self.indices]
+        totals = np.zeros((len(products) + 1, dense.shape[1]))
+        np.cumsum(products, axis=0, out=totals[1:])
+        return totals[self.indptr[1:]] - totals[self.indptr[:-1]]
+
+    #self.T @ dense, for the training gradient
+    def tdot(self, dense):
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        products = self.data[:, None] * dense[rows]
+        return np.stack([np.bincount(self.indices, weights=products[:, c], minlength=self.shape[1])
+                         for c in range(dense.shape[1])], axis=1)
+
+
+#multinomial logistic regression on sublinear, L2-normalised TF-IDF features
+class IntentClassifier:
+    def __init__(self, min_confidence=MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self.vocabulary = {}
+        self.idf = None
+        self.weights = None  # (features, intents)
+        self.bias = None
+        self.labels = INTENTS
+
+    def fit(self, examples, epochs=EPOCHS, learning_rate=LEARNING_RATE, l2=L2):
+        texts = [text for text, _ in examples]
+        self.labels = tuple(intent for intent in INTENTS if any(label == intent for _, label in examples))
+        document_frequency = {}
+        for text in texts:
+            for feature in set(features(text)):
+                document_frequency[feature] = document_frequency.get(feature, 0) + 1
+        self.vocabulary = {feature: i for i, feature in enumerate(sorted(document_frequency))}
+        self.idf = np.array([math.log((1 + len(texts)) / (1 + document_frequency[f])) + 1
+                             for f in sorted(document_frequency)])
+
+        x = self.transform(texts)
+        y = np.zeros((len(texts), len(self.labels)))
+        y[np.arange(len(texts)), [self.labels.index(label) for _, label in examples]] = 1.0
+        self.weights = np.zeros((len(self.vocabulary), len(self.labels)))
+        self.bias = np.zeros(len(self.labels))
+        for _ in range(epochs):
+            error = (self._softmax(x.dot(self.weights) + self.bias) - y) / len(texts)
+            self.weights -= learning_rate * (x.tdot(error) + l2 * self.weights)
+            self.bias -= learning_rate * error.sum(axis=0)
+        return self
+
+    #texts -> CSRMatrix of TF-IDF rows, features outside the vocabulary are dropped
+    def transform(self, texts):
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            counts = {}
+            for feature in features(text):
+                column = self.vocabulary.get(feature)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            row = [(column, (1 + math.log(tf)) * self.idf[column]) for column, tf in counts.items()]
+            norm = math.sqrt(sum(v * v for _, v in row)) or 1.0
+            indices.extend(column for column, _ in row)
+            data.extend(v / norm for _, v in row)
+            indptr.append(len(indices))
+        return CSRMatrix(np.array(indptr), np.array(indices, dtype=np.intp), np.array(data, dtype=float),
+                         (len(texts), len(self.vocabulary)))
+
+    #(len(texts), len(labels)) probabilities, the whole batch in one sparse product
+    def predict_proba(self, texts):
+        return self._softmax(self.transform(texts).dot(self.weights) + self.bias)
+
+    #[(intent, confidence)] for every text
+    def classify_batch(self, texts):
+        if not texts:
+            return []
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[i], float(p[i])) for i, p in zip(best, probabilities)]
+
+    def classify(self, text):
+        return self.classify_batch([text])[0]
+
+    @staticmethod
+    def _softmax(scores):
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+
+#k-fold accuracy of a classifier trained on the rest of the examples each time
+def cross_validate(examples, folds=5, seed=0):
+    order = np.random.default_rng(seed).permutation(len(examples))
+    correct = 0
+    for k in range(folds):
+        held_out = set(order[k::folds].tolist())
+        model = IntentClassifier().fit([e for i, e in enumerate(examples) if i not in held_out])
+        tests = [examples[i] for i in sorted(held_out)]
+        predicted = model.classify_batch([text for text, _ in tests])
+        correct += sum(1 for (intent, _), (_, label) in zip(predicted, tests) if intent == label)
+    return correct / len(examples)
+
+
+_default = None
+
+
+#the classifier trained on the bundled examples, trained once per process (~0.1 s)
+def default_classifier():
+    global _default
+    if _default is None:
+        _default = IntentClassifier().fit(training_examples())
+    return _default
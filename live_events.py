@@ -0,0 +1,283 @@
+# live_events.py - applies Canvas Live Events (pushed over a webhook or a queue) to the loaded data,
+# so a change shows up without polling every course of every user
+# events are deduplicated, held for a short reorder window and applied in event time order.
+# only when an event shows that an earlier one never arrived, or the numbering of a course's
+# events skips one, is anything fetched from Canvas, and then only for that course
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+from sync_engine import ASSIGNMENT_REMOVED, ASSIGNMENT_UPDATED, DUE_DATE_MOVED, NEW_ASSIGNMENT
+
+ASSIGNMENT_CREATED_EVENT = "assignment_created"
+ASSIGNMENT_UPDATED_EVENT = "assignment_updated"
+SUBMISSION_CREATED_EVENT = "submission_created"
+SUBMISSION_UPDATED_EVENT = "submission_updated"
+GRADE_CHANGE_EVENT = "grade_change"
+COURSE_GRADE_CHANGE_EVENT = "course_grade_change"
+SUPPORTED_EVENTS = (ASSIGNMENT_CREATED_EVENT, ASSIGNMENT_UPDATED_EVENT, SUBMISSION_CREATED_EVENT,
+                    SUBMISSION_UPDATED_EVENT, GRADE_CHANGE_EVENT, COURSE_GRADE_CHANGE_EVENT)
+# about one user, the rest are about a course and go to everyone enrolled in it
+USER_EVENTS = (SUBMISSION_CREATED_EVENT, SUBMISSION_UPDATED_EVENT, GRADE_CHANGE_EVENT, COURSE_GRADE_CHANGE_EVENT)
+# ChangeEvent kinds that change assignment definitions (and so the chatbot's search index)
+ASSIGNMENT_CHANGES = (NEW_ASSIGNMENT, ASSIGNMENT_UPDATED, DUE_DATE_MOVED, ASSIGNMENT_REMOVED)
+
+DEFAULT_REORDER_WINDOW = 2.0  # seconds an event waits for earlier ones that are still on the way
+DEFAULT_MAX_SEEN = 50000  # event ids remembered for deduplication
+
+# an event as the consumer uses it. time is unix seconds, key identifies it for dedup
+LiveEvent = namedtuple("LiveEvent", "name time key course_id user_id body")
+
+
+#Canvas sends ids as strings, the REST data the app holds has ints
+def _id(value):
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
+
+
+def _ts(iso):
+    try:
+        return datetime.fromisoformat(iso.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+#the LiveEvent for one raw Canvas event ({"metadata": ..., "body": ...}), None when it
+#isn't one this app uses or is missing what it needs
+def parse_event(raw):
+    if not isinstance(raw, dict):
+        return None
+    metadata, body = raw.get('metadata') or {}, raw.get('body') or {}
+    name = metadata.get('event_name')
+    when = _ts(metadata.get('event_time'))
+    if name not in SUPPORTED_EVENTS or when is None:
+        return None
+    course_id = body.get('course_id')
+    if course_id is None and body.get('context_type') == 'Course':
+        course_id = body.get('context_id')
+    if course_id is None and metadata.get('context_type') == 'Course':
+        course_id = metadata.get('context_id')
+    if course_id is None:
+        return None
+    key = metadata.get('event_id')
+    if key is None:
+        key = hashlib.blake2b(json.dumps(raw, sort_keys=True).encode(), digest_size=16).hexdigest()
+    return LiveEvent(name, when, key, _id(course_id), _id(body.get('user_id') or metadata.get('user_id')), body)
+
+
+#the Canvas host an event came from, to find the users it may be for
+def event_host(raw):
+    return ((raw.get('metadata') or {}).get('hostname') or "").lower() if isinstance(raw, dict) else ""
+
+
+#(stream, number) of an event whose producer numbers them, e.g. a queue bridge that counts
+#the events of every course. Canvas itself doesn't, such events are None and skip the check
+def event_sequence(raw):
+    metadata = (raw.get('metadata') or {}) if isinstance(raw, dict) else {}
+    if metadata.get('sequence') is None:
+        return None
+    return ((metadata.get('hostname') or "").lower(), _id(metadata.get('context_id'))), int(metadata['sequence'])
+
+
+#finds the numbers missing from numbered event streams. a hole that is still open after
+#the reorder window is a lost event, gaps() reports its stream once and moves past it.
+#this sees every event of a stream, before they are split up by user
+class SequenceTracker:
+    def __init__(self, reorder_window=DEFAULT_REORDER_WINDOW, clock=time.monotonic):
+        self.reorder_window = reorder_window
+        self.clock = clock
+        self._streams = {}  # stream -> [next number expected, numbers seen past it, hole opened at]
+        self._lock = threading.Lock()
+
+    def see(self, stream, number):
+        with self._lock:
+            state = self._streams.get(stream)
+            if state is None:
+                state = self._streams[stream] = [number, set(), None]
+            if number < state[0]:
+                return  # a duplicate, or late for a hole already given up on
+            state[1].add(number)
+            self._advance(state)
+
+    def _advance(self, state):
+        while state[0] in state[1]:
+            state[1].discard(state[0])
+            state[0] += 1
+        if not state[1]:
+            state[2] = None
+        elif state[2] is None:
+            state[2] = self.clock()
+
+    #streams with a number that didn't arrive within the reorder window
+    def gaps(self):
+        cutoff = self.clock() - self.reorder_window
+        lost = []
+        with self._lock:
+            for stream, state in self._streams.items():
+                if state[2] is not None and state[2] <= cutoff:
+                    lost.append(stream)
+                    state[0], state[2] = min(state[1]), None
+                    self._advance(state)
+        return lost
+
+
+#takes raw events for one user (from any thread), then applies them through the user's
+#SyncEngine, so the listeners (GUI, reminders, grade history, ...) see them like a poll's
+class LiveEventConsumer:
+    def __init__(self, engine, user_id=None, reorder_window=DEFAULT_REORDER_WINDOW,
+                 max_seen=DEFAULT_MAX_SEEN, clock=time.monotonic):
+        self.engine = engine
+        self.user_id = _id(user_id)
+        self.reorder_window = reorder_window
+        self.max_seen = max_seen
+        self.clock = clock
+        self.stats = Counter()
+        self._pending = []  # (arrived, LiveEvent)
+        self._seen = OrderedDict()  # event keys, oldest first
+        self._applied = {}  # (kind, course_id, item id) -> time of the last event applied to it
+        self._lost = set()  # courses to fetch again, see mark_gap
+        self._lock = threading.Lock()
+
+    def pending(self):
+        return len(self._pending) + len(self._lost)
+
+    #a course lost events (SequenceTracker.gaps), its data is fetched again on the next flush
+    def mark_gap(self, course_id):
+        with self._lock:
+            self._lost.add(course_id)
+
+    #queues one raw event, returns False when it was a duplicate or isn't for this user
+    def submit(self, raw):
+        event = parse_event(raw)
+        self.stats['received'] += 1
+        if event is None or not self._wants(event):
+            self.stats['ignored'] += 1
+            return False
+        with self._lock:
+            if event.key in self._seen:
+                self.stats['duplicates'] += 1
+                return False
+            self._seen[event.key] = None
+            while len(self._seen) > self.max_seen:
+                self._seen.popitem(last=False)
+            self._pending.append((self.clock(), event))
+        return True
+
+    def _wants(self, event):
+        if event.name in USER_EVENTS and self.user_id is not None and event.user_id != self.user_id:
+            return False
+        return any(c.get('id') == event.course_id for c in self.engine.courses)
+
+    #applies every event that has waited out the reorder window (all of them when force),
+    #oldest event time first, then runs whatever re-fetches the gaps call for.
+    #returns the ChangeEvents
+    def flush(self, force=False):
+        cutoff = self.clock() - self.reorder_window
+        with self._lock:
+            due = [e for arrived, e in self._pending if force or arrived <= cutoff]
+            self._pending = [(arrived, e) for arrived, e in self._pending if not (force or arrived <= cutoff)]
+            lost, self._lost = self._lost, set()
+        due.sort(key=lambda e: e.time)
+
+        gaps = {('course', course_id) for course_id in lost}
+        changes = self.engine.apply_changes(lambda: self._apply(due, gaps)) if due else []
+        for gap in sorted(gaps, key=repr):
+            if gap[0] != 'course' and ('course', gap[1]) in gaps:
+                continue  # the whole course is fetched anyway
+            self.stats['refetches'] += 1
+            if gap[0] == 'course':
+                changes += self.engine.refetch_course(gap[1])
+            elif gap[0] == 'assignments':
+                changes += self.engine.refetch_assignments(gap[1])
+            elif gap[0] == 'submission':
+                changes += self.engine.refetch_submission(gap[1], gap[2])
+            else:
+                changes += self.engine.refetch_course_grade(gap[1])
+        return changes
+
+    # runs inside SyncEngine.apply_changes, collects what has to be fetched in gaps
+    def _apply(self, events, gaps):
+        changes = []
+        for event in events:
+            body, course_id = event.body, event.course_id
+            entity = self._entity(event)
+            if self._applied.get(entity, float("-inf")) > event.time:
+                self.stats['stale'] += 1
+                continue  # something newer about it was applied already
+            self._applied[entity] = event.time
+            self.stats['applied'] += 1
+
+            if event.name in (ASSIGNMENT_CREATED_EVENT, ASSIGNMENT_UPDATED_EVENT):
+                changes += self.engine.apply_assignment(course_id, self._assignment(event),
+                                                        removed=body.get('workflow_state') == 'deleted')
+                continue
+
+            if event.name == COURSE_GRADE_CHANGE_EVENT:
+                held = (self.engine.api.grade_cache.get(course_id) or {}).get('current_score')
+                if 'old_current_score' in body and not _same(held, body.get('old_current_score')):
+                    gaps.add(('grade', course_id))
+                grade = {k: body[k] for k in ('current_score', 'final_score', 'current_grade', 'final_grade')
+                         if k in body}
+                if 'current_grade' not in grade:
+                    # Canvas doesn't send letter grades with this event, the letter is fetched
+                    gaps.add(('grade', course_id))
+                changes += self.engine.apply_course_grade(course_id, grade)
+                continue
+
+            assignment_id = _id(body.get('assignment_id'))
+            if not any(a.get('id') == assignment_id for a in self.engine.assignments_cache.get(course_id) or []):
+                gaps.add(('assignments', course_id))
+            submission = self._submission(event)
+            if event.name == GRADE_CHANGE_EVENT:
+                held = next((s.get('score') for s in self.engine.api.submission_cache.get(course_id) or []
+                             if s.get('assignment_id') == assignment_id), None)
+                if 'old_score' in body and not _same(held, body.get('old_score')):
+                    gaps.add(('submission', course_id, assignment_id))
+                submission.update(workflow_state='graded', graded_at=submission.get('graded_at') or _iso(event.time))
+                changes += self.engine.apply_grade(course_id, submission)
+            else:
+                changes += self.engine.apply_submission(course_id, submission)
+        return changes
+
+    @staticmethod
+    def _entity(event):
+        if event.name in (ASSIGNMENT_CREATED_EVENT, ASSIGNMENT_UPDATED_EVENT):
+            return ('assignment', event.course_id, _id(event.body.get('assignment_id')))
+        if event.name == COURSE_GRADE_CHANGE_EVENT:
+            return ('grade', event.course_id)
+        return ('submission', event.course_id, _id(event.body.get('assignment_id')))
+
+    # the event body in the shape of the REST assignment the app holds
+    @staticmethod
+    def _assignment(event):
+        body = event.body
+        fields = {'name': 'title', 'due_at': 'due_at', 'points_possible': 'points_possible',
+                  'updated_at': 'updated_at', 'description': 'description', 'html_url': 'html_url'}
+        assignment = {'id': _id(body.get('assignment_id')), 'course_id': event.course_id}
+        assignment.update({field: body[key] for field, key in fields.items() if key in body})
+        return assignment
+
+    @staticmethod
+    def _submission(event):
+        body = event.body
+        submission = {'assignment_id': _id(body.get('assignment_id')), 'user_id': event.user_id}
+        if body.get('submission_id') is not None:
+            submission['id'] = _id(body['submission_id'])
+        for key in ('score', 'grade', 'submitted_at', 'graded_at', 'workflow_state', 'late', 'missing'):
+            if key in body:
+                submission[key] = body[key]
+        return submission
+
+
+def _same(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    return abs(float(a) - float(b)) < 1e-6
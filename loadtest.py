@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# loadtest.py - load test for service.py against the local mock Canvas, prints p50/p99 latency
+# run: python loadtest.py --tenants 50 --concurrency 200 --requests 5000
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from course_stats import due_ts
+from mock_canvas import LiveEventProducer, start_mock_canvas, build_fixtures
+from service import ChatbotService
+
+QUERIES = [
+    "What's due this week?",
+    "What assignments are due tomorrow?",
+    "What's my lowest grade?",
+    "Am I passing all my classes?",
+    "What courses am I taking?",
+    "Show assignments for Biology",
+    "help",
+]
+
+
+# one keep-alive connection that sends requests one after another
+async def _client(host, port, jobs, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                body = jobs.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            payload = json.dumps(body).encode()
+            started = time.perf_counter()
+            writer.write(b"POST /query HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                         + f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_load(host, port, canvas_url, tenants, concurrency, total):
+    jobs = asyncio.Queue()
+    for i in range(total):
+        jobs.put_nowait({"base_url": canvas_url, "token": f"token-{i % tenants}",
+                         "query": QUERIES[i % len(QUERIES)]})
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*[_client(host, port, jobs, latencies, errors) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies), "errors": len(errors), "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+
+#how many of a tenant's assignments, scores and course grades (and summary rows) differ from the mock's
+def _stale_values(tenant, fixtures):
+    stale = 0
+    for course in fixtures['courses']:
+        course_id = course['id']
+        held = {a['id']: (a.get('name'), a.get('due_at')) for a in tenant.assignments_cache.get(course_id, [])}
+        stale += sum(1 for a in fixtures['assignments'][course_id] if held.get(a['id']) != (a['name'], a['due_at']))
+        scores = {s['assignment_id']: s.get('score') for s in tenant.api.submission_cache.get(course_id, [])}
+        stale += sum(1 for s in fixtures['submissions'][course_id] if scores.get(s['assignment_id'], -1) != s['score'])
+        grade = tenant.api.grade_cache.get(course_id) or {}
+        truth = fixtures['grades'][course_id]
+        stale += (grade.get('current_score'), grade.get('current_grade')) != (truth['current_score'],
+                                                                              truth['current_grade'])
+        row = tenant.chatbot.stats.summary(course_id)
+        if row is not None:
+            due = sorted((due_ts(a), a['id']) for a in fixtures['assignments'][course_id] if due_ts(a) is not None)
+            stale += (row.due != due) + ((row.score, row.letter) != (truth['current_score'], truth['current_grade']))
+    return stale
+
+
+#pushes live events for `changes` random Canvas changes (delivered with duplicates, swaps and
+#losses) and waits until every tenant has applied them. compares the Canvas requests that
+#took with what one polling pass over every tenant's courses costs
+async def run_live(service, canvas, changes, duplicate, reorder, drop, secret):
+    producer = LiveEventProducer(canvas, seed=1)
+    canvas.reset_counts()
+    events = producer.changes(changes)
+    url = f"http://127.0.0.1:{service.port}/live-events"
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    sent = await loop.run_in_executor(None, lambda: producer.deliver(url, events, secret, duplicate=duplicate,
+                                                                     reorder=reorder, drop=drop))
+    ingested = time.perf_counter() - started
+    tenants = list(service.pool.tenants.values())
+    # lost events are only noticed once the reorder window has passed
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+        if not any(t.live.pending() for t in tenants) and not any(_stale_values(t, canvas.fixtures) for t in tenants):
+            break
+    applied = time.perf_counter() - started
+    courses = len(canvas.fixtures['courses'])
+    return {"changes": changes, "events": len(events), "deliveries": sent,
+            "ingest_events_per_s": round(sent / ingested, 1), "seconds_until_applied": round(applied, 3),
+            "stale_values": sum(_stale_values(t, canvas.fixtures) for t in tenants),
+            "canvas_requests": canvas.total_requests(),
+            "one_poll_canvas_requests": len(tenants) * (2 + 2 * courses)}
+
+
+async def _main(args):
+    canvas = start_mock_canvas(build_fixtures(args.courses, args.assignments))
+    service = ChatbotService([canvas.url], workers=args.workers, live_events_secret="loadtest",
+                             reconcile_interval=args.reconcile)
+    await service.start("127.0.0.1", 0)
+    try:
+        # first pass includes loading every tenant from Canvas, second is steady state
+        cold = await run_load("127.0.0.1", service.port, canvas.url, args.tenants, args.concurrency, args.tenants)
+        warm = await run_load("127.0.0.1", service.port, canvas.url, args.tenants, args.concurrency, args.requests)
+        result = {"tenants": args.tenants, "concurrency": args.concurrency,
+                  "canvas_requests": canvas.total_requests(), "cold": cold, "warm": warm,
+                  "pool": service.pool.stats()}
+        if args.live_changes:
+            result["live_events"] = await run_live(service, canvas, args.live_changes, args.live_duplicate,
+                                                   args.live_reorder, args.live_drop, "loadtest")
+        print(json.dumps(result, indent=2))
+    finally:
+        await service.stop()
+        canvas.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the headless chatbot service")
+    parser.add_argument("--tenants", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--courses", type=int, default=6)
+    parser.add_argument("--assignments", type=int, default=40)
+    parser.add_argument("--live-changes", type=int, default=0, help="then push live events for this many changes")
+    parser.add_argument("--live-duplicate", type=float, default=0.1, help="share of events delivered twice")
+    parser.add_argument("--live-reorder", type=float, default=0.2, help="share swapped with the next one")
+    parser.add_argument("--live-drop", type=float, default=0.02, help="share of events lost")
+    parser.add_argument("--reconcile", type=float, default=10,
+                        help="seconds between the service's full re-fetches of each tenant's courses")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
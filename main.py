@@ -1,7 +1,68 @@
 # main.py - Entry point for the Canvas API Chatbot (Hybrid Design Prototype)
+import argparse
+import os
+import sys
 from Canvas_api import CanvasAPI
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Canvas API Chatbot. With no options it runs the interactive prompt.")
+    parser.add_argument("--out", default="-", help="output file for --manifest/--export, '-' for stdout (default)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+
+    export = parser.add_argument_group("export (non-interactive, streams rows as pages arrive)")
+    export.add_argument("--export", choices=["assignments", "grades", "submissions", "calendar"],
+                        help="calendar writes an iCalendar (.ics) file of due dates, --format is ignored")
+    export.add_argument("--base-url", default=os.environ.get("CANVAS_BASE_URL"),
+                        help="Canvas URL (default: $CANVAS_BASE_URL)")
+    export.add_argument("--token", default=os.environ.get("CANVAS_TOKEN"),
+                        help="access token (default: $CANVAS_TOKEN)")
+
+    bulk = parser.add_argument_group("bulk sync (non-interactive)")
+    bulk.add_argument("--manifest", help="CSV or JSONL file with account_id, base_url, token")
+    bulk.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    bulk.add_argument("--threads", type=int, default=4, help="accounts synced at once inside each worker")
+    bulk.add_argument("--per-host", type=int, default=4, help="max concurrent accounts per Canvas host, over all workers")
+    bulk.add_argument("--checkpoint", help="file of finished account ids, lets an interrupted run resume")
+    bulk.add_argument("--days", type=int, default=14, help="how far ahead 'upcoming' work reaches")
+    return parser.parse_args(argv)
+
+def run_export(args):
+    from export import export
+    if not args.base_url or not args.token:
+        print("--export needs --base-url and --token (or CANVAS_BASE_URL / CANVAS_TOKEN)", file=sys.stderr)
+        return 2
+    api = CanvasAPI(args.base_url, args.token)
+    if not api.get_current_user():
+        print(f"Authentication failed: {api.last_error}", file=sys.stderr)
+        return 1
+    out = sys.stdout if args.out == "-" else open(args.out, "w", newline="", encoding="utf-8")
+    try:
+        if args.export == "calendar":
+            from calendar_feed import write_calendar
+            count = write_calendar(api, out)
+        else:
+            count = export(api, args.export, out, args.format)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"[Export] {count} {args.export} rows written", file=sys.stderr)
+    return 0
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.export:
+        return run_export(args)
+    if args.manifest:
+        from bulk_sync import run_bulk_sync
+        summary = run_bulk_sync(args.manifest, args.out, args.format, args.workers, args.threads,
+                                args.per_host, args.checkpoint, args.days)
+        return 1 if summary["failed"] else 0
+    run_interactive()
+
+def run_interactive():
     print("[Canvas] Welcome to the Canvas API Chatbot (Hybrid Design Prototype)!\n")
 
     base_url = input("Enter your Canvas URL (e.g. https://nmsu.instructure.com): ").strip()
@@ -66,4 +127,4 @@ def main():
             print("Invalid choice. Try again.")
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+# metrics.py - request level metrics for CanvasAPI: counts, latency histograms, bytes, status codes, retries, cache hits
+import json
+import re
+import threading
+from collections import defaultdict
+
+# latency histogram bucket upper bounds in seconds (Prometheus style, cumulative on export)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+#"/courses/123/assignments/456" -> "GET /courses/:id/assignments/:id" so metrics group per endpoint
+def endpoint_template(method, path):
+    return f"{method} {_ID_SEGMENT.sub('/:id', path)}"
+
+
+class _Endpoint:
+    __slots__ = ("count", "seconds", "bytes", "buckets", "statuses", "retries")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+        self.statuses = defaultdict(int)
+        self.retries = 0
+
+
+#one RequestMetrics can be shared by many CanvasAPI objects (e.g. every tenant of the service)
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(_Endpoint)
+        self._cache_hits = defaultdict(int)
+
+    #status is the HTTP status code or "error" when no response came back
+    def record(self, template, status, seconds, nbytes):
+        with self._lock:
+            ep = self._endpoints[template]
+            ep.count += 1
+            ep.seconds += seconds
+            ep.bytes += nbytes
+            ep.statuses[status] += 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    ep.buckets[i] += 1
+                    break
+            else:
+                ep.buckets[-1] += 1
+
+    def record_retry(self, template):
+        with self._lock:
+            self._endpoints[template].retries += 1
+
+    #cache is a short name like "grades", "submissions" or "etag"
+    def record_cache_hit(self, cache):
+        with self._lock:
+            self._cache_hits[cache] += 1
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._cache_hits.clear()
+
+    #plain dict copy of everything recorded so far
+    def snapshot(self):
+        with self._lock:
+            endpoints = {}
+            for template, ep in self._endpoints.items():
+                endpoints[template] = {
+                    "count": ep.count,
+                    "seconds": round(ep.seconds, 6),
+                    "mean_ms": round(ep.seconds / ep.count * 1000, 3) if ep.count else None,
+                    "bytes": ep.bytes,
+                    "statuses": {str(k): v for k, v in ep.statuses.items()},
+                    "retries": ep.retries,
+                    "latency_buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], ep.buckets)),
+                }
+            return {
+                "requests": sum(ep.count for ep in self._endpoints.values()),
+                "bytes": sum(ep.bytes for ep in self._endpoints.values()),
+                "retries": sum(ep.retries for ep in self._endpoints.values()),
+                "cache_hits": dict(self._cache_hits),
+                "endpoints": endpoints,
+            }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    #Prometheus text exposition format
+    def to_prometheus(self):
+        snap = self.snapshot()
+        lines = [
+            "# HELP canvas_requests_total Canvas API requests by endpoint and status.",
+            "# TYPE canvas_requests_total counter",
+        ]
+        for template, ep in snap["endpoints"].items():
+            for status, count in ep["statuses"].items():
+                lines.append(f'canvas_requests_total{{endpoint="{template}",status="{status}"}} {count}')
+        lines += ["# HELP canvas_response_bytes_total Response body bytes received.",
+                  "# TYPE canvas_response_bytes_total counter"]
+        lines += [f'canvas_response_bytes_total{{endpoint="{t}"}} {ep["bytes"]}' for t, ep in snap["endpoints"].items()]
+        lines += ["# HELP canvas_retries_total Requests retried after rate limits, 5xx or connection errors.",
+                  "# TYPE canvas_retries_total counter"]
+        lines += [f'canvas_retries_total{{endpoint="{t}"}} {ep["retries"]}' for t, ep in snap["endpoints"].items()]
+        lines += ["# HELP canvas_request_duration_seconds Canvas API request latency.",
+                  "# TYPE canvas_request_duration_seconds histogram"]
+        for template, ep in snap["endpoints"].items():
+            cumulative = 0
+            for bound, count in ep["latency_buckets"].items():
+                cumulative += count
+                lines.append(f'canvas_request_duration_seconds_bucket{{endpoint="{template}",le="{bound}"}} {cumulative}')
+            lines.append(f'canvas_request_duration_seconds_sum{{endpoint="{template}"}} {ep["seconds"]}')
+            lines.append(f'canvas_request_duration_seconds_count{{endpoint="{template}"}} {ep["count"]}')
+        lines += ["# HELP canvas_cache_hits_total Answers served from a local cache instead of Canvas.",
+                  "# TYPE canvas_cache_hits_total counter"]
+        lines += [f'canvas_cache_hits_total{{cache="{c}"}} {n}' for c, n in snap["cache_hits"].items()]
+        return "\n".join(lines) + "\n"
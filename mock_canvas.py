@@ -0,0 +1,712 @@
+#!/usr/bin/env python3
+# mock_canvas.py - local stand-in for a Canvas instance (REST + GraphQL) used to try the app offline
+# run: python mock_canvas.py --courses 6 --assignments 40 --port 8765
+# then log in with URL http://127.0.0.1:8765 and any token
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+from urllib.request import Request, urlopen
+
+# clients that speak HTTP/2 with prior knowledge (cleartext) are served too when the h2
+# package is installed, e.g. CanvasAPI(..., http2=True). without it the mock is HTTP/1.1 only
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+H2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+H2_WORKERS = 64  # streams of one HTTP/2 connection answered at once
+# not allowed in HTTP/2 responses, dropped from what the HTTP/1.1 handler writes
+HOP_BY_HOP = ("connection", "keep-alive", "transfer-encoding", "upgrade", "proxy-connection")
+
+USER_ID = 1001
+
+SUBJECTS = ["Biology", "Chemistry", "Calculus", "History", "English", "Physics",
+            "Statistics", "Economics", "Psychology", "Spanish", "Art History", "Programming"]
+KINDS = ["Homework", "Lab Report", "Quiz", "Essay", "Project", "Reading Response", "Exam"]
+
+# assignment groups every mock course has: (name, weight, drop_lowest, kinds in it)
+GROUPS = [("Homework", 30, 0, ("Homework", "Reading Response", "Lab Report")),
+          ("Quizzes", 20, 1, ("Quiz",)),
+          ("Projects and Essays", 15, 0, ("Project", "Essay")),
+          ("Exams", 35, 0, ("Exam",))]
+
+
+#builds a fake data set: courses with assignments, the student's submissions and enrollment grades.
+#submitted is the share of past-due assignments the student turned in
+def build_fixtures(courses=6, assignments=40, seed=0, submitted=1.0):
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    data = {'user': {'id': USER_ID, 'name': 'Test Student', 'time_zone': 'America/Denver'}, 'courses': [],
+            'assignments': {}, 'submissions': {}, 'grades': {}, 'groups': {}, 'events': []}
+
+    for c in range(courses):
+        course_id = 100 + c
+        subject = SUBJECTS[c % len(SUBJECTS)]
+        # every other course weights its assignment groups
+        data['courses'].append({'id': course_id, 'name': f"{subject} {101 + c}",
+                                'course_code': f"{subject[:4].upper()}{101 + c}",
+                                'apply_assignment_group_weights': c % 2 == 0})
+        group_of = {kind: course_id * 10 + g for g, (_, _, _, kinds) in enumerate(GROUPS) for kind in kinds}
+        items, subs = [], []
+        for a in range(assignments):
+            assignment_id = course_id * 1000 + a
+            # spread due dates over the term, about a third still in the future
+            due = now + timedelta(days=rnd.randint(-60, 30), hours=rnd.randint(0, 23))
+            points = rnd.choice([10, 20, 50, 100])
+            kind = rnd.choice(KINDS)
+            items.append({
+                'id': assignment_id, 'course_id': course_id,
+                'name': f"{kind} {a + 1}",
+                'assignment_group_id': group_of[kind],
+                'due_at': due.strftime('%Y-%m-%dT%H:%M:%SZ') if rnd.random() > 0.05 else None,
+                'points_possible': points,
+                'updated_at': (due - timedelta(days=14)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'description': f"<p>{subject} work item {a + 1}</p>",
+                'html_url': f"/courses/{course_id}/assignments/{assignment_id}",
+                'has_submitted_submissions': due < now,
+            })
+            if due < now and rnd.random() < submitted:
+                score = round(points * rnd.uniform(0.55, 1.0), 1)
+                subs.append({'id': assignment_id * 10, 'assignment_id': assignment_id, 'user_id': USER_ID,
+                             'score': score, 'grade': str(score),
+                             'submitted_at': (due - timedelta(hours=3)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                             'graded_at': due.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                             'workflow_state': 'graded', 'late': False, 'missing': False})
+        data['assignments'][course_id] = items
+        data['submissions'][course_id] = subs
+        data['groups'][course_id] = [{'id': course_id * 10 + g, 'name': name, 'position': g + 1,
+                                      'group_weight': weight,
+                                      'rules': {'drop_lowest': drop} if drop else {}}
+                                     for g, (name, weight, drop, _) in enumerate(GROUPS)]
+        # due dates run from 60 days ago to 30 days ahead, the exams sit in that term
+        for title, days in (("Midterm Exam", 8 + c % 5), ("Final Exam", 28)):
+            start = (now + timedelta(days=days)).replace(hour=15, minute=0, second=0)
+            data['events'].append({'id': course_id * 100 + len(data['events']), 'title': title,
+                                   'context_code': f"course_{course_id}",
+                                   'start_at': start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                   'end_at': (start + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M:%SZ')})
+        score = round(rnd.uniform(52, 99), 2)
+        letter = _letter(score)
+        data['grades'][course_id] = {'current_score': score, 'current_grade': letter,
+                                     'final_score': score, 'final_grade': letter}
+    return data
+
+
+def _cursor(offset):
+    return base64.b64encode(str(offset).encode()).decode()
+
+def _offset(cursor):
+    return int(base64.b64decode(cursor).decode()) if cursor else 0
+
+# one page of a GraphQL connection, cursors are base64 offsets like Canvas uses
+def _connection(items, first, after, to_node):
+    start = _offset(after)
+    page = items[start:start + first]
+    end = start + len(page)
+    return {'pageInfo': {'hasNextPage': end < len(items), 'endCursor': _cursor(end)},
+            'nodes': [to_node(i) for i in page]}
+
+def _assignment_node(a):
+    return {'_id': str(a['id']), 'name': a['name'], 'dueAt': a['due_at'],
+            'pointsPossible': a['points_possible'], 'updatedAt': a['updated_at'],
+            'description': a['description'], 'htmlUrl': a['html_url']}
+
+def _submission_node(s):
+    return {'_id': str(s['id']), 'assignmentId': str(s['assignment_id']), 'score': s['score'],
+            'grade': s['grade'], 'submittedAt': s['submitted_at'], 'gradedAt': s['graded_at'],
+            'state': s['workflow_state'], 'late': s['late'], 'missing': s['missing']}
+
+# every student of a mock course is in its one section
+def _section_id(course_id):
+    return course_id * 10 + 1
+
+def _grades_node(g):
+    return {'currentScore': g['current_score'], 'currentGrade': g['current_grade'],
+            'finalScore': g['final_score'], 'finalGrade': g['final_grade']}
+
+# aliased follow-up page, e.g.  p0: course(id: "100") { assignmentsConnection(first: 50, after: "NTA=") ...
+PAGE_RE = re.compile(r'(\w+): course\(id: \$(\w+)\) \{ (\w+)Connection\([^)]*?first: \$first, after: \$(\w+)\)')
+
+
+#latency/jitter (seconds) are added to every response. rate_limit turns on a Canvas
+#style leaky bucket: each request costs request_cost units, the bucket drains
+#rate_limit_leak units a second, and over rate_limit a request is refused with
+#403 "Rate Limit Exceeded". X-Request-Cost / X-Rate-Limit-Remaining go out either way
+class MockCanvasServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops connects from parallel clients
+
+    # connect_latency is added once per new connection, like the TCP and TLS handshakes
+    # to a real Canvas host cost a few round trips
+    def __init__(self, address, fixtures, latency=0.0, jitter=0.0, per_page=10,
+                 rate_limit=None, rate_limit_leak=10.0, request_cost=1.0, connect_latency=0.0):
+        super().__init__(address, MockCanvasHandler)
+        self.fixtures = fixtures
+        self.counts = Counter()
+        self.connections = Counter()  # "http/1.1" / "h2" -> connections accepted
+        self.count_lock = threading.Lock()
+        self.latency = latency
+        self.jitter = jitter
+        self.per_page = per_page
+        self.rate_limit = rate_limit
+        self.rate_limit_leak = rate_limit_leak
+        self.request_cost = request_cost
+        self.connect_latency = connect_latency
+        self.throttled = 0
+        self._bucket = 0.0
+        self._bucket_time = time.monotonic()
+
+    #adds one request to the bucket, returns (allowed, remaining) - remaining is None when unlimited
+    def take_rate_limit(self):
+        if self.rate_limit is None:
+            return True, None
+        with self.count_lock:
+            now = time.monotonic()
+            self._bucket = max(0.0, self._bucket - (now - self._bucket_time) * self.rate_limit_leak)
+            self._bucket_time = now
+            if self._bucket + self.request_cost > self.rate_limit:
+                self.throttled += 1
+                return False, self.rate_limit - self._bucket
+            self._bucket += self.request_cost
+            return True, self.rate_limit - self._bucket
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counts(self):
+        with self.count_lock:
+            self.counts.clear()
+            self.connections.clear()
+
+    # all requests seen so far, including GraphQL POSTs
+    def total_requests(self):
+        with self.count_lock:
+            return sum(self.counts.values())
+
+
+class MockCanvasHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes, without this keep-alive
+    # clients wait ~40 ms per request on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    _rate_headers = None
+
+    #an HTTP/2 client opens with the connection preface, everyone else is HTTP/1.1
+    def handle(self):
+        h2_client = H2_AVAILABLE and self.request.recv(3, socket.MSG_PEEK | socket.MSG_WAITALL) == H2_PREFACE[:3]
+        with self.server.count_lock:
+            self.server.connections["h2" if h2_client else "http/1.1"] += 1
+        if self.server.connect_latency:
+            time.sleep(self.server.connect_latency)
+        if h2_client:
+            _H2Connection(self.server, self.request).serve()
+        else:
+            super().handle()
+
+    def _count(self, key):
+        with self.server.count_lock:
+            self.server.counts[key] += 1
+
+    #injected latency and the rate limiter, returns False when the request was refused
+    def _admit(self):
+        server = self.server
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.random() * server.jitter)
+        allowed, remaining = server.take_rate_limit()
+        self._rate_headers = {"X-Request-Cost": str(server.request_cost)}
+        if remaining is not None:
+            self._rate_headers["X-Rate-Limit-Remaining"] = f"{remaining:.1f}"
+        if not allowed:
+            self._send_json({"errors": [{"message": "Rate Limit Exceeded"}]}, 403)
+        return allowed
+
+    def _send_json(self, body, status=200, headers=None):
+        payload = json.dumps(body).encode()
+        headers = dict(self._rate_headers or {}, **(headers or {}))
+        # GETs carry an ETag and honour If-None-Match like Canvas does
+        if self.command == "GET" and status == 200:
+            etag = '"' + hashlib.md5(payload).hexdigest() + '"'
+            headers = dict(headers or {}, ETag=etag)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # REST list endpoints are paginated with page/per_page and a Link header
+    def _send_page(self, items, query):
+        per_page = int(query.get('per_page', [str(self.server.per_page)])[0])
+        page = int(query.get('page', ['1'])[0])
+        chunk = items[(page - 1) * per_page:page * per_page]
+        # like Canvas, the links repeat every other query parameter
+        others = urlencode([(k, v) for k, values in query.items() if k not in ('page', 'per_page') for v in values])
+        base = f"{self.server.url}{urlparse(self.path).path}?{others + '&' if others else ''}per_page={per_page}"
+        links = []
+        if page * per_page < len(items):
+            links.append(f'<{base}&page={page + 1}>; rel="next"')
+        links.append(f'<{base}&page=1>; rel="first"')
+        self._send_json(chunk, headers={"Link": ", ".join(links)})
+
+    def do_GET(self):
+        data = self.server.fixtures
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        path = parsed.path
+        self._rate_headers = None
+        if not path.startswith("/api/v1/"):
+            return self._send_json({"errors": [{"message": "not found"}]}, 404)
+        parts = path[len("/api/v1/"):].strip("/").split("/")
+        self._count("GET /" + "/".join(":id" if p.isdigit() else p for p in parts))
+        if not self._admit():
+            return
+
+        if parts == ["users", "self"]:
+            return self._send_json(data['user'])
+        if parts == ["courses"]:
+            courses = data['courses']
+            if any("sections" in v for k, v in query.items() if k.startswith("include[")):
+                courses = [dict(c, sections=[{'id': _section_id(c['id']), 'name': f"{c['name']} 001"}])
+                           for c in courses]
+            return self._send_page(courses, query)
+        if parts == ["users", "self", "enrollments"]:
+            enrollments = [{'course_id': c['id'], 'user_id': USER_ID, 'type': 'StudentEnrollment',
+                            'grades': data['grades'][c['id']]} for c in data['courses']]
+            return self._send_page(enrollments, query)
+        if parts == ["calendar_events"]:
+            codes = set(query.get('context_codes[]', []))
+            events = sorted((e for e in data.get('events', []) if e['context_code'] in codes),
+                            key=lambda e: e['start_at'])
+            return self._send_page(events, query)
+        if parts == ["users", "self", "missing_submissions"]:
+            return self._send_page(self._missing_submissions(query), query)
+        if len(parts) == 2 and parts[0] == "courses" and parts[1].isdigit():
+            for course in data['courses']:
+                if course['id'] == int(parts[1]):
+                    return self._send_json(course)
+            return self._send_json({"errors": [{"message": "not found"}]}, 404)
+        if len(parts) >= 3 and parts[0] == "courses" and parts[1].isdigit():
+            course_id = int(parts[1])
+            if course_id not in data['assignments']:
+                return self._send_json({"errors": [{"message": "not found"}]}, 404)
+            rest = parts[2:]
+            if rest == ["assignments"]:
+                assignments = data['assignments'][course_id]
+                if 'assignment_ids[]' in query:
+                    ids = {int(i) for i in query['assignment_ids[]']}
+                    assignments = [a for a in assignments if a['id'] in ids]
+                return self._send_page(assignments, query)
+            if rest == ["assignment_groups"]:
+                return self._send_page(self._assignment_groups(course_id, query.get('include[]', [])), query)
+            if rest == ["enrollments"]:
+                grades = data['grades'][course_id]
+                return self._send_json([{'user_id': USER_ID, 'type': 'StudentEnrollment', 'grades': grades}])
+            if rest == ["students", "submissions"]:
+                subs = data['submissions'][course_id]
+                if 'graded_since' in query:
+                    since = query['graded_since'][0]
+                    subs = [s for s in subs if s.get('graded_at') and s['graded_at'] > since]
+                return self._send_page(subs, query)
+            if len(rest) == 4 and rest[0] == "assignments" and rest[2] == "submissions":
+                assignment_id = int(rest[1])
+                for sub in data['submissions'][course_id]:
+                    if sub['assignment_id'] == assignment_id:
+                        return self._send_json(sub)
+                return self._send_json({'assignment_id': assignment_id, 'workflow_state': 'unsubmitted',
+                                        'score': None, 'submitted_at': None})
+        return self._send_json({"errors": [{"message": "not found"}]}, 404)
+
+    # past-due assignments without a submission, oldest first like Canvas
+    def _missing_submissions(self, query):
+        data = self.server.fixtures
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        wanted = {int(c) for c in query.get('course_ids[]', [])}
+        include = query.get('include[]', [])
+        missing = []
+        for course in data['courses']:
+            if wanted and course['id'] not in wanted:
+                continue
+            submitted = {s['assignment_id'] for s in data['submissions'][course['id']]}
+            for a in data['assignments'][course['id']]:
+                if a['due_at'] and a['due_at'] < now and a['id'] not in submitted:
+                    item = dict(a)
+                    if "planner_overrides" in include:
+                        item['planner_override'] = None
+                    if "course" in include:
+                        item['course'] = course
+                    missing.append(item)
+        missing.sort(key=lambda a: a['due_at'])
+        return missing
+
+    def _assignment_groups(self, course_id, include):
+        data = self.server.fixtures
+        groups = [dict(g) for g in data['groups'][course_id]]
+        if "assignments" in include:
+            by_assignment = {s['assignment_id']: s for s in data['submissions'][course_id]}
+            for group in groups:
+                group['assignments'] = []
+                for a in data['assignments'][course_id]:
+                    if a['assignment_group_id'] != group['id']:
+                        continue
+                    a = dict(a, omit_from_final_grade=False)
+                    if "submission" in include:
+                        a['submission'] = by_assignment.get(a['id']) or {
+                            'assignment_id': a['id'], 'user_id': USER_ID, 'score': None, 'grade': None,
+                            'submitted_at': None, 'workflow_state': 'unsubmitted', 'missing': False}
+                    group['assignments'].append(a)
+        return groups
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self._rate_headers = None
+        if urlparse(self.path).path != "/api/graphql":
+            return self._send_json({"errors": [{"message": "not found"}]}, 404)
+        self._count("POST /api/graphql")
+        if not self._admit():
+            return
+        self._send_json({"data": self._graphql(body.get("query", ""), body.get("variables") or {})})
+
+    # only understands the two query shapes Canvas_api sends, this is not a GraphQL engine
+    def _graphql(self, query, variables):
+        data = self.server.fixtures
+        if "query LoginData" in query:
+            first = int(variables.get("first", 10))
+            with_assignments = variables.get("withAssignments", True)
+            enrollments = []
+            for course in data['courses']:
+                course_id = course['id']
+                enrollments.append({
+                    'grades': _grades_node(data['grades'][course_id]),
+                    'section': {'_id': str(_section_id(course_id))},
+                    'course': {
+                        '_id': str(course_id), 'name': course['name'], 'courseCode': course['course_code'],
+                        'submissionsConnection': _connection(data['submissions'][course_id], first, None,
+                                                             _submission_node),
+                    }})
+                if with_assignments:
+                    enrollments[-1]['course']['assignmentsConnection'] = _connection(
+                        data['assignments'][course_id], first, None, _assignment_node)
+            return {'legacyNode': {'enrollments': enrollments}}
+
+        result = {}
+        first = variables.get('first', 10)
+        for alias, course_var, name, after_var in PAGE_RE.findall(query):
+            course_id, after = int(variables[course_var]), variables.get(after_var)
+            if name == "assignments":
+                conn = _connection(data['assignments'][course_id], int(first), after, _assignment_node)
+            else:
+                conn = _connection(data['submissions'][course_id], int(first), after, _submission_node)
+            result[alias] = {f"{name}Connection": conn}
+        return result
+
+
+def _letter(score):
+    return 'A' if score >= 90 else 'B' if score >= 80 else 'C' if score >= 70 else 'D' if score >= 60 else 'F'
+
+
+#stand-in for Canvas Live Events: makes random changes to a mock server's fixtures (so its
+#REST answers agree) and returns the events Canvas would push about them, in Canvas's shape
+#(string ids, metadata + body, no letter grade on course_grade_change). numbered=True adds
+#a per-course metadata.sequence, like a queue bridge that counts each course's events
+class LiveEventProducer:
+    CHANGES = ("due_moved", "graded", "submitted", "created")
+
+    def __init__(self, server, seed=0, numbered=True):
+        self.server = server
+        self.rnd = random.Random(seed)
+        self.numbered = numbered
+        self.sequences = Counter()
+        self.hostname = urlparse(server.url).netloc
+        self.lock = threading.Lock()
+
+    def _event(self, name, course_id, body):
+        metadata = {'event_name': name, 'producer': 'canvas', 'hostname': self.hostname,
+                    'context_type': 'Course', 'context_id': str(course_id), 'user_id': str(USER_ID),
+                    'event_time': datetime.now(timezone.utc).isoformat(timespec='microseconds').replace('+00:00', 'Z')}
+        if self.numbered:
+            self.sequences[course_id] += 1
+            metadata['sequence'] = self.sequences[course_id]
+        return {'metadata': metadata, 'body': body}
+
+    #n random changes, returns their events in the order Canvas would send them
+    def changes(self, n):
+        events = []
+        with self.lock:
+            for _ in range(n):
+                events.extend(getattr(self, f"_{self.rnd.choice(self.CHANGES)}")())
+        return events
+
+    def _pick(self):
+        data = self.server.fixtures
+        course = self.rnd.choice(data['courses'])
+        return data, course['id'], self.rnd.choice(data['assignments'][course['id']])
+
+    def _assignment_event(self, name, course_id, a):
+        return self._event(name, course_id, {
+            'assignment_id': str(a['id']), 'context_id': str(course_id), 'context_type': 'Course',
+            'title': a['name'], 'due_at': a['due_at'], 'points_possible': a['points_possible'],
+            'updated_at': a['updated_at'], 'description': a['description'], 'workflow_state': 'published'})
+
+    def _due_moved(self):
+        _, course_id, a = self._pick()
+        due = datetime.now(timezone.utc) + timedelta(days=self.rnd.randint(1, 20), hours=self.rnd.randint(0, 23))
+        a['due_at'] = due.strftime('%Y-%m-%dT%H:%M:%SZ')
+        a['updated_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return [self._assignment_event("assignment_updated", course_id, a)]
+
+    def _created(self):
+        data, course_id, _ = self._pick()
+        items = data['assignments'][course_id]
+        a = dict(items[-1], id=max(x['id'] for x in items) + 1, name=f"{self.rnd.choice(KINDS)} {len(items) + 1}",
+                 has_submitted_submissions=False)
+        a['updated_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        items.append(a)
+        return [self._assignment_event("assignment_created", course_id, a)]
+
+    def _submitted(self):
+        data, course_id, a = self._pick()
+        subs = data['submissions'][course_id]
+        if any(s['assignment_id'] == a['id'] for s in subs):
+            return self._graded()
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        sub = {'id': a['id'] * 10, 'assignment_id': a['id'], 'user_id': USER_ID, 'score': None, 'grade': None,
+               'submitted_at': now, 'graded_at': None, 'workflow_state': 'submitted', 'late': False, 'missing': False}
+        subs.append(sub)
+        return [self._event("submission_created", course_id, {
+            'submission_id': str(sub['id']), 'assignment_id': str(a['id']), 'user_id': str(USER_ID),
+            'submitted_at': now, 'workflow_state': 'submitted', 'late': False, 'missing': False})]
+
+    def _graded(self):
+        data, course_id, _ = self._pick()
+        subs = data['submissions'][course_id]
+        if not subs:
+            return self._submitted()
+        sub = self.rnd.choice(subs)
+        points = next(a['points_possible'] for a in data['assignments'][course_id] if a['id'] == sub['assignment_id'])
+        old_score = sub['score']
+        sub['score'] = round(points * self.rnd.uniform(0.5, 1.0), 1)
+        sub['grade'] = str(sub['score'])
+        sub['graded_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        sub['workflow_state'] = 'graded'
+        grades = data['grades'][course_id]
+        old_current = grades['current_score']
+        score = round(min(100.0, max(40.0, old_current + self.rnd.uniform(-3, 3))), 2)
+        grades.update(current_score=score, final_score=score, current_grade=_letter(score), final_grade=_letter(score))
+        return [self._event("grade_change", course_id, {
+                    'submission_id': str(sub['id']), 'assignment_id': str(sub['assignment_id']),
+                    'user_id': str(USER_ID), 'score': sub['score'], 'old_score': old_score,
+                    'grade': sub['grade'], 'points_possible': points, 'grading_complete': True}),
+                self._event("course_grade_change", course_id, {
+                    'user_id': str(USER_ID), 'course_id': str(course_id), 'workflow_state': 'active',
+                    'current_score': score, 'old_current_score': old_current,
+                    'final_score': score, 'old_final_score': old_current})]
+
+    #posts events to a live events endpoint in batches, messed up like a real queue can:
+    #a share of them delivered twice, swapped with a neighbour, or lost. returns how many were sent
+    def deliver(self, url, events, secret, batch=50, duplicate=0.0, reorder=0.0, drop=0.0):
+        out = []
+        for event in events:
+            if self.rnd.random() < drop:
+                continue
+            out.append(event)
+            if self.rnd.random() < duplicate:
+                out.append(event)
+        for i in range(len(out) - 1):
+            if self.rnd.random() < reorder:
+                out[i], out[i + 1] = out[i + 1], out[i]
+        for start in range(0, len(out), batch):
+            payload = json.dumps(out[start:start + batch]).encode()
+            request = Request(url, data=payload, method="POST",
+                              headers={"Content-Type": "application/json", "X-Live-Events-Secret": secret})
+            with urlopen(request, timeout=10) as resp:
+                resp.read()
+        return len(out)
+
+
+#answers one request with MockCanvasHandler over in-memory streams, so the HTTP/2 side
+#serves exactly what the HTTP/1.1 side does. returns (status, headers, body)
+def _respond_in_memory(server, method, path, headers, body):
+    head = f"{method} {path} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers)
+    head += f"Content-Length: {len(body)}\r\n\r\n"
+    handler = MockCanvasHandler.__new__(MockCanvasHandler)
+    handler.server, handler.client_address, handler.request = server, ("127.0.0.1", 0), None
+    handler.rfile, handler.wfile = io.BytesIO(head.encode("latin-1") + body), io.BytesIO()
+    handler.handle_one_request()
+    status_line, _, rest = handler.wfile.getvalue().partition(b"\r\n")
+    raw_headers, _, payload = rest.partition(b"\r\n\r\n")
+    response_headers = []
+    for line in raw_headers.decode("latin-1").split("\r\n"):
+        name, _, value = line.partition(":")
+        if name and name.lower() not in HOP_BY_HOP:
+            response_headers.append((name.lower(), value.strip()))
+    return int(status_line.split()[1]), response_headers, payload
+
+
+#one HTTP/2 connection, served on the handler's thread. streams are answered on a thread
+#pool so they overlap like the requests of separate HTTP/1.1 connections would
+class _H2Connection:
+    def __init__(self, server, sock):
+        self.server = server
+        self.sock = sock
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False,
+                                                                         header_encoding="utf-8"))
+        self.lock = threading.Lock()  # the h2 state machine and socket writes
+        self.requests = {}  # stream id -> (headers, body) still arriving
+        self.outgoing = {}  # stream id -> response bytes waiting for flow-control window
+
+    def serve(self):
+        pool = ThreadPoolExecutor(max_workers=H2_WORKERS)
+        try:
+            with self.lock:
+                self.conn.initiate_connection()
+                self._flush()
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                with self.lock:
+                    events = self.conn.receive_data(data)
+                    for event in events:
+                        if isinstance(event, h2.events.RequestReceived):
+                            self.requests[event.stream_id] = (dict(event.headers), bytearray())
+                        elif isinstance(event, h2.events.DataReceived):
+                            self.requests[event.stream_id][1].extend(event.data)
+                            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            pool.submit(self._answer, event.stream_id, *self.requests.pop(event.stream_id))
+                        elif isinstance(event, h2.events.StreamReset):
+                            self.requests.pop(event.stream_id, None)
+                            self.outgoing.pop(event.stream_id, None)
+                        elif isinstance(event, h2.events.WindowUpdated):
+                            self._send_outgoing()
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            return
+                    self._flush()
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+        finally:
+            pool.shutdown(wait=False)
+
+    def _answer(self, stream_id, headers, body):
+        forwarded = [(k, v) for k, v in headers.items() if not k.startswith(":")]
+        forwarded.append(("Host", headers.get(":authority", "")))
+        status, response_headers, payload = _respond_in_memory(self.server, headers[":method"], headers[":path"],
+                                                                 forwarded, bytes(body))
+        try:
+            with self.lock:
+                self.conn.send_headers(stream_id, [(":status", str(status))] + response_headers,
+                                       end_stream=not payload)
+                if payload:
+                    self.outgoing[stream_id] = memoryview(payload)
+                    self._send_outgoing()
+                self._flush()
+        except (OSError, h2.exceptions.ProtocolError):
+            pass  # the client reset the stream or went away
+
+    # sends as much of every waiting response as the flow-control windows allow, holds self.lock
+    def _send_outgoing(self):
+        for stream_id, data in list(self.outgoing.items()):
+            try:
+                while data:
+                    size = min(len(data), self.conn.local_flow_control_window(stream_id),
+                               self.conn.max_outbound_frame_size)
+                    if size <= 0:
+                        break
+                    self.conn.send_data(stream_id, bytes(data[:size]), end_stream=size == len(data))
+                    data = data[size:]
+            except h2.exceptions.StreamClosedError:
+                data = None
+            if data:
+                self.outgoing[stream_id] = data
+            else:
+                self.outgoing.pop(stream_id, None)
+
+    def _flush(self):
+        out = self.conn.data_to_send()
+        if out:
+            self.sock.sendall(out)
+
+
+#starts the mock server on a background thread, returns the server (use .url and .shutdown())
+#options are MockCanvasServer's (latency, jitter, per_page, rate_limit, ...)
+def start_mock_canvas(fixtures=None, host="127.0.0.1", port=0, **options):
+    server = MockCanvasServer((host, port), fixtures or build_fixtures(), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock Canvas server")
+    parser.add_argument("--courses", type=int, default=6)
+    parser.add_argument("--assignments", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--submitted", type=float, default=1.0, help="share of past-due work turned in")
+    parser.add_argument("--per-page", type=int, default=10, help="default REST page size")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra latency up to this")
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0, help="added once per new connection")
+    parser.add_argument("--rate-limit", type=float, default=None, help="bucket size, off by default")
+    parser.add_argument("--rate-limit-leak", type=float, default=10.0, help="bucket drain per second")
+    parser.add_argument("--live-events-url", help="also push live events for random changes to this "
+                                                  "endpoint, e.g. http://127.0.0.1:8080/live-events")
+    parser.add_argument("--live-events-secret", default="", help="sent as X-Live-Events-Secret")
+    parser.add_argument("--live-rate", type=float, default=1.0, help="changes per second")
+    args = parser.parse_args()
+
+    server = MockCanvasServer(("127.0.0.1", args.port),
+                              build_fixtures(args.courses, args.assignments, args.seed, args.submitted),
+                              latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                              per_page=args.per_page, rate_limit=args.rate_limit,
+                              rate_limit_leak=args.rate_limit_leak, connect_latency=args.connect_latency_ms / 1000)
+    print(f"[Mock Canvas] serving {args.courses} courses x {args.assignments} assignments at {server.url}")
+    if args.live_events_url:
+        producer = LiveEventProducer(server, args.seed)
+
+        def push():
+            while True:
+                time.sleep(1 / args.live_rate)
+                try:
+                    producer.deliver(args.live_events_url, producer.changes(1), args.live_events_secret)
+                except OSError as e:
+                    print(f"[Mock Canvas] live events not delivered: {e}")
+        threading.Thread(target=push, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# reminders.py - durable reminder store (SQLite, indexed by due time) and a scheduler thread that fires them on time
+import hashlib
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+from utils import app_data_dir
+
+# automatic reminders fire this long before an assignment is due
+DEFAULT_LEAD = timedelta(hours=24)
+
+
+#one database per Canvas instance and user so reminders survive logout and token changes
+def reminder_db_path(base_url, user_id):
+    key = hashlib.sha256(f"{base_url.rstrip('/')}\n{user_id}".encode()).hexdigest()[:32]
+    return os.path.join(app_data_dir(), f"reminders-{key}.db")
+
+
+def _to_ts(when):
+    if when.tzinfo is None:
+        when = when.astimezone()  # naive times are the user's local time
+    return when.timestamp()
+
+
+def _row_to_reminder(row):
+    return {
+        'id': row[0],
+        'title': row[1],
+        'note': row[2] or "",
+        'when': datetime.fromtimestamp(row[3], timezone.utc),
+        'fired': bool(row[4]),
+        'source_key': row[5],
+    }
+
+
+class ReminderStore:
+    COLUMNS = "id, title, note, due_ts, fired, source_key"
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS reminders (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    note TEXT,
+                    due_ts REAL NOT NULL,
+                    fired INTEGER NOT NULL DEFAULT 0,
+                    source_key TEXT UNIQUE
+                )""")
+            # the scheduler and the "upcoming" list only ever read unfired rows in due order
+            self.conn.execute("CREATE INDEX IF NOT EXISTS reminders_pending ON reminders (fired, due_ts)")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    #adds a reminder, when is a datetime (naive means local time). returns the new id
+    def add(self, title, when, note="", source_key=None):
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO reminders (title, note, due_ts, source_key) VALUES (?, ?, ?, ?)",
+                (title, note, _to_ts(when), source_key))
+            return cur.lastrowid
+
+    def remove(self, reminder_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+
+    def remove_source(self, source_key):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM reminders WHERE source_key = ?", (source_key,))
+
+    def get(self, reminder_id):
+        with self.lock:
+            row = self.conn.execute(f"SELECT {self.COLUMNS} FROM reminders WHERE id = ?",
+                                    (reminder_id,)).fetchone()
+        return _row_to_reminder(row) if row else None
+
+    def mark_fired(self, reminder_id):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE reminders SET fired = 1 WHERE id = ?", (reminder_id,))
+
+    #the next reminders that have not fired yet, earliest first
+    def upcoming(self, limit=50):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {self.COLUMNS} FROM reminders WHERE fired = 0 ORDER BY due_ts LIMIT ?",
+                (limit,)).fetchall()
+        return [_row_to_reminder(r) for r in rows]
+
+    #reminders the user added themselves (no source_key), fired or not, earliest first
+    def manual(self):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {self.COLUMNS} FROM reminders WHERE source_key IS NULL ORDER BY due_ts").fetchall()
+        return [_row_to_reminder(r) for r in rows]
+
+    #(due_ts, id) of the earliest unfired reminders, used by the scheduler to fill its heap.
+    #rows sharing the last due time are all returned so a batch never splits a tie
+    def pending_batch(self, limit):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT due_ts, id FROM reminders WHERE fired = 0 ORDER BY due_ts LIMIT ?",
+                (limit,)).fetchall()
+            if len(rows) == limit:
+                rows += self.conn.execute(
+                    "SELECT due_ts, id FROM reminders WHERE fired = 0 AND due_ts = ? AND id NOT IN "
+                    f"({','.join('?' * len(rows))})", (rows[-1][0], *[r[1] for r in rows])).fetchall()
+        return rows, len(rows) >= limit
+
+    #creates or moves one reminder per assignment (keyed by source_key) in a single transaction.
+    #items are (source_key, title, note, when). returns [(id, due_ts)] for rows that are new or moved
+    def upsert_sources(self, items):
+        changed = []
+        with self.lock, self.conn:
+            for source_key, title, note, when in items:
+                due_ts = _to_ts(when)
+                row = self.conn.execute("SELECT id, due_ts FROM reminders WHERE source_key = ?",
+                                        (source_key,)).fetchone()
+                if row is None:
+                    cur = self.conn.execute(
+                        "INSERT INTO reminders (title, note, due_ts, source_key) VALUES (?, ?, ?, ?)",
+                        (title, note, due_ts, source_key))
+                    changed.append((cur.lastrowid, due_ts))
+                elif row[1] != due_ts:
+                    # due date moved: reschedule and let it fire again
+                    self.conn.execute("UPDATE reminders SET title = ?, note = ?, due_ts = ?, fired = 0 WHERE id = ?",
+                                      (title, note, due_ts, row[0]))
+                    changed.append((row[0], due_ts))
+        return changed
+
+
+class ReminderScheduler:
+    # on_fire(reminder) is called from the scheduler thread when a reminder is due.
+    # only the earliest batch_size reminders are kept in memory, the rest stay in SQLite
+    def __init__(self, store, on_fire, batch_size=500):
+        self.store = store
+        self.on_fire = on_fire
+        self.batch_size = batch_size
+        self._heap = []
+        # every unfired reminder due at or before the horizon is in the heap
+        self._horizon = None
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._firing = threading.Lock()  # held while _fire uses the store
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    #once this returns the scheduler thread doesn't touch the store again, so it can be closed.
+    #it doesn't wait for on_fire, which may be waiting on the thread that calls stop
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        with self._firing:
+            pass
+
+    #tell the scheduler about a reminder that was added or moved
+    def schedule(self, reminder_id, due_ts):
+        with self._cond:
+            if self._horizon is not None and due_ts <= self._horizon:
+                heapq.heappush(self._heap, (due_ts, reminder_id))
+                self._cond.notify()
+            elif not self._heap:
+                # nothing loaded yet or heap drained: reload on the next loop
+                self._horizon = None
+                self._cond.notify()
+
+    def _reload(self):
+        rows, more = self.store.pending_batch(self.batch_size)
+        self._heap = list(rows)
+        heapq.heapify(self._heap)
+        self._horizon = rows[-1][0] if more else float("inf")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                if not self._heap:
+                    self._reload()
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                due_ts, reminder_id = self._heap[0]
+                delay = due_ts - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+            self._fire(reminder_id, due_ts)
+
+    def _fire(self, reminder_id, due_ts):
+        with self._firing:
+            if self._stopped:
+                return
+            reminder = self.store.get(reminder_id)
+            # skip entries for reminders that were deleted, already fired or moved since
+            if reminder is None or reminder['fired'] or abs(reminder['when'].timestamp() - due_ts) > 1e-3:
+                return
+            self.store.mark_fired(reminder_id)
+        try:
+            self.on_fire(reminder)
+        except Exception:
+            pass
+
+
+#creates/updates one reminder per upcoming assignment in assignments_cache,
+#lead before its due date. returns [(id, due_ts)] to pass to ReminderScheduler.schedule
+def sync_assignment_reminders(store, courses, assignments_cache, lead=DEFAULT_LEAD, now=None):
+    now = now or datetime.now(timezone.utc)
+    items = []
+    for course in courses:
+        course_id = course.get('id')
+        for assignment in assignments_cache.get(course_id, []):
+            item = assignment_reminder(course, assignment, lead, now)
+            if item:
+                items.append(item)
+    return store.upsert_sources(items)
+
+
+#(source_key, title, note, when) for one assignment, None when it has no future due date.
+#if the lead time has already passed the reminder simply fires right away (once)
+def assignment_reminder(course, assignment, lead=DEFAULT_LEAD, now=None):
+    due_at = assignment.get('due_at')
+    if not due_at:
+        return None
+    try:
+        due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    now = now or datetime.now(timezone.utc)
+    if due_date <= now:
+        return None
+    return (assignment_source_key(course.get('id'), assignment.get('id')),
+            f"{assignment.get('name', 'Assignment')} is due soon",
+            f"{course.get('name', '')} - due {due_date.astimezone().strftime('%b %d, %I:%M %p')}",
+            due_date - lead)
+
+
+def assignment_source_key(course_id, assignment_id):
+    return f"assignment:{course_id}:{assignment_id}"
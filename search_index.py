@@ -0,0 +1,157 @@
+# search_index.py - BM25 full-text search over assignment names and descriptions
+import heapq
+import html
+import math
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+# BM25 parameters, the usual defaults
+K1 = 1.2
+B = 0.75
+NAME_BOOST = 3  # a word in the title counts as this many occurrences in the body
+MAX_PREFIX_TERMS = 64  # vocabulary terms one prefix may expand to
+PREFIX_WEIGHT = 0.7  # a prefix match scores less than the exact word
+
+_TAG = re.compile(r"<[^>]+>")
+_WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""a an and are as at be by for from has have how i in is it its me my of on or
+that the this to was were what when where which who will with you your""".split())
+
+
+def strip_html(text):
+    return html.unescape(_TAG.sub(" ", text or ""))
+
+
+def tokenize(text):
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+#inverted index of assignments: term -> {doc: term frequency}. documents are slots
+#in flat lists so removing a course frees its slots for the next refresh.
+#the vocabulary is also kept sorted, a prefix lookup is a bisect into it
+class SearchIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.vocabulary = []  # sorted terms, for prefix matching
+        self.doc_terms = []  # slot -> {term: tf} (None when the slot is free)
+        self.doc_length = []
+        self.doc_course = []
+        self.doc_item = []  # slot -> the assignment dict
+        self.free = []
+        self.by_course = defaultdict(list)  # course_id -> slots
+        self.total_length = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    #replaces everything indexed for one course with these assignments
+    def update_course(self, course_id, assignments):
+        self.remove_course(course_id)
+        for a in assignments or []:
+            self._add(course_id, a)
+
+    def remove_course(self, course_id):
+        for slot in self.by_course.pop(course_id, []):
+            for term in self.doc_terms[slot]:
+                docs = self.postings[term]
+                del docs[slot]
+                if not docs:
+                    del self.postings[term]
+                    i = bisect_left(self.vocabulary, term)
+                    del self.vocabulary[i]
+            self.total_length -= self.doc_length[slot]
+            self.count -= 1
+            self.doc_terms[slot] = self.doc_item[slot] = None
+            self.free.append(slot)
+
+    def _add(self, course_id, assignment):
+        terms = defaultdict(int)
+        for word in tokenize(assignment.get('name') or ""):
+            terms[word] += NAME_BOOST
+        for word in tokenize(strip_html(assignment.get('description'))):
+            terms[word] += 1
+        length = sum(terms.values())
+
+        if self.free:
+            slot = self.free.pop()
+            self.doc_terms[slot], self.doc_length[slot] = terms, length
+            self.doc_course[slot], self.doc_item[slot] = course_id, assignment
+        else:
+            slot = len(self.doc_terms)
+            self.doc_terms.append(terms)
+            self.doc_length.append(length)
+            self.doc_course.append(course_id)
+            self.doc_item.append(assignment)
+        for term, tf in terms.items():
+            if term not in self.postings:
+                insort(self.vocabulary, term)
+            self.postings[term][slot] = tf
+        self.by_course[course_id].append(slot)
+        self.total_length += length
+        self.count += 1
+
+    def _prefix_terms(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        terms = []
+        for term in self.vocabulary[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    #best matches for the query as [(score, course_id, assignment)], highest first.
+    #words of 3+ letters also match longer words they start ("enzym" finds "enzymes").
+    #course_ids limits the search to those courses
+    def search(self, query, limit=5, course_ids=None):
+        if not self.count:
+            return []
+        allowed = set(course_ids) if course_ids else None
+        course_slots = [slot for c in allowed for slot in self.by_course.get(c, [])] if allowed else None
+        # (upper bound on what the word can add to a score, [(term, weight, idf)])
+        words = []
+        for word in set(tokenize(query)):
+            expansions = [(word, 1.0)] if word in self.postings else []
+            if len(word) >= 3:
+                expansions += [(t, PREFIX_WEIGHT) for t in self._prefix_terms(word) if t != word]
+            if expansions:
+                terms = [(t, w, self._idf(t)) for t, w in expansions]
+                words.append((max(w * idf for _, w, idf in terms) * (K1 + 1), terms))
+        # max-score pruning: rarest words first, and once the words left can't lift a
+        # new document into the top `limit` they only add to documents already found,
+        # so a common word like "homework" doesn't walk its whole posting list
+        words.sort(key=lambda item: item[0], reverse=True)
+        remaining = sum(bound for bound, _ in words)
+        scores = {}
+        scale = K1 * B * self.count / self.total_length if self.total_length else 0.0
+        for bound, terms in words:
+            only_found = (len(scores) >= limit
+                          and remaining < heapq.nlargest(limit, scores.values())[-1])
+            remaining -= bound
+            # a document counts once per query word, through its best matching term
+            word_scores = {}
+            for term, weight, idf in terms:
+                docs = self.postings[term]
+                if only_found:
+                    matches = [(slot, docs[slot]) for slot in scores if slot in docs]
+                elif course_slots is None:
+                    matches = docs.items()
+                elif len(course_slots) < len(docs):
+                    # walk the (smaller) course instead of the whole posting list
+                    matches = [(slot, docs[slot]) for slot in course_slots if slot in docs]
+                else:
+                    matches = [(slot, tf) for slot, tf in docs.items() if self.doc_course[slot] in allowed]
+                for slot, tf in matches:
+                    norm = K1 * (1 - B) + scale * self.doc_length[slot]
+                    score = weight * idf * tf * (K1 + 1) / (tf + norm)
+                    if score > word_scores.get(slot, 0.0):
+                        word_scores[slot] = score
+            for slot, score in word_scores.items():
+                scores[slot] = scores.get(slot, 0.0) + score
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(score, self.doc_course[slot], self.doc_item[slot]) for slot, score in best]
+
+    def _idf(self, term):
+        n = len(self.postings[term])
+        return math.log(1 + (self.count - n + 0.5) / (n + 0.5))
@@ -0,0 +1,718 @@
+#!/usr/bin/env python3
+# service.py - headless multi-user HTTP/JSON mode: answers CanvasChatBot queries for many Canvas tokens at once
+# run: python service.py --port 8080 --canvas-host https://nmsu.instructure.com
+# then: curl -X POST localhost:8080/query -H "Authorization: Bearer <token>" \
+#            -d '{"base_url": "https://nmsu.instructure.com", "query": "what is due this week?"}'
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from calendar_feed import CalendarFeed
+from Canvas_api import CanvasAPI
+from chatbot import CanvasChatBot
+from course_cache import SharedCourseCache
+from live_events import ASSIGNMENT_CHANGES, LiveEventConsumer, SequenceTracker, event_host, event_sequence
+from metrics import RequestMetrics
+from sync_engine import SyncEngine
+from timeframes import user_timezone
+
+DEFAULT_IDLE_TIMEOUT = 15 * 60       # seconds a tenant stays loaded without requests
+DEFAULT_LOAD_BYTES = 20 * 1024 * 1024  # max size of the data one account loads at login or holds later
+DEFAULT_TOTAL_BYTES = 1024 * 1024 * 1024  # max size of the data of every loaded account together
+MAX_BODY_BYTES = 64 * 1024
+LIVE_FLUSH_INTERVAL = 0.5  # seconds between passes applying queued live events
+DEFAULT_RECONCILE_INTERVAL = 15 * 60  # seconds between full re-fetches of a live user's courses
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 401: "Unauthorized",
+           404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error",
+           502: "Bad Gateway"}
+
+log = logging.getLogger("service")
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+#a Canvas URL split into its parts, a bare host name means https
+def _split_canvas_url(url):
+    url = url.strip()
+    return urlsplit(url if "://" in url else "https://" + url)
+
+
+#"https://school.instructure.com" for a Canvas URL or a bare host name
+def canvas_origin(url):
+    parts = _split_canvas_url(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+#one Canvas user: their pooled CanvasAPI, the data loaded at login and a chatbot over it
+class Tenant:
+    def __init__(self, key, api, course_cache):
+        self.key = key
+        self.api = api
+        self.course_cache = course_cache
+        self.shared_courses = []  # (course_id, sections) acquired from course_cache
+        self.user = None
+        self.courses = []
+        self.assignments_cache = {}
+        self.chatbot = None
+        self.live = None  # LiveEventConsumer applying pushed Canvas changes to the data below
+        self.calendar = None  # CalendarFeed, built on the first /calendar.ics request
+        self.feed = None  # calendar feed token, see FeedTokens
+        # held while the data above is read (a query, the calendar) or changed (live events)
+        self.lock = threading.Lock()
+        # runs the live engine's apply step. the assignment lists are this user's own (see
+        # SharedCourseCache), so holding this user's lock is enough
+        self.dispatch = self.locked
+        self.reconciled_at = time.monotonic()
+        self.load_bytes = 0
+        self.last_used = time.monotonic()
+        self.active = 0  # requests currently using this tenant, never evicted while > 0
+
+    # runs in a worker thread
+    def load(self, max_load_bytes):
+        user = self.api.get_current_user()
+        if not user:
+            raise ServiceError(401, "Canvas rejected the token")
+        # assignment definitions come from the cache shared by every tenant,
+        # only this user's courses, grades and submissions are loaded per user
+        data = self.api.load_login_data(with_assignments=False)
+        if data is None:
+            raise ServiceError(502, f"Could not load data from Canvas: {self.api.last_error}")
+
+        # refuses accounts too big to hold at all. the caches that fill up afterwards are
+        # measured again by TenantPool.enforce_budget. the serialized size is a cheap, stable
+        # stand-in for the memory the data uses
+        self.load_bytes = len(json.dumps(data, separators=(",", ":"), default=str))
+        if self.load_bytes > max_load_bytes:
+            raise ServiceError(413, f"Account data is {self.load_bytes} bytes, over the {max_load_bytes} byte limit")
+
+        self.user = user
+        self.courses = [c for c in data['courses'] if c.get('name') and c.get('name').strip().lower() != 'none']
+        visible = {c.get('id') for c in data['courses']}
+        for course in self.courses:
+            course_id = course.get('id')
+            sections = tuple(sorted(course.get('section_ids') or ()))
+            assignments = self.course_cache.acquire(self.api, course_id, visible, sections)
+            if assignments is None:
+                continue
+            self.shared_courses.append((course_id, sections))
+            if assignments:
+                self.assignments_cache[course_id] = assignments
+        # dates in questions are read in the user's Canvas time zone, not the server's
+        self.chatbot = CanvasChatBot(self.api, self.courses, self.assignments_cache, tz=user_timezone(user))
+        # never started, the engine only applies what live events bring and fetches their gaps
+        engine = SyncEngine(self.api, self.courses, self.assignments_cache, dispatch=self.dispatch)
+        self.live = LiveEventConsumer(engine, user.get('id'))
+        self.live.engine.add_listener(self.chatbot.stats.apply_events)
+
+    def locked(self, fn):
+        with self.lock:
+            return fn()
+
+    # runs in a worker thread. the serialized size of everything now held for this user,
+    # assignment definitions shared with other users included
+    def measure(self):
+        with self.lock:
+            data = [self.courses, self.assignments_cache, self.api.grade_cache, self.api.submission_cache,
+                    self.api.group_cache, list(self.api.event_cache.values()), self.api.etag_cache]
+            self.load_bytes = len(json.dumps(data, separators=(",", ":"), default=str))
+        return self.load_bytes
+
+    #takes the shared definitions of a course after another user's download refreshed them.
+    #this user's copies of the overridden assignments are kept, the ones that became
+    #overridden since are fetched with this user's token. runs in a worker thread
+    def take_definitions(self, course_id, definitions, overridden):
+        current = self.assignments_cache.get(course_id) or []
+        own = [a for a in current if a.get('id') in overridden]
+        missing = overridden - {a.get('id') for a in own}
+        if missing:
+            own += self.api.get_assignments(course_id, assignment_ids=sorted(missing)) or []
+
+        def swap():
+            # a new list: a query still reading the old one finishes on a consistent copy
+            self.assignments_cache[course_id] = list(definitions) + own
+            self.chatbot.invalidate_courses([course_id])
+        self.dispatch(swap)
+
+    # runs in a worker thread
+    def query(self, query, session_id=None):
+        with self.lock:
+            return self.chatbot.process_query(query, session_id)
+
+    # runs in a worker thread, returns (etag, iterator of .ics bytes chunks) or (etag, None)
+    # when the client already has that version. the fingerprints make the update a no-op while
+    # nothing changed. the chunks are produced as they are sent, the file is never joined up
+    def calendar_ics(self, known_etags=()):
+        with self.lock:
+            if self.calendar is None:
+                self.calendar = CalendarFeed(self.api.base_url)
+            self.calendar.update(self.courses, self.assignments_cache)
+            etag = self.calendar.etag
+            if etag in known_etags:
+                return etag, None
+            return etag, self.calendar.chunks()
+
+    def close(self):
+        for course_id, sections in self.shared_courses:
+            self.course_cache.release(self.api.base_url, course_id, sections)
+        self.shared_courses = []
+        self.api.close()
+
+
+#opaque calendar feed tokens for loaded accounts, so a feed URL a calendar app (and every
+#proxy on the way) sees never carries the Canvas token itself. only a hash of each feed token
+#is kept here, mapped to the key of its tenant; the feed token lives on the Tenant. a loaded
+#account gets the same feed token each time it asks, and the feed ends with the tenant: once
+#it is evicted (or the service restarts) the account has to ask for a new feed URL
+class FeedTokens:
+    def __init__(self):
+        self._tenants = {}  # sha256 of a feed token -> TenantPool.tenant_key
+
+    def issue(self, tenant):
+        if tenant.feed is None:
+            tenant.feed = secrets.token_urlsafe(32)
+            self._tenants[_digest(tenant.feed)] = tenant.key
+        return tenant.feed
+
+    #the tenant key of a feed token, None when it was never issued or has expired
+    def tenant_key(self, feed):
+        return self._tenants.get(_digest(feed))
+
+    def expire(self, tenant):
+        if tenant.feed is not None:
+            self._tenants.pop(_digest(tenant.feed), None)
+            tenant.feed = None
+
+    def __len__(self):
+        return len(self._tenants)
+
+
+def _digest(secret):
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+#keeps one Tenant per (Canvas URL, token), loads each at most once at a time and
+#drops tenants that have been idle for idle_timeout seconds, or that hold too much data
+#(see enforce_budget)
+class TenantPool:
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT, max_load_bytes=DEFAULT_LOAD_BYTES, executor=None,
+                 max_total_bytes=DEFAULT_TOTAL_BYTES):
+        self.idle_timeout = idle_timeout
+        self.max_load_bytes = max_load_bytes
+        self.max_total_bytes = max_total_bytes
+        self.executor = executor
+        self.feed_tokens = FeedTokens()
+        self.course_cache = SharedCourseCache(on_refresh=self._course_refreshed)
+        # one metrics object for every tenant's CanvasAPI
+        self.metrics = RequestMetrics()
+        self.tenants = {}
+        self.live_errors = 0  # live event passes that failed, see ChatbotService._flush_live
+        self._loading = {}  # key -> asyncio.Task so concurrent first requests share one load
+
+    @staticmethod
+    def tenant_key(base_url, token):
+        base_url = base_url.strip().rstrip("/")
+        if base_url.endswith("/api/v1"):
+            base_url = base_url[:-len("/api/v1")]
+        # the token itself is never used as a dict key or logged
+        return (base_url, _digest(token))
+
+    async def acquire(self, base_url, token):
+        key = self.tenant_key(base_url, token)
+        tenant = self.tenants.get(key)
+        if tenant is None:
+            task = self._loading.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._load(key, base_url, token))
+                self._loading[key] = task
+            tenant = await asyncio.shield(task)
+            tenant.active += 1
+            tenant.last_used = time.monotonic()
+            # a new account's data counts from now on, room is made by dropping others
+            self.enforce_budget()
+            return tenant
+        tenant.active += 1
+        tenant.last_used = time.monotonic()
+        return tenant
+
+    #the loaded tenant of a key, acquired like acquire() does, or None when it isn't loaded
+    def acquire_loaded(self, key):
+        tenant = self.tenants.get(key)
+        if tenant is not None:
+            tenant.active += 1
+            tenant.last_used = time.monotonic()
+        return tenant
+
+    def release(self, tenant):
+        tenant.active -= 1
+        tenant.last_used = time.monotonic()
+
+    async def _load(self, key, base_url, token):
+        tenant = Tenant(key, CanvasAPI(base_url, token, metrics=self.metrics), self.course_cache)
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, tenant.load, self.max_load_bytes)
+        except Exception:
+            tenant.close()
+            raise
+        finally:
+            self._loading.pop(key, None)
+        self.tenants[key] = tenant
+        return tenant
+
+    #SharedCourseCache.on_refresh: every loaded user of the refreshed definitions moves over
+    #to them and drops what it built from the old ones
+    def _course_refreshed(self, instance, course_id, sections):
+        definitions, overridden = self.course_cache.refreshed(instance, course_id, sections)
+        if definitions is None:
+            return
+        for tenant in list(self.tenants.values()):
+            if tenant.api.base_url == instance and (course_id, sections) in tenant.shared_courses:
+                tenant.take_definitions(course_id, definitions, overridden)
+
+    #loaded tenants by Canvas host name (with and without the port), for routing live events
+    def by_host(self):
+        hosts = {}
+        for tenant in self.tenants.values():
+            parts = urlsplit(tenant.key[0])
+            for host in {parts.hostname, parts.netloc}:
+                hosts.setdefault(host, []).append(tenant)
+        return hosts
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for key, tenant in list(self.tenants.items()):
+            if tenant.active == 0 and tenant.last_used < cutoff:
+                self._drop(key)
+
+    # runs in a worker thread, updates every tenant's load_bytes for enforce_budget
+    def measure(self):
+        for tenant in list(self.tenants.values()):
+            tenant.measure()
+
+    #drops the tenants whose data outgrew max_load_bytes since login, then the least recently
+    #used ones while all of them together hold more than max_total_bytes. works on the sizes
+    #of the last measure(); a tenant in use is left for a later pass
+    def enforce_budget(self):
+        for key, tenant in list(self.tenants.items()):
+            if tenant.active == 0 and tenant.load_bytes > self.max_load_bytes:
+                log.info("dropping a user of %s holding %d bytes", key[0], tenant.load_bytes)
+                self._drop(key)
+        total = sum(t.load_bytes for t in self.tenants.values())
+        for tenant in sorted(self.tenants.values(), key=lambda t: t.last_used):
+            if total <= self.max_total_bytes:
+                break
+            if tenant.active == 0:
+                total -= tenant.load_bytes
+                self._drop(tenant.key)
+
+    def _drop(self, key):
+        tenant = self.tenants.pop(key)
+        self.feed_tokens.expire(tenant)
+        tenant.close()
+
+    def stats(self):
+        live = sum((t.live.stats for t in self.tenants.values() if t.live), Counter())
+        return {'tenants': len(self.tenants),
+                'loading': len(self._loading),
+                'live_events': dict(live, pending=sum(t.live.pending() for t in self.tenants.values() if t.live),
+                                    errors=self.live_errors),
+                'load_bytes': sum(t.load_bytes for t in self.tenants.values()),
+                'feed_tokens': len(self.feed_tokens),
+                'shared_courses': self.course_cache.stats()}
+
+
+class ChatbotService:
+    # allowed_hosts: the Canvas instances tokens may be sent to (see canvas_origin), any other
+    # base_url is refused so the service can't be pointed at arbitrary hosts.
+    # live_events_secret turns on POST /live-events, senders must pass it in X-Live-Events-Secret.
+    # metrics_secret turns on GET /metrics(.json), scrapers must send it as a bearer token.
+    # with live events on, every user's courses are still re-fetched each reconcile_interval
+    # seconds, for changes whose events were lost without a later one to show it.
+    # max_load_bytes bounds one account's data, max_total_bytes all accounts' together
+    def __init__(self, allowed_hosts=(), idle_timeout=DEFAULT_IDLE_TIMEOUT, max_load_bytes=DEFAULT_LOAD_BYTES,
+                 workers=32, live_events_secret=None, metrics_secret=None,
+                 reconcile_interval=DEFAULT_RECONCILE_INTERVAL, max_total_bytes=DEFAULT_TOTAL_BYTES):
+        self.allowed_origins = {canvas_origin(host) for host in allowed_hosts}
+        self.live_events_secret = live_events_secret
+        self.reconcile_interval = reconcile_interval
+        self.metrics_secret = metrics_secret
+        self.sequences = SequenceTracker()  # numbering of every live event stream, before routing
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chatbot")
+        self.pool = TenantPool(idle_timeout, max_load_bytes, self.executor, max_total_bytes)
+        self.server = None
+        self._connections = set()
+        # (method, path) -> async handler(request) returning (status, body, headers)
+        self.routes = {
+            ("POST", "/query"): self.handle_query,
+            ("POST", "/live-events"): self.handle_live_events,
+            ("POST", "/calendar-token"): self.handle_calendar_token,
+            ("GET", "/calendar.ics"): self.handle_calendar,
+            ("GET", "/health"): self.handle_health,
+            ("GET", "/metrics"): self.handle_metrics,
+            ("GET", "/metrics.json"): self.handle_metrics_json,
+        }
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        self._evictor = asyncio.ensure_future(self._evict_loop())
+        self._live_flusher = asyncio.ensure_future(self._live_loop())
+        return self.server
+
+    async def stop(self):
+        self._evictor.cancel()
+        self._live_flusher.cancel()
+        self.server.close()
+        for writer in list(self._connections):
+            writer.close()
+        await self.server.wait_closed()
+        for tenant in list(self.pool.tenants.values()):
+            tenant.close()
+        self.executor.shutdown(wait=False)
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    # drops idle tenants, then re-measures what every tenant holds (their caches keep
+    # filling after login) and drops tenants until the memory budget fits again
+    async def _evict_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(min(30, self.pool.idle_timeout))
+            self.pool.evict_idle()
+            try:
+                await loop.run_in_executor(self.executor, self.pool.measure)
+            except Exception:
+                log.exception("measuring tenants failed")
+                continue
+            self.pool.enforce_budget()
+
+    # applies the live events that have waited out their reorder window. the tenants
+    # are held like a request holds them so eviction can't close one mid-way
+    async def _live_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(LIVE_FLUSH_INTERVAL)
+            hosts = None
+            for host, course_id in self.sequences.gaps():
+                hosts = hosts or self.pool.by_host()
+                for tenant in hosts.get(host, []):
+                    if tenant.live and any(c.get('id') == course_id for c in tenant.courses):
+                        tenant.live.mark_gap(course_id)
+            if self.live_events_secret:
+                self._reconcile()
+            busy = [t for t in self.pool.tenants.values() if t.live and t.live.pending()]
+            if not busy:
+                continue
+            for tenant in busy:
+                tenant.active += 1
+            try:
+                await loop.run_in_executor(self.executor, self._flush_live, busy)
+            except Exception:
+                self.pool.live_errors += 1
+                log.exception("applying live events failed")
+            finally:
+                for tenant in busy:
+                    self.pool.release(tenant)
+
+    # a lost event that is the last of its stream leaves no gap behind it, so the courses of
+    # every user not reconciled for reconcile_interval are fetched again on the next flush
+    def _reconcile(self):
+        cutoff = time.monotonic() - self.reconcile_interval
+        for tenant in self.pool.tenants.values():
+            if tenant.live and tenant.reconciled_at <= cutoff:
+                tenant.reconciled_at = time.monotonic()
+                for course in tenant.courses:
+                    tenant.live.mark_gap(course.get('id'))
+
+    # runs in a worker thread. every user on a Canvas host receives the events of their own
+    # courses and applies them to their own assignment lists, so each chatbot only drops what
+    # it built from the courses its own events changed
+    def _flush_live(self, tenants):
+        for tenant in tenants:
+            try:
+                events = tenant.live.flush()
+            except Exception:
+                # what the failed re-fetch was for is fetched again by the next reconciliation
+                self.pool.live_errors += 1
+                log.exception("applying live events failed for a user of %s", tenant.key[0])
+                continue
+            course_ids = {event.course_id for event in events if event.kind in ASSIGNMENT_CHANGES}
+            if course_ids:
+                with tenant.lock:
+                    tenant.chatbot.invalidate_courses(course_ids)
+
+    # ---- HTTP/1.1 with keep-alive, just enough for JSON clients ----
+
+    async def _handle_connection(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self._write(writer, 413, {"error": "request body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                request = {'method': method, 'target': target, 'path': target.split("?", 1)[0],
+                           'headers': headers, 'body': body}
+                status, payload, extra = await self._dispatch(request)
+                close = headers.get("connection", "").lower() == "close"
+                await self._write(writer, status, payload, extra, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, request):
+        handler = self.routes.get((request['method'], request['path']))
+        if handler is None:
+            return 404, {"error": "not found"}, None
+        try:
+            return await handler(request)
+        except ServiceError as e:
+            return e.status, {"error": str(e)}, None
+        except Exception:
+            log.exception("%s %s failed", request['method'], request['path'])
+            return 500, {"error": "internal error"}, None
+
+    # payload is bytes, text, JSON data, or an iterator of bytes chunks that is sent with
+    # chunked transfer encoding as it is produced
+    async def _write(self, writer, status, payload, extra=None, close=False):
+        extra = dict(extra or {})
+        chunks = None
+        if isinstance(payload, (bytes, str)):
+            data = payload.encode() if isinstance(payload, str) else payload
+        elif isinstance(payload, (dict, list)):
+            data = json.dumps(payload).encode()
+            extra.setdefault("Content-Type", "application/json")
+        else:
+            chunks, data = payload, b""
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                "Transfer-Encoding: chunked" if chunks is not None else f"Content-Length: {len(data)}"]
+        head += [f"{k}: {v}" for k, v in extra.items()]
+        if close:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+        if chunks is not None:
+            for chunk in chunks:
+                if chunk:
+                    writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+
+    # ---- endpoints ----
+
+    # the Canvas URL and token come from the JSON body or the X-Canvas-Url / Authorization headers.
+    # the URL must be one of the allowed Canvas instances, it comes back as its bare origin
+    def _credentials(self, request, body):
+        base_url = body.get("base_url") or request['headers'].get("x-canvas-url")
+        token = body.get("token")
+        auth = request['headers'].get("authorization", "")
+        if not token and auth.lower().startswith("bearer "):
+            token = auth[7:].strip()
+        if not isinstance(base_url, str) or not base_url or not isinstance(token, str) or not token:
+            raise ServiceError(400, "base_url and token are required")
+        return self._allowed_origin(base_url), token
+
+    def _allowed_origin(self, base_url):
+        try:
+            origin = canvas_origin(base_url)
+            parts = _split_canvas_url(base_url)
+        except ValueError:
+            raise ServiceError(400, "base_url is not a valid URL")
+        if (parts.username or parts.password or parts.query or parts.fragment
+                or parts.path.rstrip("/") not in ("", "/api/v1") or origin not in self.allowed_origins):
+            raise ServiceError(400, "base_url is not an allowed Canvas instance")
+        return origin
+
+    def _json_body(self, request):
+        try:
+            body = json.loads(request['body'] or b"{}")
+        except ValueError:
+            raise ServiceError(400, "body must be JSON")
+        if not isinstance(body, dict):
+            raise ServiceError(400, "body must be a JSON object")
+        return body
+
+    async def handle_query(self, request):
+        body = self._json_body(request)
+        query = (body.get("query") or "").strip()
+        if not query:
+            raise ServiceError(400, "query is required")
+        base_url, token = self._credentials(request, body)
+        # optional, any string the client picks; follow-up questions need the same one
+        session_id = body.get("session_id")
+        if session_id is not None and not isinstance(session_id, str):
+            raise ServiceError(400, "session_id must be a string")
+
+        tenant = await self.pool.acquire(base_url, token)
+        try:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.executor, tenant.query, query, session_id)
+        finally:
+            self.pool.release(tenant)
+        return 200, {"response": response}, None
+
+    # a feed token for the account's calendar, authenticated like /query. the answer's path
+    # is what a calendar app subscribes to
+    async def handle_calendar_token(self, request):
+        base_url, token = self._credentials(request, self._json_body(request))
+        # only accounts Canvas accepts get a feed token
+        tenant = await self.pool.acquire(base_url, token)
+        feed = self.pool.feed_tokens.issue(tenant)
+        self.pool.release(tenant)
+        return 200, {"feed_token": feed, "path": f"/calendar.ics?feed={feed}"}, None
+
+    # the due dates as an iCalendar feed. calendar apps can only be given a URL, so it names
+    # the account by a feed token from /calendar-token; a Canvas token in the URL is refused.
+    # a client that sends back the ETag it got gets an empty 304 while nothing changed
+    async def handle_calendar(self, request):
+        params = {k: v[-1] for k, v in parse_qs(urlsplit(request['target']).query).items()}
+        if "token" in params:
+            raise ServiceError(400, "Canvas tokens are not accepted in URLs, get a feed token "
+                                    "from POST /calendar-token")
+        key = self.pool.feed_tokens.tenant_key(params.get("feed", ""))
+        tenant = self.pool.acquire_loaded(key) if key else None
+        if tenant is None:
+            raise ServiceError(404, "unknown or expired calendar feed, get a new one from POST /calendar-token")
+
+        known = {t.strip() for t in request['headers'].get("if-none-match", "").split(",") if t.strip()}
+        try:
+            loop = asyncio.get_running_loop()
+            etag, body = await loop.run_in_executor(self.executor, tenant.calendar_ics, known)
+        finally:
+            self.pool.release(tenant)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if body is None:
+            return 304, b"", headers
+        return 200, body, dict(headers, **{"Content-Type": "text/calendar; charset=utf-8"})
+
+    # Canvas Live Events (one event, a list, or {"events": [...]}) from a webhook or a queue
+    # bridge. each goes to the loaded users it concerns, users who aren't loaded get fresh
+    # data when they next log in anyway
+    async def handle_live_events(self, request):
+        if not self.live_events_secret:
+            raise ServiceError(404, "live events are not enabled")
+        secret = request['headers'].get("x-live-events-secret", "")
+        if not hmac.compare_digest(secret.encode(), self.live_events_secret.encode()):
+            raise ServiceError(401, "wrong live events secret")
+        try:
+            body = json.loads(request['body'] or b"[]")
+        except ValueError:
+            raise ServiceError(400, "body must be JSON")
+        events = body.get("events") if isinstance(body, dict) and "events" in body else body
+        events = [events] if isinstance(events, dict) else events
+        if not isinstance(events, list):
+            raise ServiceError(400, "body must be an event or a list of events")
+
+        default_host = urlsplit(request['headers'].get("x-canvas-url", "")).netloc
+        tenants = self.pool.by_host()
+        delivered = 0
+        for raw in events:
+            sequence = event_sequence(raw)
+            if sequence:
+                self.sequences.see(*sequence)
+            for tenant in tenants.get(event_host(raw) or default_host, []):
+                if tenant.live and tenant.live.submit(raw):
+                    delivered += 1
+        return 200, {"received": len(events), "delivered": delivered}, None
+
+    async def handle_health(self, request):
+        return 200, dict(self.pool.stats(), status="ok"), None
+
+    # the metrics cover every tenant, so only a scraper holding the metrics secret gets them
+    def _check_metrics_secret(self, request):
+        if not self.metrics_secret:
+            raise ServiceError(404, "metrics are not enabled")
+        auth = request['headers'].get("authorization", "")
+        secret = auth[7:].strip() if auth.lower().startswith("bearer ") else ""
+        if not hmac.compare_digest(secret.encode(), self.metrics_secret.encode()):
+            raise ServiceError(401, "wrong metrics secret")
+
+    # Canvas request metrics of every tenant, Prometheus text format
+    async def handle_metrics(self, request):
+        self._check_metrics_secret(request)
+        return 200, self.pool.metrics.to_prometheus(), {"Content-Type": "text/plain; version=0.0.4"}
+
+    async def handle_metrics_json(self, request):
+        self._check_metrics_secret(request)
+        return 200, self.pool.metrics.snapshot(), None
+
+
+async def _serve(args):
+    service = ChatbotService(args.canvas_host, args.idle_timeout, args.max_load_mb * 1024 * 1024, args.workers,
+                             args.live_events_secret, args.metrics_secret, args.reconcile_minutes * 60,
+                             args.max_total_mb * 1024 * 1024)
+    await service.start(args.host, args.port)
+    print(f"[Service] Canvas chatbot listening on http://{args.host}:{service.port} "
+          f"for {', '.join(sorted(service.allowed_origins))}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-user Canvas chatbot service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=32, help="threads answering queries")
+    parser.add_argument("--idle-timeout", type=int, default=DEFAULT_IDLE_TIMEOUT,
+                        help="seconds before an unused account is dropped from memory")
+    parser.add_argument("--canvas-host", action="append",
+                        default=os.environ.get("CANVAS_ALLOWED_HOSTS", "").split(),
+                        help="Canvas instance accounts may use, e.g. https://nmsu.instructure.com; repeat for "
+                             "more (default: space separated $CANVAS_ALLOWED_HOSTS)")
+    parser.add_argument("--max-load-mb", type=int, default=DEFAULT_LOAD_BYTES // (1024 * 1024),
+                        help="largest data set one account may load at login")
+    parser.add_argument("--max-total-mb", type=int, default=DEFAULT_TOTAL_BYTES // (1024 * 1024),
+                        help="most data all loaded accounts together may hold, the least recently used "
+                             "accounts are dropped beyond it")
+    parser.add_argument("--live-events-secret", default=os.environ.get("CANVAS_LIVE_EVENTS_SECRET"),
+                        help="enables POST /live-events for senders that pass it in X-Live-Events-Secret "
+                             "(default: $CANVAS_LIVE_EVENTS_SECRET)")
+    parser.add_argument("--reconcile-minutes", type=int, default=DEFAULT_RECONCILE_INTERVAL // 60,
+                        help="with live events, minutes between full re-fetches of each account's courses")
+    parser.add_argument("--metrics-secret", default=os.environ.get("CANVAS_METRICS_SECRET"),
+                        help="enables GET /metrics and /metrics.json for scrapers that send it as a bearer "
+                             "token (default: $CANVAS_METRICS_SECRET)")
+    args = parser.parse_args()
+    if not args.canvas_host:
+        parser.error("at least one --canvas-host is required")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
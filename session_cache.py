@@ -0,0 +1,87 @@
+# session_cache.py - saves the data loaded at login as a snapshot file so the next launch can start instantly
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from utils import app_data_dir
+
+# bump when the layout below changes, older snapshots are then ignored
+SNAPSHOT_VERSION = 1
+
+# only the assignment fields the app reads are kept to keep the file small
+ASSIGNMENT_FIELDS = ("id", "course_id", "name", "due_at", "points_possible",
+                     "updated_at", "description", "html_url")
+
+
+#one snapshot per Canvas instance and token (the token identifies the user),
+#the file name is a hash so the token itself is never written to disk
+def snapshot_path(base_url, token):
+    base_url = base_url.strip().rstrip("/")
+    if base_url.endswith("/api/v1"):
+        base_url = base_url[:-len("/api/v1")]
+    key = hashlib.sha256(f"{base_url}\n{token}".encode()).hexdigest()[:32]
+    folder = os.path.join(app_data_dir(), "snapshots")
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{key}.json.gz")
+
+
+#writes the snapshot atomically (temp file + rename) so a crash never leaves half a file
+def save_snapshot(base_url, token, user, courses, assignments_cache, grades, submissions, last_sync):
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "user": {"id": user.get("id"), "name": user.get("name")},
+        "last_sync": last_sync.isoformat(),
+        "courses": [{"id": c.get("id"), "name": c.get("name"), "course_code": c.get("course_code")}
+                    for c in courses],
+        # JSON only has string keys, they are turned back into ids on load
+        "assignments": {str(cid): [{k: a.get(k) for k in ASSIGNMENT_FIELDS} for a in items]
+                        for cid, items in assignments_cache.items()},
+        "grades": {str(cid): g for cid, g in grades.items()},
+        "submissions": {str(cid): subs for cid, subs in submissions.items()},
+    }
+    path = snapshot_path(base_url, token)
+    # created owner-only before anything is written to it
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+#returns the snapshot dict (same shapes as CanvasAPI.load_login_data plus "last_sync")
+#or None when there is no usable snapshot
+def load_snapshot(base_url, token):
+    path = snapshot_path(base_url, token)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    return {
+        "user": snapshot["user"],
+        "last_sync": datetime.fromisoformat(snapshot["last_sync"]),
+        "courses": snapshot["courses"],
+        "assignments": {_key(cid): items for cid, items in snapshot["assignments"].items()},
+        "grades": {_key(cid): g for cid, g in snapshot["grades"].items()},
+        "submissions": {_key(cid): subs for cid, subs in snapshot["submissions"].items()},
+    }
+
+
+#removes the snapshot, e.g. when the token stops working
+def delete_snapshot(base_url, token):
+    try:
+        os.remove(snapshot_path(base_url, token))
+    except OSError:
+        pass
+
+
+def _key(cid):
+    return int(cid) if cid.isdigit() else cid
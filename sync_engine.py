@@ -0,0 +1,297 @@
+# sync_engine.py - background sync that polls Canvas for changes and applies them to the loaded data in place
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone, timedelta
+
+# kind is one of the constants below, item is the assignment/submission/course dict
+# the event is about, old/new hold the previous and current value that changed
+ChangeEvent = namedtuple("ChangeEvent", "kind course_id item old new")
+
+NEW_COURSE = "new_course"
+NEW_ASSIGNMENT = "new_assignment"
+ASSIGNMENT_REMOVED = "assignment_removed"
+ASSIGNMENT_UPDATED = "assignment_updated"
+DUE_DATE_MOVED = "due_date_moved"
+GRADE_POSTED = "grade_posted"
+COURSE_GRADE_CHANGED = "course_grade_changed"
+SUBMITTED = "submitted"  # only pushed by live events, polls see the submission once it's graded
+
+DEFAULT_INTERVAL = 300  # seconds between polls
+
+# graded_since looks back this much further than the last poll that saw a new grade so
+# clock skew between us and Canvas can't hide one, duplicates are filtered out anyway
+GRADED_SINCE_OVERLAP = timedelta(minutes=2)
+
+
+class SyncEngine:
+    # courses and assignments_cache are the same objects the GUI/chatbot use, they are
+    # updated in place. dispatch runs the apply step, the GUI passes a function that
+    # hands it to the Tk thread, by default it runs on the sync thread
+    def __init__(self, api, courses, assignments_cache, interval=DEFAULT_INTERVAL, dispatch=None):
+        self.api = api
+        self.courses = courses
+        self.assignments_cache = assignments_cache
+        self.interval = interval
+        self.dispatch = dispatch or (lambda fn: fn())
+        self.listeners = []
+        self.last_sync = None
+        self._started = datetime.now(timezone.utc) - GRADED_SINCE_OVERLAP
+        self._graded_since = {}  # course_id -> graded_since of its next poll
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    #listeners are called with the list of ChangeEvents after every poll (may be empty)
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    #poll right away instead of waiting for the next scheduled cycle
+    def sync_now(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.sync_once()
+            except Exception as e:
+                # a failed poll just waits for the next cycle
+                self.api.last_error = str(e)
+
+    #one poll: fetch what changed on the calling thread, then apply it via dispatch
+    def sync_once(self):
+        fetched = self._fetch_changes()
+        if fetched is None:
+            return None
+        return self.apply_changes(lambda: self._apply(fetched))
+
+    #runs fn through dispatch and waits for it. fn changes the shared data and returns
+    #the ChangeEvents, which the listeners get right after on the same thread. polls and
+    #changes pushed by Canvas (live_events.py) both go through here
+    def apply_changes(self, fn):
+        done = threading.Event()
+        result = []
+
+        def apply():
+            try:
+                result.extend(fn())
+                for listener in self.listeners:
+                    listener(result)
+            finally:
+                done.set()
+
+        self.dispatch(apply)
+        done.wait()
+        return result
+
+    # network part, touches nothing the UI reads: what it fetched is written to the data and
+    # the API caches by _apply. an idle poll is 2 conditional requests per course plus 2, all
+    # answered 304: a course's graded_since only moves on once a poll has seen grades in it
+    def _fetch_changes(self):
+        poll_started = datetime.now(timezone.utc)
+        courses, courses_changed = self.api.get_courses_if_changed()
+        if courses is None:
+            return None
+
+        known = {c.get('id') for c in self.courses}
+        new_courses = []
+        if courses_changed:
+            new_courses = [c for c in courses if c.get('id') not in known
+                           and c.get('name') and c.get('name').strip().lower() != 'none']
+
+        # every course grade comes with the user's enrollments, one request for all courses
+        grades, grades_changed = self.api.get_course_grades_if_changed()
+        next_since = poll_started - GRADED_SINCE_OVERLAP
+        per_course = {}
+        for course in list(self.courses) + new_courses:
+            course_id = course.get('id')
+            assignments, assignments_changed = self.api.get_assignments_if_changed(course_id)
+            since = self._graded_since.get(course_id, self._started)
+            graded, graded_changed = self.api.get_graded_submissions_since_if_changed(
+                course_id, since.strftime('%Y-%m-%dT%H:%M:%SZ'))
+            if graded_changed and graded:
+                self._graded_since[course_id] = next_since
+            per_course[course_id] = {
+                'assignments': assignments if assignments_changed else None,
+                'grade': grades.get(course_id) if grades_changed else None,
+                'graded': (graded or []) if graded_changed else [],
+            }
+
+        return {'new_courses': new_courses, 'per_course': per_course, 'at': poll_started,
+                'grades_fetched': grades is not None}
+
+    # applies the fetched changes to the shared data and tells the listeners
+    def _apply(self, fetched):
+        events = []
+        for course in fetched['new_courses']:
+            self.courses.append(course)
+            events.append(ChangeEvent(NEW_COURSE, course.get('id'), course, None, course))
+
+        for course_id, changes in fetched['per_course'].items():
+            if changes['assignments'] is not None or changes['graded']:
+                # assignment groups embed both, the next what-if question reloads them
+                self.api.group_cache.pop(course_id, None)
+            if changes['assignments'] is not None:
+                events.extend(self._apply_assignments(course_id, changes['assignments']))
+            if changes['graded']:
+                events.extend(self._apply_graded(course_id, changes['graded']))
+            if changes['grade'] is not None:
+                events.extend(self.apply_course_grade(course_id, changes['grade']))
+
+        if fetched['grades_fetched']:
+            # every course grade was just checked, the cached ones are current (a 304 included)
+            self.api.mark_fresh("grades", fetched['per_course'])
+        self.last_sync = datetime.now()
+        return events
+
+    def _apply_assignments(self, course_id, fresh):
+        events = []
+        current = self.assignments_cache.get(course_id)
+        old_by_id = {a.get('id'): a for a in current or []}
+        fresh_ids = set()
+        for a in fresh:
+            fresh_ids.add(a.get('id'))
+            old = old_by_id.get(a.get('id'))
+            if old is None:
+                events.append(ChangeEvent(NEW_ASSIGNMENT, course_id, a, None, a))
+            elif old.get('due_at') != a.get('due_at'):
+                events.append(ChangeEvent(DUE_DATE_MOVED, course_id, a, old.get('due_at'), a.get('due_at')))
+            elif old.get('updated_at') != a.get('updated_at'):
+                events.append(ChangeEvent(ASSIGNMENT_UPDATED, course_id, a, old, a))
+        for assignment_id, old in old_by_id.items():
+            if assignment_id not in fresh_ids:
+                events.append(ChangeEvent(ASSIGNMENT_REMOVED, course_id, old, old, None))
+
+        # keep the same list object so anyone holding a reference sees the update. in the service
+        # the list is this user's own (SharedCourseCache.acquire), fresh comes with this user's
+        # token and may carry their submission and overrides, so it must not be a shared list
+        if current is None:
+            self.assignments_cache[course_id] = list(fresh)
+        else:
+            current[:] = fresh
+        return events
+
+    def _apply_graded(self, course_id, graded):
+        events = []
+        submissions = self.api.submission_cache.setdefault(course_id, [])
+        index = {s.get('assignment_id'): i for i, s in enumerate(submissions)}
+        for sub in graded:
+            i = index.get(sub.get('assignment_id'))
+            old = submissions[i] if i is not None else None
+            if old is not None and old.get('score') == sub.get('score') and old.get('graded_at') == sub.get('graded_at'):
+                continue  # already seen through the overlap window
+            if i is None:
+                index[sub.get('assignment_id')] = len(submissions)
+                submissions.append(sub)
+            else:
+                submissions[i] = sub
+            events.append(ChangeEvent(GRADE_POSTED, course_id, sub,
+                                      old.get('score') if old else None, sub.get('score')))
+        return events
+
+    # ---- single changes, as live events report them. call these inside apply_changes ----
+
+    #merges one assignment into its course's list in place, or takes it out when removed
+    def apply_assignment(self, course_id, assignment, removed=False):
+        self.api.group_cache.pop(course_id, None)
+        current = self.assignments_cache.setdefault(course_id, [])
+        i = next((i for i, a in enumerate(current) if a.get('id') == assignment.get('id')), None)
+        old = current[i] if i is not None else None
+        if removed:
+            if old is None:
+                return []
+            del current[i]
+            return [ChangeEvent(ASSIGNMENT_REMOVED, course_id, old, old, None)]
+        new = dict(old or {}, **assignment)
+        if old is None:
+            current.append(new)
+            return [ChangeEvent(NEW_ASSIGNMENT, course_id, new, None, new)]
+        if new == old:
+            return []
+        current[i] = new
+        if old.get('due_at') != new.get('due_at'):
+            return [ChangeEvent(DUE_DATE_MOVED, course_id, new, old.get('due_at'), new.get('due_at'))]
+        return [ChangeEvent(ASSIGNMENT_UPDATED, course_id, new, old, new)]
+
+    #a submission that was turned in (not graded yet), merged into the submission cache
+    def apply_submission(self, course_id, submission):
+        submissions = self.api.submission_cache.setdefault(course_id, [])
+        i = next((i for i, s in enumerate(submissions)
+                  if s.get('assignment_id') == submission.get('assignment_id')), None)
+        old = submissions[i] if i is not None else None
+        new = dict(old or {}, **submission)
+        if new == old:
+            return []
+        if i is None:
+            submissions.append(new)
+        else:
+            submissions[i] = new
+        return [ChangeEvent(SUBMITTED, course_id, new, old.get('submitted_at') if old else None,
+                            new.get('submitted_at'))]
+
+    #a newly graded submission, merged over what is held for it
+    def apply_grade(self, course_id, submission):
+        held = next((s for s in self.api.submission_cache.get(course_id) or []
+                     if s.get('assignment_id') == submission.get('assignment_id')), None)
+        return self._apply_graded(course_id, [dict(held or {}, **submission)])
+
+    def apply_course_grade(self, course_id, grade):
+        old = self.api.grade_cache.get(course_id)
+        new = dict(old or {}, **grade)
+        if new == old:
+            return []
+        self.api.grade_cache[course_id] = new
+        return [ChangeEvent(COURSE_GRADE_CHANGED, course_id, new, old, new)]
+
+    # ---- targeted re-fetches, when pushed changes show that one went missing ----
+
+    def refetch_assignments(self, course_id):
+        fresh, _ = self.api.get_assignments_if_changed(course_id)
+        if fresh is None:
+            return []
+        return self.apply_changes(lambda: self._apply_assignments(course_id, fresh))
+
+    def refetch_submission(self, course_id, assignment_id):
+        submission = self.api.get_single_assignment_submission(course_id, assignment_id)
+        if not submission:
+            return []
+        if submission.get('workflow_state') != 'graded':
+            return self.apply_changes(lambda: self.apply_submission(course_id, submission))
+        # graded, so it goes through the same path as a poll that saw it graded
+        return self.apply_changes(lambda: self._apply_graded(course_id, [submission]))
+
+    #everything of one course: assignments, submissions and the course grade
+    def refetch_course(self, course_id):
+        fresh, _ = self.api.get_assignments_if_changed(course_id)
+        submissions = self.api.fetch_submissions(course_id) or []
+        grade, grade_changed = self.api.get_course_grade_if_changed(course_id)
+
+        def apply():
+            self.api.group_cache.pop(course_id, None)
+            events = self._apply_assignments(course_id, fresh) if fresh is not None else []
+            events += self._apply_graded(course_id, [s for s in submissions if s.get('workflow_state') == 'graded'])
+            for submission in submissions:
+                if submission.get('workflow_state') != 'graded':
+                    events += self.apply_submission(course_id, submission)
+            if grade_changed:
+                events += self.apply_course_grade(course_id, grade)
+            return events
+        return self.apply_changes(apply)
+
+    def refetch_course_grade(self, course_id):
+        grade, changed = self.api.get_course_grade_if_changed(course_id)
+        if grade is None or not changed:
+            return []
+        return self.apply_changes(lambda: self.apply_course_grade(course_id, grade))
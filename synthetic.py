@@ -0,0 +1,227 @@
+# synthetic.py - synthetic course data and a query corpus for benchmarking CanvasChatBot offline
+import random
+from datetime import datetime, timezone, timedelta
+
+from mock_canvas import SUBJECTS, GROUPS
+
+TERM_WEEKS = 16
+
+# (kind, share of a course's work, usual due weekday 0=Mon, usual hour UTC)
+# weekly homework lands on a fixed weekday just before midnight, quizzes in the
+# morning, bigger items are rarer and cluster around midterm and the end of term
+CADENCE = [("Homework", 0.40, 4, 5), ("Quiz", 0.20, 1, 14), ("Reading Response", 0.15, 6, 5),
+           ("Lab Report", 0.10, 2, 5), ("Essay", 0.07, 4, 5), ("Project", 0.05, 6, 5), ("Exam", 0.03, 3, 16)]
+
+# description topics, so full-text search has something to find
+TOPICS = ["enzymes and reaction rates", "supply and demand curves", "the French Revolution", "linear regression",
+          "photosynthesis", "recursion and stacks", "the Civil War", "thermodynamics", "cell division",
+          "sorting algorithms", "poetry analysis", "probability distributions", "plate tectonics",
+          "market equilibrium", "organic compounds", "the Cold War"]
+
+
+#answers get_course_grade (and get_assignment_groups, get_calendar_events) from dicts,
+#so the chatbot runs with no network at all. grade_cache/submission_cache mirror CanvasAPI's
+class StaticGrades:
+    def __init__(self, grades, groups=None, events=None, submissions=None):
+        self.grades = grades
+        self.grade_cache = grades
+        self.submission_cache = submissions or {}
+        self.groups = groups or {}
+        self.events = events or []
+
+    def get_course_grade(self, course_id, refresh=False):
+        return self.grades.get(course_id)
+
+    def get_assignment_groups(self, course_id, refresh=False):
+        return self.groups.get(course_id)
+
+    def get_calendar_events(self, course_ids, refresh=False):
+        codes = {f"course_{c}" for c in course_ids}
+        return [e for e in self.events if e['context_code'] in codes]
+
+    #past-due assignments with no score, worked out from the assignment groups
+    def get_missing_submissions(self, course_ids=None, include_dismissed=False):
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        missing = [a for course_id, data in self.groups.items() if not course_ids or course_id in course_ids
+                   for group in data['groups'] for a in group['assignments']
+                   if a['due_at'] and a['due_at'] < now and a['submission']['score'] is None]
+        return sorted(missing, key=lambda a: a['due_at'])
+
+
+def _due_date(rnd, term_start, kind, weekday, hour, index, count):
+    if kind == "Exam":
+        # midterm, then the rest spread over the last two weeks
+        week = TERM_WEEKS // 2 if index % 2 == 0 else rnd.randint(TERM_WEEKS - 2, TERM_WEEKS - 1)
+    elif kind == "Project":
+        week = rnd.randint(TERM_WEEKS // 2, TERM_WEEKS - 1)
+    else:
+        # regular work is evenly spaced through the term
+        week = min(TERM_WEEKS - 1, int(index * TERM_WEEKS / max(count, 1)))
+    day = term_start + timedelta(weeks=week, days=weekday)
+    # instructors pick :59 or on-the-hour times, a few post late extensions
+    due = day.replace(hour=hour, minute=rnd.choice([0, 59]), second=0)
+    if rnd.random() < 0.05:
+        due += timedelta(days=rnd.randint(1, 3))
+    return due
+
+
+#n courses x m assignments. now sits `progress` of the way through the term so some
+#work is past, some due today/this week and the rest later; about 4% has no due date.
+#returns (courses, assignments_cache, grades) shaped like CanvasAPI returns them
+def generate(n_courses=6, n_assignments=40, seed=0, progress=0.6, now=None):
+    rnd = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    term_start = (now - timedelta(weeks=TERM_WEEKS * progress)).replace(hour=0, minute=0, second=0, microsecond=0)
+    term_start -= timedelta(days=term_start.weekday())
+
+    courses, assignments_cache, grades = [], {}, {}
+    for c in range(n_courses):
+        course_id = 100 + c
+        subject = SUBJECTS[c % len(SUBJECTS)]
+        level = 101 + c // len(SUBJECTS) * 100 + rnd.randint(0, 99)
+        courses.append({'id': course_id, 'name': f"{subject} {level}",
+                        'course_code': f"{subject[:4].upper()}{level}"})
+        items = []
+        for kind, share, weekday, hour in CADENCE:
+            count = max(1, round(n_assignments * share))
+            for i in range(count):
+                if len(items) >= n_assignments:
+                    break
+                due = _due_date(rnd, term_start, kind, weekday, hour, i, count)
+                items.append({'id': course_id * 10000 + len(items), 'course_id': course_id,
+                              'name': f"{kind} {i + 1}",
+                              # picked without rnd so the rest of the data stays the same for a seed
+                              'description': f"<p>{kind} on <b>{TOPICS[(c * 7 + len(items)) % len(TOPICS)]}</b>."
+                                             f" Submit through Canvas.</p>",
+                              'due_at': due.strftime('%Y-%m-%dT%H:%M:%SZ') if rnd.random() > 0.04 else None,
+                              'points_possible': {"Exam": 100, "Project": 100, "Essay": 50}.get(kind, 10)})
+        items.sort(key=lambda a: a['due_at'] or '9999')
+        assignments_cache[course_id] = items
+        score = round(min(100.0, max(35.0, rnd.gauss(84, 9))), 2)
+        letter = 'A' if score >= 90 else 'B' if score >= 80 else 'C' if score >= 70 else 'D' if score >= 60 else 'F'
+        grades[course_id] = {'current_score': score, 'current_grade': letter,
+                             'final_score': score, 'final_grade': letter}
+    return courses, assignments_cache, grades
+
+
+#assignment groups shaped like CanvasAPI.get_assignment_groups returns them, with a
+#score on most of the past-due work (about 8% is missing). every other course weights its groups
+def assignment_groups(courses, assignments_cache, seed=0, now=None):
+    rnd = random.Random(seed)
+    now = (now or datetime.now(timezone.utc)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    result = {}
+    for c, course in enumerate(courses):
+        groups = [{'id': g, 'name': name, 'group_weight': weight,
+                   'rules': {'drop_lowest': drop} if drop else {}, 'assignments': []}
+                  for g, (name, weight, drop, _) in enumerate(GROUPS)]
+        group_of = {kind: g for g, (_, _, _, kinds) in enumerate(GROUPS) for kind in kinds}
+        for a in assignments_cache.get(course['id'], []):
+            graded = a['due_at'] is not None and a['due_at'] < now and rnd.random() > 0.08
+            score = round(a['points_possible'] * min(1.0, rnd.gauss(0.85, 0.1)), 1) if graded else None
+            groups[group_of[a['name'].rsplit(' ', 1)[0]]]['assignments'].append(
+                dict(a, submission={'assignment_id': a['id'], 'score': score}))
+        result[course['id']] = {'apply_weights': c % 2 == 0, 'groups': groups}
+    return result
+
+
+# held-out phrasings for scoring intent detection: none of these are in the classifier's
+# training examples. {course} is filled with a real course subject
+INTENT_EVAL = [
+    ("assignments", "got anything due in {course} soon?"), ("assignments", "what needs to be turned in friday"),
+    ("assignments", "when's the {course} quiz"), ("assignments", "remind me what homework is left this week"),
+    ("assignments", "due dates for {course}"), ("assignments", "is the {course} lab due tonight"),
+    ("grades", "how am I doing in class"), ("grades", "what's my score in {course} right now"),
+    ("grades", "am I failing any courses"), ("grades", "which class am I doing worst in"),
+    ("grades", "how are my marks looking"), ("grades", "what grade do I have in {course}"),
+    ("courses", "which classes am I signed up for"), ("courses", "what courses am I in this term"),
+    ("courses", "how many courses am I taking"), ("courses", "list all my classes"),
+    ("help", "what sort of questions can I ask"), ("help", "how do i use you"),
+    ("help", "can you help"), ("help", "what are you able to do"),
+    ("whatif", "what score do I need on the final for a b in {course}"),
+    ("whatif", "what if I get a 60 on the final"), ("whatif", "how much do I need to pass {course}"),
+    ("whatif", "what if i get 9/10 on quiz 3 in {course}"), ("whatif", "can I still get a b+ in {course}"),
+    ("missing", "have I forgotten to submit anything"), ("missing", "which assignments are overdue"),
+    ("missing", "do I have any late assignments in {course}"), ("missing", "what did I not hand in"),
+    ("search", "which assignment talked about enzymes"), ("search", "find the {course} lab about photosynthesis"),
+    ("search", "look up the essay on the cold war"), ("search", "search for the recursion homework"),
+    ("trend", "how did my {course} grade change over the last month"), ("trend", "where did my grades fall the most"),
+    ("trend", "is my {course} grade trending up"), ("trend", "how have my grades moved this week"),
+    # change words that aren't about grades
+    ("assignments", "did anything change in my {course} assignments"), ("assignments", "anything due this fall"),
+    ("grades", "look up my grade in {course}"),
+    ("unknown", "good night"), ("unknown", "you're funny"), ("unknown", "what's the capital of france"),
+    ("unknown", "sing me a song"),
+]
+
+
+#(intent, query) pairs of INTENT_EVAL for these courses
+def intent_eval_set(courses):
+    subject = courses[0]['name'].split()[0].lower() if courses else "biology"
+    return [(intent, text.format(course=subject)) for intent, text in INTENT_EVAL]
+
+
+#a midterm and a final exam calendar event per course, where the term puts them
+def calendar_events(courses, progress=0.6, now=None):
+    now = now or datetime.now(timezone.utc)
+    term_start = now - timedelta(weeks=TERM_WEEKS * progress)
+    events = []
+    for course in courses:
+        for title, week in (("Midterm Exam", TERM_WEEKS * 0.7), ("Final Exam", TERM_WEEKS + 1)):
+            start = (term_start + timedelta(weeks=week)).replace(hour=15, minute=0, second=0, microsecond=0)
+            events.append({'id': len(events) + 1, 'title': title, 'context_code': f"course_{course['id']}",
+                           'start_at': start.strftime('%Y-%m-%dT%H:%M:%SZ')})
+    return events
+
+
+#a year of history into a GradeHistory: each course grade random-walks with a change most
+#days, and a few submission scores land each week. returns the rows written
+def fill_history(history, courses, days=365, seed=0, now=None):
+    rnd = random.Random(seed)
+    end = int((now or datetime.now(timezone.utc)).timestamp())
+    written = 0
+    for course in courses:
+        score = rnd.uniform(75, 95)
+        for day in range(days, 0, -1):
+            when = end - day * 86400 + rnd.randint(0, 86399)
+            rows = []
+            if rnd.random() < 0.7:
+                score = min(100.0, max(40.0, score + rnd.gauss(0, 1.2)))
+                rows.append((0, round(score, 2)))
+            if rnd.random() < 0.4:
+                rows.append((course['id'] * 10000 + day, round(rnd.uniform(5, 10), 1)))
+            written += history.record_many(course['id'], rows, when)
+    return written
+
+
+#(intent, case, query) covering every intent, every timeframe, with and without a course
+def query_corpus(courses):
+    subject = courses[0]['name'].split()[0].lower() if courses else "biology"
+    corpus = []
+    for timeframe in ("today", "tomorrow", "this week", "upcoming"):
+        phrase = "" if timeframe == "upcoming" else f" {timeframe}"
+        corpus.append(("assignments", f"{timeframe}", f"what assignments are due{phrase}?"))
+        corpus.append(("assignments", f"{timeframe}+course", f"what homework is due{phrase} for {subject}?"))
+    for case, phrase in (("weekday", "next friday"), ("relative", "in the next 3 days"), ("date", "by dec 1"),
+                         ("month", "this month"), ("milestone", "before midterms")):
+        corpus.append(("assignments", case, f"what's due {phrase}?"))
+    corpus += [
+        ("assignments", "next", "what's next?"),
+        ("grades", "course", f"what's my grade in {subject}?"),
+        ("grades", "lowest", "what's my lowest grade?"),
+        ("grades", "highest", "what is my best score?"),
+        ("grades", "passing", "am I passing all my classes?"),
+        ("grades", "overview", "how are my grades?"),
+        ("whatif", "target", f"what do I need on exam 2 to get a B in {subject}?"),
+        ("whatif", "remaining", f"what do I need to get an A- in {subject}?"),
+        ("whatif", "scenario", f"what if I get 85% on exam 2 in {subject}?"),
+        ("search", "all", "which assignment was about enzymes?"),
+        ("search", "prefix", "find the assignment on thermo"),
+        ("search", "course", f"search {subject} for sorting algorithms"),
+        ("missing", "all", "what am I missing?"),
+        ("missing", "course", f"do I have overdue work in {subject}?"),
+        ("courses", "list", "list the courses I'm enrolled in"),
+        ("courses", "summary", "what classes am I taking?"),
+        ("help", "help", "what can you do?"),
+        ("unknown", "fallback", "tell me a joke"),
+    ]
+    return corpus
@@ -0,0 +1,83 @@
+# test_bulk_sync.py - the batch sync of many tokens against the mock Canvas
+import json
+import queue
+import threading
+import time
+
+import pytest
+
+import bulk_sync
+from bulk_sync import read_manifest, run_bulk_sync, sync_account
+from mock_canvas import build_fixtures, start_mock_canvas
+
+
+@pytest.fixture
+def canvas():
+    server = start_mock_canvas(build_fixtures(courses=2, assignments=10, seed=6))
+    yield server
+    server.shutdown()
+
+
+def test_manifest_reads_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "tokens.csv"
+    csv_path.write_text("account_id,base_url,token\na1, https://canvas.test ,t1\n,https://canvas.test,t2\n")
+    assert read_manifest(str(csv_path)) == [
+        {"account_id": "a1", "base_url": "https://canvas.test", "token": "t1"},
+        {"account_id": "2", "base_url": "https://canvas.test", "token": "t2"}]
+    jsonl_path = tmp_path / "tokens.jsonl"
+    jsonl_path.write_text(json.dumps({"account_id": "x", "base_url": "https://canvas.test"}) + "\n")
+    with pytest.raises(ValueError):
+        read_manifest(str(jsonl_path))
+
+
+def test_sync_account_exports_upcoming_work_and_grades(canvas):
+    record = sync_account({"account_id": "a1", "base_url": canvas.url, "token": "t1"}, days=30)
+    assert record["status"] == "ok" and record["user"]["id"]
+    assert len(record["grades"]) == 2
+    due = [u["due_at"] for u in record["upcoming"]]
+    assert due and due == sorted(due)
+
+    failed = sync_account({"account_id": "a2", "base_url": canvas.url + "/gone", "token": "t2"})
+    assert failed["status"] == "failed" and "authentication failed" in failed["error"]
+
+
+def test_the_host_limit_caps_accounts_synced_at_once(monkeypatch):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    class SlowAPI:
+        def __init__(self, base_url, token):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+
+        def get_current_user(self):
+            time.sleep(0.05)
+            return None
+
+        def close(self):
+            with lock:
+                active[0] -= 1
+
+    monkeypatch.setattr(bulk_sync, "CanvasAPI", SlowAPI)
+    accounts = [{"account_id": str(i), "base_url": "https://canvas.test", "token": f"t{i}"} for i in range(6)]
+    results = queue.Queue()
+    bulk_sync._sync_chunk(accounts, results, 14, {"canvas.test": threading.BoundedSemaphore(2)}, threads=6)
+    assert results.qsize() == 6 and peak[0] == 2
+
+
+def test_a_batch_streams_every_account_and_resumes_from_its_checkpoint(canvas, tmp_path):
+    manifest = tmp_path / "tokens.csv"
+    manifest.write_text("account_id,base_url,token\n"
+                        + "".join(f"a{i},{canvas.url},t{i}\n" for i in range(4))
+                        + f"bad,{canvas.url}/gone,t9\n")
+    out, checkpoint = tmp_path / "out.jsonl", tmp_path / "done.txt"
+    summary = run_bulk_sync(str(manifest), str(out), workers=2, threads=2, per_host=2,
+                            checkpoint=str(checkpoint))
+    assert (summary["ok"], summary["failed"]) == (4, 1)
+    assert sorted(json.loads(line)["account_id"] for line in out.read_text().splitlines()) == \
+        ["a0", "a1", "a2", "a3", "bad"]
+
+    again = run_bulk_sync(str(manifest), str(out), workers=2, threads=2, checkpoint=str(checkpoint))
+    assert (again["skipped"], again["ok"], again["failed"]) == (4, 0, 1)
+    assert len(out.read_text().splitlines()) == 6  # appended, only the failed account again
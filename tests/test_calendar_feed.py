@@ -0,0 +1,114 @@
+# test_calendar_feed.py - the .ics feed and its incremental updates
+import io
+from datetime import timedelta
+
+from calendar_feed import (CALENDAR_END, CHUNK_SIZE, CalendarFeed, assignment_event, calendar_header, content_line,
+                           escape, ical_time, write_calendar)
+from Canvas_api import CanvasAPI
+from mock_canvas import build_fixtures, start_mock_canvas
+
+COURSES = [{"id": 1, "name": "Biology"}, {"id": 2, "name": "History"}]
+
+
+def assignment(id, name, due_at, **fields):
+    return dict({"id": id, "name": name, "due_at": due_at, "updated_at": "2026-10-01T00:00:00Z",
+                 "points_possible": 10, "html_url": f"https://canvas.test/a/{id}"}, **fields)
+
+
+def cache():
+    return {1: [assignment(10, "Lab 1", "2026-10-22T18:00:00Z"), assignment(11, "No date", None)],
+            2: [assignment(20, "Essay, part 1", "2026-10-24T06:00:00Z")]}
+
+
+def text(feed):
+    return b"".join(feed.chunks()).decode()
+
+
+def test_escape_and_times():
+    assert escape("a,b;c\nd") == "a\\,b\\;c\\nd"
+    assert ical_time("2026-10-22T18:00:00Z") == "20261022T180000Z"
+    assert ical_time("2026-10-22T12:00:00-06:00") == "20261022T180000Z"
+    assert ical_time("later") is None
+
+
+def test_long_lines_are_folded_without_splitting_characters():
+    line = content_line("SUMMARY", "é" * 100)
+    parts = line.rstrip("\r\n").split("\r\n ")
+    assert all(len(p.encode()) <= 75 for p in parts)
+    assert "".join(parts) == "SUMMARY:" + "é" * 100
+
+
+def test_assignment_event():
+    event = assignment_event("canvas.test", COURSES[0], assignment(10, "Lab 1", "2026-10-22T18:00:00Z"),
+                             lead=timedelta(hours=24))
+    assert "UID:assignment-1-10@canvas.test\r\n" in event
+    assert "DTSTART:20261022T180000Z\r\n" in event
+    assert "TRIGGER:-PT24H\r\n" in event
+    assert assignment_event("canvas.test", COURSES[0], assignment(11, "x", None)) is None
+
+
+def test_feed_has_one_event_per_dated_assignment():
+    feed = CalendarFeed("https://canvas.test")
+    assert feed.update(COURSES, cache()) == ["1", "2"]
+    ics = text(feed)
+    assert ics.startswith("BEGIN:VCALENDAR\r\n") and ics.endswith("END:VCALENDAR\r\n")
+    assert ics.count("BEGIN:VEVENT") == 2
+    assert "SUMMARY:Essay\\, part 1 due" in ics
+
+
+def test_update_only_rebuilds_what_changed():
+    feed = CalendarFeed("https://canvas.test")
+    data = cache()
+    feed.update(COURSES, data)
+    etag = feed.etag
+    assert feed.update(COURSES, data) == []
+    assert feed.etag == etag
+    data[2][0] = dict(data[2][0], due_at="2026-10-25T06:00:00Z")
+    assert feed.update(COURSES, data) == ["2"]
+    assert feed.etag != etag
+
+
+def test_dropped_course_leaves_the_feed():
+    feed = CalendarFeed("https://canvas.test")
+    feed.update(COURSES, cache())
+    feed.update(COURSES[:1], cache())
+    assert "Essay" not in text(feed)
+
+
+def test_chunks_are_a_snapshot_and_bounded():
+    feed = CalendarFeed("https://canvas.test")
+    many = {1: [assignment(i, f"Reading {i}", "2026-10-22T18:00:00Z") for i in range(400)]}
+    feed.update(COURSES[:1], many)
+    chunks = feed.chunks()
+    feed.update(COURSES[:1], {1: []})
+    body = list(chunks)
+    assert max(len(c) for c in body) <= CHUNK_SIZE * 2
+    assert b"".join(body).count(b"BEGIN:VEVENT") == 400
+
+
+def test_folder_feed_survives_a_restart(tmp_path):
+    feed = CalendarFeed("https://canvas.test", folder=str(tmp_path))
+    feed.update(COURSES, cache())
+    again = CalendarFeed("https://canvas.test", folder=str(tmp_path))
+    assert again.etag == feed.etag
+    assert again.update(COURSES, cache()) == []
+    path = again.write(str(tmp_path / "due-dates.ics"))
+    with open(path, encoding="utf-8", newline="") as f:
+        assert f.read() == text(feed)
+
+
+def test_write_calendar_streams_the_same_file_layout():
+    fixtures = build_fixtures(courses=2, assignments=8, seed=2)
+    server = start_mock_canvas(fixtures)
+    api = CanvasAPI(server.url, "test-token")
+    out = io.StringIO()
+    try:
+        count = write_calendar(api, out)
+    finally:
+        api.close()
+        server.shutdown()
+    ics = out.getvalue()
+    dated = sum(1 for items in fixtures['assignments'].values() for a in items if a['due_at'])
+    assert count == dated == ics.count("BEGIN:VEVENT")
+    assert ics.startswith(calendar_header()) and ics.endswith(CALENDAR_END)
+    assert text(CalendarFeed("https://canvas.test")).startswith(calendar_header())
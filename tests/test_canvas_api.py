@@ -0,0 +1,85 @@
+# test_canvas_api.py - the login loaders and request plumbing of CanvasAPI against the mock Canvas
+import pytest
+
+from Canvas_api import CanvasAPI
+from metrics import RequestMetrics
+from mock_canvas import build_fixtures, start_mock_canvas
+
+
+@pytest.fixture
+def canvas():
+    fixtures = build_fixtures(courses=3, assignments=20, seed=1)
+    server = start_mock_canvas(fixtures)
+    yield server, fixtures
+    server.shutdown()
+
+
+def login(server):
+    api = CanvasAPI(server.url, "test-token")
+    calls = []
+    graphql = api._graphql
+
+    def recording(query, variables=None):
+        calls.append((query, variables or {}))
+        return graphql(query, variables)
+    api._graphql = recording
+    return api, calls
+
+
+def test_graphql_login_pages_through_every_connection(canvas):
+    server, fixtures = canvas
+    api, calls = login(server)
+    data = api.load_login_data(page_size=7)
+    api.close()
+    assert [c['id'] for c in data['courses']] == [c['id'] for c in fixtures['courses']]
+    for course in fixtures['courses']:
+        course_id = course['id']
+        assert [a['id'] for a in data['assignments'][course_id]] == [a['id'] for a in fixtures['assignments'][course_id]]
+        assert len(data['submissions'][course_id]) == len(fixtures['submissions'][course_id])
+    # 20 items a course in pages of 7: the login query and two follow-up rounds
+    assert len(calls) == 3
+    assert server.total_requests() == len(calls) + 1  # and /users/self
+    assert api.grade_cache.keys() == {c['id'] for c in fixtures['courses']}
+
+
+def test_follow_up_pages_send_cursors_and_ids_as_variables(canvas):
+    server, _ = canvas
+    api, calls = login(server)
+    api.load_login_data(page_size=7)
+    api.close()
+    for query, variables in calls[1:]:
+        assert query.startswith("query MorePages(")
+        cursors = [value for name, value in variables.items() if name.startswith("a")]
+        assert cursors and all(cursor not in query for cursor in cursors)
+        assert "after: $a0" in query and "course(id: $c0)" in query
+        assert all(str(variables[name]) not in query for name in variables if name.startswith("c"))
+
+
+def test_rest_fallback_when_graphql_is_unavailable(canvas):
+    server, fixtures = canvas
+    api = CanvasAPI(server.url, "test-token")
+    api.graphql_url = server.url + "/api/graphql-disabled"
+    data = api.load_login_data()
+    api.close()
+    assert data is not None
+    assert [c['id'] for c in data['courses']] == [c['id'] for c in fixtures['courses']]
+    for course in fixtures['courses']:
+        assert len(data['assignments'][course['id']]) == len(fixtures['assignments'][course['id']])
+    assert data['grades'].keys() == {c['id'] for c in fixtures['courses']}
+    assert data['submissions'] == {}  # loaded per course later on the REST path
+
+
+def test_endpoint_names_are_only_worked_out_for_metrics(canvas, monkeypatch):
+    server, fixtures = canvas
+    course_id = fixtures['courses'][0]['id']
+    api = CanvasAPI(server.url, "test-token")
+    monkeypatch.setattr("Canvas_api.endpoint_template", lambda method, path: pytest.fail("template built"))
+    assert api.get_assignments(course_id)
+    api.close()
+    monkeypatch.undo()
+
+    metrics = RequestMetrics()
+    api = CanvasAPI(server.url, "test-token", metrics=metrics)
+    api.get_assignments(course_id)
+    api.close()
+    assert list(metrics.snapshot()['endpoints']) == ["GET /courses/:id/assignments"]
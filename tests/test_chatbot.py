@@ -0,0 +1,31 @@
+# test_chatbot.py - CanvasChatBot answers against the mock Canvas
+import pytest
+
+from Canvas_api import CanvasAPI
+from chatbot import CanvasChatBot
+from mock_canvas import build_fixtures, start_mock_canvas
+
+
+@pytest.fixture
+def bot():
+    fixtures = build_fixtures(courses=3, assignments=10, seed=5)
+    server = start_mock_canvas(fixtures)
+    api = CanvasAPI(server.url, "test-token")
+    data = api.load_login_data()
+    yield CanvasChatBot(api, data['courses'], data['assignments']), fixtures
+    api.close()
+    server.shutdown()
+
+
+def test_list_answers_stream_a_header_a_line_per_course_and_a_summary(bot):
+    chatbot, fixtures = bot
+    fragments = list(chatbot.stream_query("What are my grades?"))
+    assert fragments[0] == "Here's your grade overview:\n\n"
+    assert len(fragments) == len(fixtures['courses']) + 2
+    assert fragments[-1].startswith("\nYour average")
+    assert "".join(fragments) == chatbot.process_query("What are my grades?")
+
+
+def test_other_answers_come_as_one_fragment(bot):
+    chatbot, _ = bot
+    assert len(list(chatbot.stream_query("help"))) == 1
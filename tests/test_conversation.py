@@ -0,0 +1,62 @@
+# test_conversation.py - per-session context and the follow-up openers
+from conversation import FOLLOW_UP_RE, Conversation, ConversationStore, all_courses_only
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_follow_up_openers():
+    assert FOLLOW_UP_RE.match("what about biology?")
+    assert FOLLOW_UP_RE.match("ok, only tomorrow")
+    assert not FOLLOW_UP_RE.match("what is due this week?")
+
+
+def test_all_courses_only():
+    assert all_courses_only("for all my classes")
+    assert all_courses_only("everything?")
+    assert not all_courses_only("what is due in all my classes this week")
+    assert not all_courses_only("what about biology")
+
+
+def test_scope_covers_only_its_course():
+    conversation = Conversation()
+    conversation.remember("assignments", "what's due in biology", results=[], scope=7)
+    assert conversation.covers({"id": 7})
+    assert not conversation.covers({"id": 8})
+    assert not conversation.covers(None)
+    conversation.remember("assignments", "what's due", results=[])
+    assert conversation.covers(None) and conversation.covers({"id": 8})
+
+
+def test_window_defaults_to_period():
+    conversation = Conversation()
+    conversation.remember("assignments", "q", period=(1, 2))
+    assert conversation.window == (1, 2)
+
+
+def test_store_returns_the_same_conversation_until_it_expires():
+    clock = Clock()
+    store = ConversationStore(ttl=60, clock=clock)
+    first = store.get("a")
+    first.intent = "grades"
+    clock.now = 30
+    assert store.get("a") is first
+    clock.now = 100
+    assert store.get("a") is not first
+
+
+def test_store_drops_the_least_recently_used():
+    store = ConversationStore(max_sessions=2, clock=Clock())
+    a = store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert len(store) == 2
+    assert store.get("a") is a
+    store.clear()
+    assert len(store) == 0
@@ -0,0 +1,69 @@
+# test_course_cache.py - assignment definitions shared between the users of a course
+from types import SimpleNamespace
+
+import pytest
+
+from course_cache import SharedCourseCache
+
+
+#a fake CanvasAPI for one user, due_at and score are what Canvas returns to that user
+def api(due_at, score=5, overridden_due_at=None):
+    assignments = [{"id": 10, "name": "Lab 1", "due_at": due_at, "submission": {"score": score}}]
+    if overridden_due_at:
+        assignments.append({"id": 11, "name": "Essay", "due_at": overridden_due_at, "has_overrides": True})
+    calls = []
+
+    def get_assignments(course_id, assignment_ids=None):
+        calls.append(assignment_ids)
+        return [a for a in assignments if not assignment_ids or a["id"] in assignment_ids]
+    return SimpleNamespace(base_url="https://canvas.test", get_assignments=get_assignments, calls=calls)
+
+
+def test_users_in_the_same_sections_share_one_download():
+    cache = SharedCourseCache()
+    first = cache.acquire(api("2026-10-20T00:00:00Z"), 1, {1}, sections=[7])
+    second = cache.acquire(api("2026-10-20T00:00:00Z", score=9), 1, {1}, sections=[7])
+    assert first[0] is second[0] and cache.upstream_loads == 1
+    assert "submission" not in first[0]
+    # each user gets a list of their own, replacing an entry doesn't reach the other user
+    first[0] = {"id": 10, "name": "Lab 1 (edited)"}
+    assert second[0]["name"] == "Lab 1"
+
+
+def test_section_overrides_are_not_shared():
+    cache = SharedCourseCache()
+    section_a = cache.acquire(api("2026-10-20T00:00:00Z"), 1, {1}, sections=[7])
+    section_b = cache.acquire(api("2026-10-27T00:00:00Z"), 1, {1}, sections=[8])
+    assert section_a[0]["due_at"] != section_b[0]["due_at"]
+    cache.release("https://canvas.test", 1, [7])
+    assert cache.stats()["courses"] == 1
+    cache.release("https://canvas.test", 1, [8])
+    assert cache.stats()["courses"] == 0
+
+
+def test_student_overrides_stay_with_each_user():
+    cache = SharedCourseCache()
+    first = cache.acquire(api(None, overridden_due_at="2026-11-01T00:00:00Z"), 1, {1})
+    second_api = api(None, overridden_due_at="2026-11-08T00:00:00Z")
+    second = cache.acquire(second_api, 1, {1})
+    assert {a["id"]: a.get("due_at") for a in first}[11] == "2026-11-01T00:00:00Z"
+    assert {a["id"]: a.get("due_at") for a in second}[11] == "2026-11-08T00:00:00Z"
+    # the second user only asked Canvas for the assignment that isn't shared
+    assert second_api.calls == [[11]] and cache.upstream_loads == 1
+
+
+def test_a_refresh_swaps_in_new_definitions_and_tells_their_users():
+    refreshed = []
+    cache = SharedCourseCache(max_age=0, on_refresh=lambda *key: refreshed.append(key))
+    first = cache.acquire(api("2026-10-20T00:00:00Z"), 1, {1}, sections=[7])
+    cache.acquire(api("2026-10-27T00:00:00Z"), 1, {1}, sections=[7])
+    # the first user's list is untouched until they take the new definitions
+    assert first[0]["due_at"] == "2026-10-20T00:00:00Z"
+    assert refreshed == [("https://canvas.test", 1, (7,))]
+    definitions, overridden = cache.refreshed("https://canvas.test", 1, [7])
+    assert definitions[0]["due_at"] == "2026-10-27T00:00:00Z" and not overridden
+
+
+def test_only_visible_courses_can_be_read():
+    with pytest.raises(PermissionError):
+        SharedCourseCache().acquire(api(None), 2, {1})
@@ -0,0 +1,105 @@
+# test_course_stats.py - the per-course summary table and the sync events that keep it current
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from course_stats import CourseStats, due_ts
+from sync_engine import ASSIGNMENT_REMOVED, DUE_DATE_MOVED, GRADE_POSTED, NEW_ASSIGNMENT, ChangeEvent
+
+NOW = datetime(2026, 10, 20, 12, tzinfo=timezone.utc).timestamp()
+
+
+def assignment(id, course_id, due_at):
+    return {"id": id, "course_id": course_id, "name": f"A{id}", "due_at": due_at}
+
+
+def build():
+    courses = [{"id": 1, "name": "Biology"}, {"id": 2, "name": "History"}]
+    cache = {1: [assignment(10, 1, "2026-10-19T12:00:00Z"), assignment(11, 1, "2026-10-22T12:00:00Z"),
+                 assignment(12, 1, "2026-11-30T12:00:00Z")],
+             2: [assignment(20, 2, "2026-10-21T12:00:00Z"), assignment(21, 2, None)]}
+    api = SimpleNamespace(grade_cache={1: {"current_score": 55.0, "current_grade": "F"},
+                                       2: {"current_score": 91.0, "current_grade": "A-"}},
+                          submission_cache={1: [{"assignment_id": 11, "workflow_state": "submitted"}]})
+    return CourseStats(api, courses, cache)
+
+
+def test_due_ts():
+    assert due_ts({"due_at": "2026-10-20T12:00:00Z"}) == NOW
+    assert due_ts({"due_at": None}) is None
+    assert due_ts({"due_at": "soon"}) is None
+
+
+def test_rows_from_the_caches():
+    biology, history = build().rows()
+    assert biology.next_due(NOW)["id"] == 11
+    assert biology.due_between(NOW, NOW + 7 * 24 * 3600) == 1
+    assert biology.submitted == {11}
+    assert biology.failing and not history.failing
+
+
+def test_grades_and_upcoming():
+    stats = build()
+    assert [g["course"] for g in stats.grades()] == ["Biology", "History"]
+    upcoming = stats.upcoming(limit=2, now=NOW)
+    assert [(course["name"], a["id"]) for _, course, a in upcoming] == [("History", 20), ("Biology", 11)]
+
+
+def test_events_update_only_their_row():
+    stats = build()
+    stats.rows()
+    moved = assignment(12, 1, "2026-10-21T00:00:00Z")
+    stats.apply_events([
+        ChangeEvent(DUE_DATE_MOVED, 1, moved, "2026-11-30T12:00:00Z", moved["due_at"]),
+        ChangeEvent(NEW_ASSIGNMENT, 2, assignment(22, 2, "2026-10-20T18:00:00Z"), None, None),
+        ChangeEvent(ASSIGNMENT_REMOVED, 2, assignment(20, 2, "2026-10-21T12:00:00Z"), None, None),
+        ChangeEvent(GRADE_POSTED, 1, {"assignment_id": 12, "score": 9}, None, 9),
+    ])
+    biology, history = stats.rows()
+    assert biology.next_due(NOW)["id"] == 12
+    assert 12 in biology.submitted
+    assert [a["id"] for _, a in history.upcoming(NOW)] == [22]
+
+
+def test_invalidate_rebuilds_from_the_caches():
+    stats = build()
+    stats.rows()
+    stats.assignments_cache[2].append(assignment(23, 2, "2026-10-25T12:00:00Z"))
+    stats.invalidate([2])
+    assert [a["id"] for _, a in stats.summary(2).upcoming(NOW)] == [20, 23]
+
+
+def test_grades_are_read_through_the_grade_cache():
+    stats = build()
+    stats.rows()
+    stats.api.grade_cache[1] = {"current_score": 70.0, "current_grade": "C-"}
+    biology = stats.summary(1)
+    assert biology.score == 70.0 and not biology.failing
+    assert stats.grades()[0]["score"] == 70.0
+
+
+def test_unsubmitted_counts_only_known_submissions():
+    stats = build()
+    stats.assignments_cache[1].append(dict(assignment(13, 1, "2026-10-18T12:00:00Z"), submission_types=["on_paper"]))
+    stats.invalidate([1])
+    summary = stats.due_summary(NOW)
+    # 10 is past due and not handed in, 13 can't be handed in through Canvas
+    assert summary[1] == (stats.summary(1).assignments[11], 1, 1)
+    # History's submissions were never loaded, so nothing is reported as missing there
+    assert summary[2][2] is None
+    stats.apply_events([ChangeEvent(GRADE_POSTED, 1, {"assignment_id": 10, "score": 4}, None, 4)])
+    assert stats.summary(1).unsubmitted(NOW) == 0
+
+
+def test_load_submissions_fills_in_the_missing_courses():
+    stats = build()
+    fetched = []
+
+    def get_assignment_submissions(course_id):
+        fetched.append(course_id)
+        stats.api.submission_cache[course_id] = [{"assignment_id": 20, "submitted_at": "2026-10-19T00:00:00Z"}]
+    stats.api.get_assignment_submissions = get_assignment_submissions
+    stats.rows()
+    stats.load_submissions()
+    assert fetched == [2]
+    history = stats.summary(2)
+    assert history.submissions_known and history.submitted == {20}
@@ -0,0 +1,73 @@
+# test_grade_engine.py - what-if and target grade calculations
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from grade_engine import GradeModel, letter_for, parse_target  # noqa: E402
+
+
+def graded(id, name, points, score=None):
+    return {"id": id, "name": name, "points_possible": points,
+            "submission": {"score": score} if score is not None else {}}
+
+
+def weighted_course():
+    return GradeModel([
+        {"name": "Homework", "group_weight": 40, "rules": {"drop_lowest": 1},
+         "assignments": [graded(1, "Homework 1", 10, 10), graded(2, "Homework 2", 10, 5),
+                         graded(3, "Homework 3", 10, 9)]},
+        {"name": "Exams", "group_weight": 60,
+         "assignments": [graded(4, "Exam 1", 100, 80), graded(5, "Exam 2", 100),
+                         graded(6, "Final Exam", 200)]},
+    ], apply_weights=True)
+
+
+def test_letters_and_targets():
+    assert letter_for(94) == "A" and letter_for(89.9) == "B+" and letter_for(10) == "F"
+    assert parse_target("b+") == 87.0
+    assert parse_target("85%") == 85.0
+    assert parse_target("Z") is None
+
+
+def test_current_grade_drops_the_lowest_homework_and_weights_groups():
+    # homework 95% (the 5/10 is dropped), exams 80%
+    assert weighted_course().current() == pytest.approx(0.4 * 95 + 0.6 * 80)
+
+
+def test_points_are_pooled_without_weights():
+    model = GradeModel([{"name": "All", "assignments": [graded(1, "A", 10, 5), graded(2, "B", 30, 30)]}])
+    assert model.current() == pytest.approx(35 / 40 * 100)
+
+
+def test_no_graded_work_is_nan():
+    model = GradeModel([{"name": "All", "assignments": [graded(1, "A", 10)]}])
+    assert math.isnan(model.current())
+
+
+def test_what_if():
+    model = weighted_course()
+    final = model.find_assignment("final exam")
+    grade = model.what_if([final], [0.5])[0]
+    # exams become (80 + 100) / 300
+    assert grade == pytest.approx(0.4 * 95 + 0.6 * 180 / 300 * 100)
+
+
+def test_required_score_reaches_the_target():
+    model = weighted_course()
+    final = model.find_assignment("final exam")
+    fraction, grade = model.required([final], 85.0)
+    assert grade >= 85.0 - 1e-9
+    assert model.what_if([final], [fraction - 0.01])[0] < 85.0
+    assert model.required([final], 101.0)[0] is None
+
+
+def test_find_assignment_needs_every_word():
+    model = weighted_course()
+    assert model.names[model.find_assignment("final exam")] == "Final Exam"
+    assert model.names[model.find_assignment("exam 2")] == "Exam 2"
+    assert model.find_assignment("quiz 2") is None
+    # "exam" alone fits three assignments, nothing is picked for the user
+    assert model.find_assignment("exam") is None
+    assert len(model.find_assignments("exams")) == 3
@@ -0,0 +1,57 @@
+# test_grade_history.py - the append-only grade time series and its trend queries
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from grade_history import COURSE_GRADE, SPARK_CHARS, GradeHistory, sparkline  # noqa: E402
+
+
+def test_unchanged_scores_are_not_written(tmp_path):
+    history = GradeHistory(str(tmp_path))
+    assert history.record(1, COURSE_GRADE, 90.0, when=1000) == 1
+    assert history.record(1, COURSE_GRADE, 90.0, when=2000) == 0
+    assert history.record_many(1, [(COURSE_GRADE, 88.0), (10, 7), (11, None)], when=3000) == 2
+    assert history.courses() == [1]
+
+
+def test_series_and_change(tmp_path):
+    history = GradeHistory(str(tmp_path))
+    for when, score in ((1000, 90.0), (2000, 85.0), (3000, 87.5)):
+        history.record(1, COURSE_GRADE, score, when=when)
+    ts, scores = history.series(1)
+    assert list(ts) == [1000, 2000, 3000] and list(scores) == [90.0, 85.0, 87.5]
+    # the value before `since` is kept so the change is measured from it
+    assert history.change(1, since=2500) == (85.0, 87.5, 2000, 3000)
+    assert history.change(2) is None
+
+
+def test_the_clock_stepping_back_keeps_rows_in_order(tmp_path):
+    history = GradeHistory(str(tmp_path))
+    history.record(1, COURSE_GRADE, 90.0, when=5000)
+    history.record(1, COURSE_GRADE, 80.0, when=4000)
+    ts, _ = history.series(1)
+    assert list(ts) == [5000, 5000]
+
+
+def test_biggest_drop_across_courses(tmp_path):
+    history = GradeHistory(str(tmp_path))
+    for when, score in ((1000, 80.0), (2000, 95.0), (3000, 85.0), (4000, 90.0)):
+        history.record(1, COURSE_GRADE, score, when=when)
+    for when, score in ((1000, 92.0), (2000, 70.0)):
+        history.record(2, COURSE_GRADE, score, when=when)
+    assert history.biggest_drop() == (2, 92.0, 70.0, 1000, 2000)
+    assert history.biggest_drop(course_ids=[1]) == (1, 95.0, 85.0, 2000, 3000)
+
+
+def test_history_survives_reopening(tmp_path):
+    GradeHistory(str(tmp_path)).record(3, 10, 7.5, when=1000)
+    again = GradeHistory(str(tmp_path))
+    assert again.record(3, 10, 7.5, when=2000) == 0
+    assert list(again.series(3, 10)[1]) == [7.5]
+
+
+def test_sparkline():
+    assert sparkline([]) == ""
+    assert sparkline([5, 5]) == SPARK_CHARS[3] * 2
+    line = sparkline(range(100), width=8)
+    assert len(line) == 8 and line[0] == SPARK_CHARS[0] and line[-1] == SPARK_CHARS[-1]
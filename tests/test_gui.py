@@ -0,0 +1,53 @@
+# test_gui.py - the GUI's hand-off between the Tk thread and the chat worker, without a display
+import threading
+
+from Gui_app import CanvasChatbotGUI
+
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, fn, *args):
+        self.scheduled.append((fn, args))
+
+    def run_pending(self):
+        pending, self.scheduled = self.scheduled, []
+        for fn, args in pending:
+            fn(*args)
+
+
+def gui():
+    app = CanvasChatbotGUI.__new__(CanvasChatbotGUI)
+    app.root = FakeRoot()
+    app.chat_lock = threading.Lock()
+    app._response_stream = iter(["an answer"])
+    return app
+
+
+def test_api_views_wait_for_the_chat_worker():
+    app = gui()
+    shown = []
+    view = app._after_chat(lambda course_id: shown.append((course_id, app.chat_lock.locked())))
+
+    app.chat_lock.acquire()  # the worker is still answering
+    view(7)
+    assert shown == [] and app._response_stream is None  # and is told to stop
+    app.root.run_pending()
+    assert shown == []
+    app.chat_lock.release()
+    app.root.run_pending()
+    assert shown == [(7, True)] and not app.chat_lock.locked()
+
+
+def test_sync_changes_wait_for_the_chat_worker():
+    app = gui()
+    applied = []
+    app.chat_lock.acquire()
+    app._dispatch_sync(lambda: applied.append(True))
+    app.root.run_pending()
+    app.root.run_pending()
+    assert applied == []
+    app.chat_lock.release()
+    app.root.run_pending()
+    assert applied == [True]
@@ -0,0 +1,59 @@
+# test_http2.py - choosing the HTTP/2 transport and using it against the mock Canvas
+import pytest
+import requests
+
+import Canvas_api
+from Canvas_api import CanvasAPI
+from mock_canvas import H2_AVAILABLE, build_fixtures, start_mock_canvas
+
+needs_h2 = pytest.mark.skipif(not (Canvas_api.HTTP2_AVAILABLE and H2_AVAILABLE),
+                              reason="needs httpx[http2] and h2")
+
+
+@pytest.fixture
+def canvas():
+    server = start_mock_canvas(build_fixtures(courses=2, assignments=10, seed=9))
+    yield server
+    server.shutdown()
+
+
+def test_http1_is_the_default(canvas):
+    api = CanvasAPI(canvas.url, "test-token")
+    assert isinstance(api.session, requests.Session)
+    api.close()
+
+
+def test_asking_for_http2_without_httpx_fails_early(monkeypatch, canvas):
+    monkeypatch.setattr(Canvas_api, "HTTP2_AVAILABLE", False)
+    with pytest.raises(RuntimeError, match="httpx"):
+        CanvasAPI(canvas.url, "test-token", http2=True)
+
+
+@needs_h2
+def test_http2_loads_the_same_data_over_http2(canvas):
+    plain = CanvasAPI(canvas.url, "test-token")
+    api = CanvasAPI(canvas.url, "test-token", http2=True)
+    versions = []
+    send = api.session.request
+
+    def recording(*args, **kwargs):
+        resp = send(*args, **kwargs)
+        versions.append(resp.http_version)
+        return resp
+    api.session.request = recording
+
+    data, expected = api.load_login_data(), plain.load_login_data()
+    assert [c['id'] for c in data['courses']] == [c['id'] for c in expected['courses']]
+    assert data['assignments'] == expected['assignments']
+    assert versions and set(versions) == {"HTTP/2"}
+    api.close()
+    plain.close()
+
+
+@needs_h2
+def test_http2_errors_look_like_requests_errors():
+    api = CanvasAPI("http://127.0.0.1:9", "test-token", http2=True)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        api.session.request("GET", "http://127.0.0.1:9/api/v1/users/self", timeout=2)
+    assert api.get_current_user() is None and api.last_error
+    api.close()
@@ -0,0 +1,52 @@
+# test_intent_classifier.py - the trained intent classifier and its sparse features
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from intent_classifier import (CSRMatrix, IntentClassifier, cross_validate,  # noqa: E402
+                               default_classifier, training_examples, words)
+
+
+def test_words_fold_numbers_and_keep_letter_grades():
+    assert words("What's on Exam 2?") == ["whats", "on", "exam", "0"]
+    assert words("a B+ or a- in chem 210, 85%") == ["a", "b+", "or", "a-", "in", "chem", "0", "0", "%"]
+
+
+def test_sparse_products_match_dense_ones():
+    dense = np.array([[1.0, 0.0, 2.0], [0.0, 0.0, 0.0], [0.0, 3.0, 4.0]])
+    rows = CSRMatrix(np.array([0, 2, 2, 4]), np.array([0, 2, 1, 2]), np.array([1.0, 2.0, 3.0, 4.0]), (3, 3))
+    other = np.arange(6, dtype=float).reshape(3, 2)
+    assert np.allclose(rows.dot(other), dense @ other)
+    assert np.allclose(rows.tdot(other), dense.T @ other)
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("how am I doing in class", "grades"),
+    ("what is due tomorrow in chem", "assignments"),
+    ("what do I need on the final to get a b", "whatif"),
+    ("which assignment was about enzymes", "search"),
+    ("what classes am I taking", "courses"),
+    ("tell me a joke", "unknown"),
+])
+def test_common_questions_are_classified(text, intent):
+    predicted, confidence = default_classifier().classify(text)
+    assert predicted == intent and confidence >= default_classifier().min_confidence
+
+
+def test_a_batch_gives_the_same_answers_as_one_at_a_time():
+    texts = ["what's my gpa", "anything overdue", "hello", "how has my grade in stats changed"]
+    classifier = default_classifier()
+    batch, single = classifier.classify_batch(texts), [classifier.classify(t) for t in texts]
+    assert [i for i, _ in batch] == [i for i, _ in single]
+    assert [c for _, c in batch] == pytest.approx([c for _, c in single])
+    assert classifier.classify_batch([]) == []
+
+
+def test_held_out_examples_are_mostly_right():
+    assert cross_validate(training_examples(), folds=5) > 0.65
+
+
+def test_only_intents_seen_in_training_are_predicted():
+    model = IntentClassifier().fit([("show my grades", "grades"), ("what's due", "assignments")], epochs=50)
+    assert model.labels == ("assignments", "grades")
+    assert model.classify("grades please")[0] == "grades"
@@ -0,0 +1,146 @@
+# test_live_events.py - deduplication, reordering and gap detection of pushed Canvas events
+from types import SimpleNamespace
+
+from course_cache import SharedCourseCache
+from sync_engine import DUE_DATE_MOVED, GRADE_POSTED, SyncEngine
+
+from live_events import LiveEventConsumer, SequenceTracker, event_sequence, parse_event
+
+USER = 5
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeAPI:
+    def __init__(self):
+        self.grade_cache = {}
+        self.submission_cache = {}
+        self.group_cache = {}
+        self.refetched = []
+
+    def get_assignments_if_changed(self, course_id):
+        self.refetched.append(course_id)
+        return None, False
+
+    def fetch_submissions(self, course_id):
+        return []
+
+    def get_course_grade_if_changed(self, course_id):
+        return None, False
+
+
+def raw(name, time, body, event_id=None, sequence=None):
+    metadata = {"event_name": name, "event_time": time, "hostname": "canvas.test",
+                "context_type": "Course", "context_id": "1"}
+    if event_id:
+        metadata["event_id"] = event_id
+    if sequence is not None:
+        metadata["sequence"] = sequence
+    return {"metadata": metadata, "body": body}
+
+
+def due_change(time, due_at, event_id):
+    return raw("assignment_updated", time, {"assignment_id": "10", "course_id": "1", "title": "Lab 1",
+                                            "due_at": due_at}, event_id)
+
+
+def consumer():
+    clock = Clock()
+    api = FakeAPI()
+    engine = SyncEngine(api, [{"id": 1, "name": "Biology"}],
+                        {1: [{"id": 10, "name": "Lab 1", "due_at": "2026-10-20T00:00:00Z"}]})
+    return LiveEventConsumer(engine, USER, reorder_window=2.0, clock=clock), clock, api
+
+
+def test_parse_event():
+    event = parse_event(raw("grade_change", "2026-10-20T00:00:00Z",
+                            {"assignment_id": "10", "user_id": "5", "course_id": "1", "score": 9}))
+    assert (event.name, event.course_id, event.user_id) == ("grade_change", 1, 5)
+    assert parse_event(raw("user_login", "2026-10-20T00:00:00Z", {"course_id": "1"})) is None
+    assert parse_event({"metadata": {"event_name": "grade_change"}, "body": {}}) is None
+    assert event_sequence(raw("grade_change", "x", {}, sequence=3)) == (("canvas.test", 1), 3)
+
+
+def test_duplicates_and_other_users_are_dropped():
+    live, _, _ = consumer()
+    first = due_change("2026-10-20T00:00:01Z", "2026-10-21T00:00:00Z", "e1")
+    assert live.submit(first)
+    assert not live.submit(first)
+    other = raw("grade_change", "2026-10-20T00:00:02Z", {"assignment_id": "10", "user_id": "6", "course_id": "1"})
+    assert not live.submit(other)
+    assert (live.stats["duplicates"], live.stats["ignored"]) == (1, 1)
+
+
+def test_events_wait_for_the_reorder_window_and_apply_in_time_order():
+    live, clock, _ = consumer()
+    live.submit(due_change("2026-10-20T00:00:05Z", "2026-10-25T00:00:00Z", "late"))
+    live.submit(due_change("2026-10-20T00:00:01Z", "2026-10-21T00:00:00Z", "early"))
+    assert live.flush() == []
+    clock.now += 3
+    changes = live.flush()
+    assert [c.kind for c in changes] == [DUE_DATE_MOVED, DUE_DATE_MOVED]
+    assert live.engine.assignments_cache[1][0]["due_at"] == "2026-10-25T00:00:00Z"
+    assert live.pending() == 0
+
+
+def test_an_older_event_never_overwrites_a_newer_one():
+    live, clock, _ = consumer()
+    live.submit(due_change("2026-10-20T00:00:05Z", "2026-10-25T00:00:00Z", "new"))
+    clock.now += 3
+    live.flush()
+    live.submit(due_change("2026-10-20T00:00:01Z", "2026-10-21T00:00:00Z", "old"))
+    assert live.flush(force=True) == []
+    assert live.stats["stale"] == 1
+
+
+def test_a_grade_for_an_unknown_assignment_refetches_the_list():
+    live, _, api = consumer()
+    live.submit(raw("grade_change", "2026-10-20T00:00:01Z",
+                    {"assignment_id": "99", "user_id": "5", "course_id": "1", "score": 8}, "g1"))
+    changes = live.flush(force=True)
+    assert [c.kind for c in changes] == [GRADE_POSTED]
+    assert api.refetched == [1]
+
+
+def test_mark_gap_refetches_the_course():
+    live, _, api = consumer()
+    live.mark_gap(1)
+    assert live.pending() == 1
+    live.flush()
+    assert api.refetched == [1] and live.stats["refetches"] == 1
+
+
+def test_a_refetch_with_one_users_token_stays_in_that_users_list():
+    definition = {"id": 10, "name": "Lab 1", "due_at": "2026-10-20T00:00:00Z"}
+    canvas = SimpleNamespace(base_url="https://canvas.test",
+                             get_assignments=lambda course_id, assignment_ids=None: [dict(definition)])
+    cache = SharedCourseCache()
+    mine, theirs = cache.acquire(canvas, 1, {1}), cache.acquire(canvas, 1, {1})
+    api = FakeAPI()
+    api.get_assignments_if_changed = lambda course_id: (
+        [dict(definition, submission={"score": 9}, planner_override={"marked_complete": True})], True)
+    SyncEngine(api, [{"id": 1, "name": "Biology"}], {1: mine}).refetch_assignments(1)
+    assert mine[0]["submission"] == {"score": 9}
+    assert theirs == [definition] and cache.refreshed("https://canvas.test", 1)[0] == [definition]
+
+
+def test_sequence_tracker_reports_a_hole_after_the_window():
+    clock = Clock()
+    tracker = SequenceTracker(reorder_window=2.0, clock=clock)
+    stream = ("canvas.test", 1)
+    for number in (1, 2, 4):
+        tracker.see(stream, number)
+    assert tracker.gaps() == []
+    tracker.see(stream, 3)  # arrived late, within the window
+    clock.now += 3
+    assert tracker.gaps() == []
+    tracker.see(stream, 6)
+    clock.now += 3
+    assert tracker.gaps() == [stream]
+    assert tracker.gaps() == []
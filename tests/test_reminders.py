@@ -0,0 +1,103 @@
+# test_reminders.py - the SQLite reminder store and the scheduler thread that fires it
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from reminders import ReminderScheduler, ReminderStore, assignment_source_key, sync_assignment_reminders
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReminderStore(str(tmp_path / "reminders.db"))
+    yield store
+    store.close()
+
+
+def test_reminders_survive_reopening_and_come_back_in_due_order(tmp_path):
+    path = str(tmp_path / "reminders.db")
+    store = ReminderStore(path)
+    later = store.add("Later", NOW + timedelta(days=2))
+    sooner = store.add("Sooner", NOW + timedelta(days=1), note="bring notes")
+    store.close()
+
+    store = ReminderStore(path)
+    assert [r['id'] for r in store.upcoming()] == [sooner, later]
+    assert store.get(sooner)['note'] == "bring notes" and store.get(sooner)['when'] == NOW + timedelta(days=1)
+    store.mark_fired(sooner)
+    assert [r['id'] for r in store.upcoming()] == [later]
+    assert [r['title'] for r in store.manual()] == ["Sooner", "Later"]
+    store.close()
+
+
+def test_assignment_reminders_are_created_once_and_move_with_the_due_date(store):
+    courses = [{"id": 1, "name": "Biology"}]
+    cache = {1: [{"id": 10, "name": "Lab 1", "due_at": "2026-10-22T18:00:00Z"},
+                 {"id": 11, "name": "Past", "due_at": "2026-10-01T18:00:00Z"},
+                 {"id": 12, "name": "No date", "due_at": None}]}
+    created = sync_assignment_reminders(store, courses, cache, now=NOW)
+    assert len(created) == 1
+    assert sync_assignment_reminders(store, courses, cache, now=NOW) == []
+
+    reminder_id = created[0][0]
+    store.mark_fired(reminder_id)
+    cache[1][0]["due_at"] = "2026-10-25T18:00:00Z"
+    moved = sync_assignment_reminders(store, courses, cache, now=NOW)
+    assert [m[0] for m in moved] == [reminder_id]
+    reminder = store.get(reminder_id)
+    assert not reminder['fired'] and reminder['source_key'] == assignment_source_key(1, 10)
+    assert reminder['when'] == datetime(2026, 10, 24, 18, 0, tzinfo=timezone.utc)  # a day ahead
+
+
+def test_pending_batches_never_split_a_tie(store):
+    for i in range(3):
+        store.add(f"tie {i}", NOW)
+    store.add("after", NOW + timedelta(hours=1))
+    rows, more = store.pending_batch(2)
+    assert len(rows) == 3 and more
+
+
+def test_the_scheduler_fires_each_reminder_once_in_order(store):
+    fired = []
+    done = threading.Event()
+
+    def on_fire(reminder):
+        fired.append(reminder['title'])
+        if len(fired) == 3:
+            done.set()
+
+    now = datetime.now(timezone.utc)
+    store.add("second", now + timedelta(seconds=0.2))
+    store.add("already due", now - timedelta(minutes=5))
+    scheduler = ReminderScheduler(store, on_fire, batch_size=1)
+    scheduler.start()
+    try:
+        # added while running, beyond what the first batch loaded
+        third = store.add("third", now + timedelta(seconds=0.4))
+        scheduler.schedule(third, store.get(third)['when'].timestamp())
+        assert done.wait(5)
+        time.sleep(0.1)
+    finally:
+        scheduler.stop()
+    assert fired == ["already due", "second", "third"]
+    assert store.upcoming() == []
+
+
+def test_deleted_and_moved_reminders_do_not_fire(store):
+    fired = []
+    now = datetime.now(timezone.utc)
+    gone = store.add("deleted", now + timedelta(seconds=0.1))
+    store.upsert_sources([("assignment:1:10", "moved", "", now + timedelta(seconds=0.1))])
+    scheduler = ReminderScheduler(store, lambda r: fired.append(r['title']))
+    scheduler.start()
+    try:
+        time.sleep(0.02)  # both are in the scheduler's heap by now
+        store.remove(gone)
+        store.upsert_sources([("assignment:1:10", "moved", "", now + timedelta(hours=1))])
+        time.sleep(0.3)
+    finally:
+        scheduler.stop()
+    assert fired == []
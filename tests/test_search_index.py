@@ -0,0 +1,54 @@
+# test_search_index.py - BM25 search over assignment names and descriptions
+from search_index import SearchIndex, strip_html, tokenize
+
+
+def assignment(id, name, description=""):
+    return {"id": id, "name": name, "description": description}
+
+
+def build():
+    index = SearchIndex()
+    index.update_course(1, [assignment(10, "Enzyme Lab Report", "<p>Measure enzymes at different temperatures</p>"),
+                            assignment(11, "Cell Biology Quiz"),
+                            assignment(12, "Homework 3", "photosynthesis questions")])
+    index.update_course(2, [assignment(20, "Essay: The Great Gatsby", "5 pages on symbolism"),
+                            assignment(21, "Homework 4")])
+    return index
+
+
+def test_tokenize_drops_stopwords_and_tags():
+    assert tokenize("What is the Enzyme lab?") == ["enzyme", "lab"]
+    assert strip_html("<b>Read</b>&nbsp;ch. 3").split() == ["Read", "ch.", "3"]
+
+
+def test_best_match_first():
+    results = build().search("enzyme lab")
+    assert results[0][2]["id"] == 10
+    assert results[0][1] == 1
+
+
+def test_description_and_prefix_matches():
+    index = build()
+    assert index.search("photosynthesis")[0][2]["id"] == 12
+    assert index.search("enzym")[0][2]["id"] == 10
+    assert index.search("symbol")[0][2]["id"] == 20
+
+
+def test_course_filter():
+    results = build().search("homework", course_ids=[2])
+    assert [r[2]["id"] for r in results] == [21]
+
+
+def test_update_and_remove_course():
+    index = build()
+    index.update_course(1, [assignment(13, "Genetics Lab")])
+    assert len(index) == 3
+    assert index.search("enzyme") == []
+    assert index.search("genetics")[0][2]["id"] == 13
+    index.remove_course(2)
+    assert index.search("gatsby") == []
+    assert "gatsby" not in index.vocabulary
+
+
+def test_empty_index():
+    assert SearchIndex().search("anything") == []
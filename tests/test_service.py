@@ -0,0 +1,135 @@
+# test_service.py - the multi-user service: endpoints, allowed Canvas hosts, feed tokens and the memory budget
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from mock_canvas import build_fixtures, start_mock_canvas
+from service import ChatbotService, TenantPool
+
+TOKEN = "canvas-token-1"
+
+
+@pytest.fixture
+def canvas():
+    server = start_mock_canvas(build_fixtures(courses=2, assignments=10))
+    yield server
+    server.shutdown()
+
+
+#runs scenario(service) in an event loop, the handlers are called without a socket
+def run(canvas, scenario, **options):
+    async def main():
+        service = ChatbotService([canvas.url], **options)
+        try:
+            return await scenario(service)
+        finally:
+            for tenant in list(service.pool.tenants.values()):
+                tenant.close()
+            service.executor.shutdown(wait=False)
+    return asyncio.run(main())
+
+
+def request(method, target, body=None, headers=None):
+    return {'method': method, 'target': target, 'path': target.split("?", 1)[0], 'headers': headers or {},
+            'body': body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""}
+
+
+def test_query_answers_for_an_allowed_canvas(canvas):
+    async def scenario(service):
+        status, payload, _ = await service._dispatch(request("POST", "/query", {
+            "base_url": canvas.url + "/api/v1", "token": TOKEN, "query": "What courses am I taking?"}))
+        return status, payload, service.pool.stats()
+    status, payload, stats = run(canvas, scenario)
+    assert status == 200 and payload["response"]
+    assert stats["tenants"] == 1 and stats["load_bytes"] > 0
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"base_url": "https://elsewhere.test", "token": TOKEN, "query": "help"}, 400),
+    ({"base_url": "{canvas}/other/path", "token": TOKEN, "query": "help"}, 400),
+    ({"base_url": "{canvas}?next=x", "token": TOKEN, "query": "help"}, 400),
+    ({"base_url": "{canvas}", "query": "help"}, 400),
+    ({"base_url": "{canvas}", "token": TOKEN}, 400),
+    (b"not json", 400),
+])
+def test_bad_requests_and_other_hosts_are_refused(canvas, body, status):
+    if isinstance(body, dict):
+        body = {k: v.format(canvas=canvas.url) for k, v in body.items()}
+
+    async def scenario(service):
+        return await service._dispatch(request("POST", "/query", body))
+    assert run(canvas, scenario)[0] == status
+
+
+def test_metrics_need_the_secret(canvas):
+    async def scenario(service):
+        results = []
+        for auth in ("", "Bearer wrong", "Bearer scrape"):
+            results.append((await service._dispatch(request("GET", "/metrics", headers={"authorization": auth})))[0])
+        return results
+    assert run(canvas, scenario, metrics_secret="scrape") == [401, 401, 200]
+
+    async def disabled(service):
+        return (await service._dispatch(request("GET", "/metrics")))[0]
+    assert run(canvas, disabled) == 404
+
+
+def test_calendar_feed_tokens_are_hashed_and_expire_with_the_tenant(canvas):
+    async def scenario(service):
+        _, issued, _ = await service._dispatch(request("POST", "/calendar-token", {
+            "base_url": canvas.url, "token": TOKEN}))
+        feed = issued["feed_token"]
+        _, again, _ = await service._dispatch(request("POST", "/calendar-token", {
+            "base_url": canvas.url, "token": TOKEN}))
+        stored = repr(service.pool.feed_tokens._tenants)
+        status, body, _ = await service._dispatch(request("GET", issued["path"]))
+        ics = b"".join(body)
+        in_url = (await service._dispatch(request("GET", f"/calendar.ics?token={TOKEN}")))[0]
+
+        for tenant in service.pool.tenants.values():
+            tenant.last_used -= service.pool.idle_timeout + 1
+        service.pool.evict_idle()
+        expired = (await service._dispatch(request("GET", issued["path"])))[0]
+        return feed, again["feed_token"], stored, status, ics, in_url, expired, len(service.pool.feed_tokens)
+
+    feed, again, stored, status, ics, in_url, expired, left = run(canvas, scenario)
+    assert again == feed
+    assert feed not in stored and TOKEN not in stored
+    assert status == 200 and ics.startswith(b"BEGIN:VCALENDAR")
+    assert in_url == 400
+    assert expired == 404 and left == 0
+
+
+def test_caches_that_grow_after_login_are_measured_again(canvas):
+    async def scenario(service):
+        await service._dispatch(request("POST", "/query", {"base_url": canvas.url, "token": TOKEN,
+                                                           "query": "What courses am I taking?"}))
+        tenant = next(iter(service.pool.tenants.values()))
+        before = tenant.measure()
+        tenant.api.submission_cache[999] = [{"id": i, "body": "x" * 100} for i in range(100)]
+        service.pool.max_load_bytes = tenant.measure() - 1
+        service.pool.enforce_budget()
+        return before, tenant.load_bytes, len(service.pool.tenants)
+    before, after, left = run(canvas, scenario)
+    assert after > before + 10000
+    assert left == 0
+
+
+def fake_tenant(name, load_bytes, last_used, active=0):
+    return SimpleNamespace(key=("https://canvas.test", name), load_bytes=load_bytes, last_used=last_used,
+                           active=active, feed=None, close=lambda: None)
+
+
+def test_the_least_recently_used_tenants_go_first_when_over_budget():
+    pool = TenantPool(max_load_bytes=1000, max_total_bytes=2700)
+    for name, size, used, active in [("a", 900, 1.0, 0), ("b", 900, 2.0, 1), ("c", 900, 3.0, 0),
+                                     ("d", 900, 4.0, 0), ("huge", 1200, 5.0, 0)]:
+        pool.tenants[("https://canvas.test", name)] = fake_tenant(name, size, used, active)
+    pool.enforce_budget()
+    # huge is over the per-account limit, a is the oldest; b is in use so it stays
+    assert sorted(key[1] for key in pool.tenants) == ["b", "c", "d"]
+    pool.max_total_bytes = 1000
+    pool.enforce_budget()
+    assert sorted(key[1] for key in pool.tenants) == ["b"]
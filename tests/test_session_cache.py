@@ -0,0 +1,105 @@
+# test_session_cache.py - the login snapshot and its background revalidation
+import os
+from datetime import datetime
+
+import pytest
+
+import session_cache
+from Canvas_api import CanvasAPI
+from Gui_app import CanvasChatbotGUI
+from mock_canvas import build_fixtures, start_mock_canvas
+
+URL = "https://canvas.test"
+TOKEN = "secret-canvas-token"
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("CANVAS_CHATBOT_HOME", str(tmp_path))
+    return tmp_path
+
+
+def save(last_sync=datetime(2026, 10, 1, 8, 30)):
+    session_cache.save_snapshot(URL, TOKEN, {"id": 1, "name": "Test Student", "email": "x@y"},
+                                [{"id": 7, "name": "Biology", "course_code": "BIO", "term": {}}],
+                                {7: [{"id": 10, "name": "Lab 1", "due_at": None, "rubric": [1, 2]}]},
+                                {7: {"current_score": 91.0}}, {7: [{"assignment_id": 10, "score": 9}]}, last_sync)
+
+
+def test_snapshot_round_trip_keeps_only_what_the_app_reads():
+    save()
+    snapshot = session_cache.load_snapshot(URL + "/api/v1/", TOKEN)
+    assert snapshot["user"] == {"id": 1, "name": "Test Student"}
+    assert snapshot["last_sync"] == datetime(2026, 10, 1, 8, 30)
+    assert snapshot["courses"] == [{"id": 7, "name": "Biology", "course_code": "BIO"}]
+    assert snapshot["assignments"][7][0]["name"] == "Lab 1" and "rubric" not in snapshot["assignments"][7][0]
+    assert snapshot["grades"] == {7: {"current_score": 91.0}}
+    assert snapshot["submissions"][7] == [{"assignment_id": 10, "score": 9}]
+
+
+def test_the_token_never_reaches_the_disk(home):
+    save()
+    path = session_cache.snapshot_path(URL, TOKEN)
+    assert TOKEN not in path
+    for folder, _, files in os.walk(home):
+        for name in files:
+            with open(os.path.join(folder, name), "rb") as f:
+                assert TOKEN.encode() not in f.read()
+
+
+def test_unusable_snapshots_are_ignored(monkeypatch):
+    assert session_cache.load_snapshot(URL, TOKEN) is None
+    save()
+    monkeypatch.setattr(session_cache, "SNAPSHOT_VERSION", session_cache.SNAPSHOT_VERSION + 1)
+    assert session_cache.load_snapshot(URL, TOKEN) is None
+    with open(session_cache.snapshot_path(URL, TOKEN), "wb") as f:
+        f.write(b"not gzip")
+    assert session_cache.load_snapshot(URL, TOKEN) is None
+
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, fn, *args):
+        self.scheduled.append((fn, args))
+
+
+def revalidate(url, token):
+    app = CanvasChatbotGUI.__new__(CanvasChatbotGUI)
+    app.root = FakeRoot()
+    app.profiler = None
+    app.api = CanvasAPI(url, token)
+    finished, failed = [], []
+    app._finish_login = lambda api, user, data, synced_at, revalidating: finished.append((synced_at, revalidating))
+    app._revalidation_failed = lambda api, message: failed.append(message)
+    app._do_login(url, token, app.api)
+    for fn, args in app.root.scheduled:
+        fn(*args)
+    app.api.close()
+    return finished, failed
+
+
+def test_revalidation_replaces_the_snapshot_with_fresh_data():
+    server = start_mock_canvas(build_fixtures(courses=2, assignments=5))
+    try:
+        session_cache.save_snapshot(server.url, TOKEN, {"id": 1, "name": "Old"}, [], {}, {}, {},
+                                    datetime(2026, 1, 1))
+        finished, failed = revalidate(server.url, TOKEN)
+    finally:
+        server.shutdown()
+    assert failed == [] and finished and finished[0][1] is True
+    snapshot = session_cache.load_snapshot(server.url, TOKEN)
+    assert snapshot["last_sync"] == finished[0][0] and len(snapshot["courses"]) == 2
+
+
+def test_a_rejected_token_drops_the_snapshot():
+    server = start_mock_canvas(build_fixtures(courses=1, assignments=2))
+    url = server.url + "/revoked"  # every request 404s, like a token Canvas no longer accepts
+    try:
+        session_cache.save_snapshot(url, TOKEN, {"id": 1, "name": "Old"}, [], {}, {}, {}, datetime(2026, 1, 1))
+        finished, failed = revalidate(url, TOKEN)
+    finally:
+        server.shutdown()
+    assert finished == [] and failed == ["Authentication failed"]
+    assert session_cache.load_snapshot(url, TOKEN) is None
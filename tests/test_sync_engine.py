@@ -0,0 +1,58 @@
+# test_sync_engine.py - polling Canvas for changes against the mock Canvas
+from datetime import datetime, timezone
+
+import pytest
+
+from Canvas_api import CanvasAPI
+from mock_canvas import build_fixtures, start_mock_canvas
+from sync_engine import GRADE_POSTED, SyncEngine
+
+
+@pytest.fixture
+def polling():
+    server = start_mock_canvas(build_fixtures(courses=2, assignments=12, seed=4))
+    api = CanvasAPI(server.url, "test-token")
+    data = api.load_login_data()
+    statuses = []
+    api.session.hooks['response'].append(lambda resp, *args, **kwargs: statuses.append(resp.status_code))
+    engine = SyncEngine(api, data['courses'], data['assignments'])
+    yield server, api, engine, statuses
+    api.close()
+    server.shutdown()
+
+
+def test_an_idle_poll_costs_only_304s(polling):
+    server, api, engine, statuses = polling
+    engine.sync_once()
+    statuses.clear()
+    assert engine.sync_once() == []
+    # course list, course grades, then assignments and graded submissions of each course
+    assert statuses == [304] * (2 + 2 * 2)
+
+
+def test_a_new_grade_is_seen_once(polling):
+    server, api, engine, statuses = polling
+    engine.sync_once()
+    course_id = server.fixtures['courses'][0]['id']
+    assignment = server.fixtures['assignments'][course_id][-1]
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    server.fixtures['submissions'][course_id].append({
+        'id': assignment['id'] * 10, 'assignment_id': assignment['id'], 'user_id': 1, 'score': 7, 'grade': "7",
+        'submitted_at': now, 'graded_at': now, 'workflow_state': 'graded', 'late': False, 'missing': False})
+
+    events = engine.sync_once()
+    assert [(e.kind, e.item['assignment_id']) for e in events] == [(GRADE_POSTED, assignment['id'])]
+    # the overlap window repeats that grade once more, it is not reported twice
+    assert engine.sync_once() == []
+
+
+def test_assignment_groups_expire_with_cache_max_age(polling):
+    server, api, engine, statuses = polling
+    course_id = server.fixtures['courses'][0]['id']
+    api.get_assignment_groups(course_id)
+    statuses.clear()
+    api.get_assignment_groups(course_id)
+    assert statuses == []
+    api.cache_max_age = 0
+    api.get_assignment_groups(course_id)
+    assert statuses
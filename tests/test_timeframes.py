@@ -0,0 +1,75 @@
+# test_timeframes.py - date expressions in questions -> due date windows
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from timeframes import find_milestone, parse, resolve, user_timezone
+
+DENVER = ZoneInfo("America/Denver")
+# Tuesday Oct 20 2026, 10:00 in Denver
+NOW = datetime(2026, 10, 20, 16, 0, tzinfo=timezone.utc)
+
+
+def local(*args):
+    return datetime(*args, tzinfo=DENVER).astimezone(timezone.utc)
+
+
+def test_tomorrow_is_the_users_next_day():
+    label, start, end = resolve("what's due tomorrow", NOW, DENVER)
+    assert label == "tomorrow"
+    assert (start, end) == (local(2026, 10, 21), local(2026, 10, 22))
+
+
+def test_weekday_and_deadline_preposition():
+    label, start, end = resolve("anything due by friday?", NOW, DENVER)
+    assert label == "by Friday"
+    assert start == NOW and end == local(2026, 10, 24)
+
+
+def test_next_weekday_on_the_same_day_is_a_week_away():
+    _, start, _ = resolve("what about next tuesday", NOW, DENVER)
+    assert start == local(2026, 10, 27)
+
+
+def test_relative_days():
+    label, start, end = resolve("due in the next 3 days", NOW, DENVER)
+    assert label == "in the next 3 days"
+    assert start == NOW and end == local(2026, 10, 24)
+
+
+def test_numeric_dates_need_a_date_context():
+    assert parse("what's due 10/24") == ("date", None, None, 10, 24)
+    assert parse("anything due by 3/4/27") == ("date", "by", 2027, 3, 4)
+    assert parse("how did i do on exam 1/2") is None
+    assert parse("what if i get 9/10 on quiz 3") is None
+    assert parse("due on 13/40") is None
+
+
+def test_apostrophe_words_are_not_weekdays():
+    assert parse("c'mon, what's due") is None
+    assert parse("what's due mon")[0] == "weekday"
+
+
+def test_a_date_in_january_asked_in_december_is_next_year():
+    now = datetime(2026, 12, 20, 12, tzinfo=timezone.utc)
+    _, start, _ = resolve("due on jan 10", now, DENVER)
+    assert start == local(2027, 1, 10)
+
+
+def test_milestones_only_with_a_preposition():
+    assert parse("what do i need on the final") is None
+    when = datetime(2026, 12, 10, 15, tzinfo=timezone.utc)
+    label, start, end = resolve("what's due before the final", NOW, DENVER, milestone=lambda name: when)
+    assert label == "before the final (Dec 10)"
+    assert end == when
+
+
+def test_find_milestone_takes_the_first_one_ahead():
+    items = [("Midterm review", "2026-10-01T15:00:00Z"), ("Midterm exam", "2026-10-29T15:00:00Z"),
+             ("Midterm 2", "2026-11-20T15:00:00Z"), ("Final", "2026-12-10T15:00:00Z")]
+    assert find_milestone("midterm", items, NOW) == datetime(2026, 10, 29, 15, tzinfo=timezone.utc)
+
+
+def test_user_timezone():
+    assert user_timezone({"time_zone": "America/Denver"}) == DENVER
+    assert user_timezone({"time_zone": "Not/AZone"}) is None
+    assert user_timezone(None) is None
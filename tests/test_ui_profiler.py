@@ -0,0 +1,50 @@
+# test_ui_profiler.py - the GUI trace: what it measures and what it leaves out
+import json
+import time
+import tkinter as tk
+from types import SimpleNamespace
+
+import ui_profiler
+from ui_profiler import UIProfiler
+
+
+def test_a_view_becomes_one_slice_without_its_arguments(tmp_path):
+    path = tmp_path / "trace.json"
+    profiler = UIProfiler(str(path))
+
+    def show_results(query, results):
+        with profiler.network_span("GET /api/v1/courses/:id/assignments", "GET"):
+            time.sleep(0.01)
+        return len(results)
+
+    gui = SimpleNamespace(show_results=show_results)
+    profiler.install(gui)
+    assert gui.show_results("what is my grade in BIO 101, token abc123", ["Lab 1"]) == 1
+    profiler.close()
+
+    text = path.read_text()
+    assert "BIO 101" not in text and "abc123" not in text and "Lab 1" not in text
+    events = json.loads(text)
+    view = next(e for e in events if e.get("cat") == "view")
+    assert view["name"] == "show_results"
+    assert view["args"]["requests"] == 1 and view["args"]["network_ms"] >= 10
+    assert any(e.get("cat") == "network" for e in events)
+
+
+def test_closing_restores_tkinter(tmp_path):
+    originals = tk.BaseWidget.__init__, tk.Pack.pack, tk.Misc.update
+    profiler = UIProfiler(str(tmp_path / "trace.json"))
+    profiler.install(SimpleNamespace())
+    assert tk.BaseWidget.__init__ is not originals[0]
+    profiler.close()
+    assert (tk.BaseWidget.__init__, tk.Pack.pack, tk.Misc.update) == originals
+
+
+def test_the_environment_turns_profiling_on(monkeypatch, tmp_path):
+    monkeypatch.setenv("CANVAS_PROFILE", "0")
+    assert ui_profiler.trace_path_from_env() is None
+    monkeypatch.setenv("CANVAS_PROFILE", str(tmp_path / "mine.json"))
+    assert ui_profiler.trace_path_from_env() == str(tmp_path / "mine.json")
+    monkeypatch.setenv("CANVAS_CHATBOT_HOME", str(tmp_path))
+    monkeypatch.setenv("CANVAS_PROFILE", "1")
+    assert ui_profiler.trace_path_from_env().startswith(str(tmp_path / "traces"))
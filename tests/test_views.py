@@ -0,0 +1,54 @@
+# test_views.py - the data behind the GUI views, against the mock Canvas
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import views
+from Canvas_api import CanvasAPI
+from course_stats import CourseStats
+from mock_canvas import build_fixtures, start_mock_canvas
+
+
+@pytest.fixture
+def rest_login():
+    fixtures = build_fixtures(courses=2, assignments=15, seed=3)
+    now = datetime.now(timezone.utc)
+    course_id = fixtures['courses'][0]['id']
+    # hand in one assignment that isn't due yet
+    ahead = next(a for a in fixtures['assignments'][course_id]
+                 if a['due_at'] and a['due_at'] > now.strftime('%Y-%m-%dT%H:%M:%SZ'))
+    fixtures['submissions'][course_id].append({
+        'id': ahead['id'] * 10, 'assignment_id': ahead['id'], 'user_id': 1, 'score': None, 'grade': None,
+        'submitted_at': now.strftime('%Y-%m-%dT%H:%M:%SZ'), 'graded_at': None,
+        'workflow_state': 'submitted', 'late': False, 'missing': False})
+    server = start_mock_canvas(fixtures)
+    api = CanvasAPI(server.url, "test-token")
+    api.graphql_url = server.url + "/api/graphql-disabled"  # the REST login path
+    data = api.load_login_data()
+    yield api, data, ahead, now
+    api.close()
+    server.shutdown()
+
+
+def test_submitted_future_work_is_not_listed_on_the_rest_path(rest_login):
+    api, data, ahead, now = rest_login
+    assert data['submissions'] == {}
+    stats = CourseStats(api, data['courses'], data['assignments'])
+    _, upcoming = views.assignment_lists(api, data['assignments'], stats, now)
+    listed = {a['id'] for _, assignments in upcoming for a in assignments}
+    assert ahead['id'] not in listed
+    assert listed  # the rest of the open work still is
+    assert all(course['id'] in api.submission_cache for course in data['courses'])
+
+
+def test_week_lines_report_missing_work_once_submissions_are_loaded(rest_login):
+    api, data, _, now = rest_login
+    stats = CourseStats(api, data['courses'], data['assignments'])
+    assert all(summary[2] is None for summary in stats.due_summary(now.timestamp()).values())
+    stats.load_submissions()
+    assert all(summary[2] is not None for summary in stats.due_summary(now.timestamp()).values())
+    # every past-due assignment in the fixtures was handed in
+    assert not any("past due" in line for line in views.week_lines(stats, now))
+    # a year on, the open work is all past due
+    later = views.week_lines(stats, now + timedelta(days=365))
+    assert len(later) == 2 and all("past due and not handed in" in line for line in later)
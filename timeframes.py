@@ -0,0 +1,232 @@
+# timeframes.py - turns the date expression in a question ("next friday", "in 3 days", "by oct 24",
+# "before midterms") into a (label, start, end) window in UTC for the due-date lookups
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+UPCOMING_DAYS = 14  # window when the question names no time at all
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august", "september",
+          "october", "november", "december"]
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+                "seven": 7, "eight": 8, "nine": 9, "ten": 10, "couple": 2, "few": 3}
+
+# term milestones found in course calendar events (or assignment names), "before midterms"
+MILESTONES = {"midterm": re.compile(r"\bmid-?terms?\b"), "final": re.compile(r"\bfinals?\b"),
+              "spring break": re.compile(r"\bspring break\b"), "fall break": re.compile(r"\bfall break\b"),
+              "thanksgiving": re.compile(r"\bthanksgiving\b")}
+
+_WEEKDAY = r"mon(?:day)?|tue(?:s|sday)?|wed(?:nesday)?|thu(?:rs?|rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?"
+_MONTH = (r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+          r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?")
+_COUNT = r"\d+|" + "|".join(NUMBER_WORDS)
+
+# the grammar, most specific rule first. one alternation is compiled from it so a
+# question is scanned once, the rule that matched is the named group that is set
+GRAMMAR = [
+    ("iso", r"(?P<iso_y>\d{4})-(?P<iso_m>\d{1,2})-(?P<iso_d>\d{1,2})"),
+    ("numeric", r"(?P<num_m>\d{1,2})/(?P<num_d>\d{1,2})(?:/(?P<num_y>\d{2}|\d{4}))?"),
+    ("month_day", rf"(?P<md_m>{_MONTH})\.?\s+(?P<md_d>\d{{1,2}})(?:st|nd|rd|th)?"),
+    ("day_month", rf"(?P<dm_d>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<dm_m>{_MONTH})"),
+    ("relative", rf"(?:within|in(?: the next)?|(?:over |for )?the next|next)\s+(?:a\s+)?"
+                 rf"(?P<rel_n>{_COUNT})\s+(?P<rel_unit>days?|weeks?)"),
+    ("day_after", r"(?:the\s+)?day after tomorrow"),
+    ("today", r"today|tonight|this (?:morning|afternoon|evening)"),
+    ("tomorrow", r"tomorrow|tmrw|tmr"),
+    ("weekend", r"(?P<we_q>this|next|the)?\s*weekend"),
+    ("week_end", r"(?:the\s+)?end of (?:the|this) week"),
+    ("week", r"(?P<wk_q>this|next|the)\s+week"),
+    ("month_end", r"(?:the\s+)?end of (?:the|this) month"),
+    ("month", r"(?P<mo_q>this|next|the)\s+month"),
+    # not after an apostrophe, "c'mon" isn't Monday
+    ("weekday", rf"(?:(?P<wd_q>this|next|coming|on)\s+)?(?<!['’])(?P<wd>{_WEEKDAY})"),
+    ("milestone", r"(?:the\s+|my\s+)?(?P<ms>mid-?terms?|finals?(?:\s+exams?)?|final exams?|spring break"
+                  r"|fall break|thanksgiving)"),
+    ("upcoming", r"upcoming|coming up|soon|later"),
+]
+_GRAMMAR_RE = re.compile("|".join(rf"\b(?P<{name}>{pattern})\b" for name, pattern in GRAMMAR))
+# a preposition right before the expression turns a day into a deadline: "by friday"
+_PREP_RE = re.compile(r"\b(by|before|until|till|through|thru|no later than)\s+$")
+# "10/24" is only a date after one of these (or with a year), "exam 1/2" and "hw 3/4" aren't
+_DATE_CONTEXT_RE = re.compile(r"\b(?:by|before|until|till|through|thru|than|due|on|for|from)\s+$")
+_NUMBERED_RE = re.compile(r"\b(?:exams?|tests?|quiz(?:zes)?|hw|homeworks?|labs?|assignments?|projects?|ch(?:apters?)?"
+                          r"|units?|modules?|parts?|problems?|questions?|sections?|weeks?|lessons?)\s*#?\s*$")
+
+
+def _month(text):
+    return next(i + 1 for i, name in enumerate(MONTHS) if name.startswith(text.rstrip(".")[:3]))
+
+
+def _weekday(text):
+    return next(i for i, name in enumerate(WEEKDAYS) if name.startswith(text[:3]))
+
+
+#the date expression in text as a hashable spec (rule, preposition, values...) or None.
+#the spec doesn't depend on the current time, so it's cached per phrasing
+@lru_cache(maxsize=2048)
+def parse(text):
+    for m in _GRAMMAR_RE.finditer(text.lower()):
+        rule = m.lastgroup
+        prep = _PREP_RE.search(text.lower(), 0, m.start())
+        prep = prep.group(1) if prep else None
+        g = m.group
+        if rule == "milestone":
+            if prep is None:
+                continue  # "need on the final" is about a grade, not a date
+            name = g("ms").replace("-", "")
+            name = "midterm" if name.startswith("midterm") else "final" if name.startswith("final") else name
+            return rule, prep, name
+        if rule == "iso":
+            return "date", prep, int(g("iso_y")), int(g("iso_m")), int(g("iso_d"))
+        if rule == "numeric":
+            before = text.lower()[:m.start()]
+            month, day, year = int(g("num_m")), int(g("num_d")), g("num_y")
+            if (not (1 <= month <= 12 and 1 <= day <= 31) or _NUMBERED_RE.search(before)
+                    or not (year or _DATE_CONTEXT_RE.search(before))):
+                continue
+            year = None if year is None else int(year) + (2000 if len(year) == 2 else 0)
+            return "date", prep, year, month, day
+        if rule == "month_day":
+            return "date", prep, None, _month(g("md_m")), int(g("md_d"))
+        if rule == "day_month":
+            return "date", prep, None, _month(g("dm_m")), int(g("dm_d"))
+        if rule == "relative":
+            n = g("rel_n")
+            n = int(n) if n.isdigit() else NUMBER_WORDS[n]
+            return rule, prep, n * (7 if g("rel_unit").startswith("week") else 1)
+        if rule == "weekend":
+            return rule, prep, g("we_q") == "next"
+        if rule == "week":
+            return rule, prep, g("wk_q") == "next"
+        if rule == "month":
+            return rule, prep, g("mo_q") == "next"
+        if rule == "weekday":
+            return rule, prep, _weekday(g("wd")), g("wd_q") == "next"
+        return rule, prep
+    return None
+
+
+#the window for the date expression in text, as (label, start, end) with UTC datetimes,
+#or None when text has none. days follow the local calendar of tz, the user's (see
+#user_timezone); without one, this machine's.
+#milestone(name) returns when e.g. "midterm" starts, for "before midterms"
+def resolve(text, now, tz=None, milestone=None):
+    spec = parse(text)
+    if spec is None:
+        return None
+    local = now.astimezone(tz) if tz else now.astimezone()
+    today = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    rule, prep = spec[0], spec[1]
+
+    # (label, first day, number of days) for rules that name whole days
+    if rule == "today":
+        return _window("today", local, today + timedelta(days=1))
+    elif rule == "upcoming":
+        return _window("upcoming", local, local + timedelta(days=UPCOMING_DAYS))
+    elif rule == "week" and not spec[2]:
+        # rolling, so on a Saturday "this week" still means the next seven days
+        return _window("this week", local, local + timedelta(days=7))
+    elif rule == "relative":
+        return _window(f"in the next {spec[2]} days", local, today + timedelta(days=spec[2] + 1))
+    elif rule == "tomorrow":
+        label, first, days = "tomorrow", today + timedelta(days=1), 1
+    elif rule == "day_after":
+        first = today + timedelta(days=2)
+        label, days = f"on {_day_name(first)}", 1
+    elif rule == "weekend":
+        # on a Sunday this weekend started yesterday
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7 if today.weekday() < 6 else -1)
+        if spec[2]:
+            saturday += timedelta(days=7)
+        label, first, days = "next weekend" if spec[2] else "this weekend", saturday, 2
+    elif rule == "week_end":
+        return _window("by the end of the week", local, today + timedelta(days=7 - today.weekday()))
+    elif rule == "week":
+        label, first, days = "next week", today + timedelta(days=7 - today.weekday()), 7
+    elif rule == "month_end" or (rule == "month" and not spec[2]):
+        label = "this month" if rule == "month" else "by the end of the month"
+        return _window(label, local, _month_start(today, 1))
+    elif rule == "month":
+        first = _month_start(today, 1)
+        label, days = "next month", (_month_start(first, 1) - first).days
+    elif rule == "weekday":
+        ahead = (spec[2] - today.weekday()) % 7
+        if spec[3] and ahead == 0:
+            ahead = 7  # "next friday" on a Friday is a week away
+        first = today + timedelta(days=ahead)
+        label, days = f"on {_day_name(first)}", 1
+    elif rule == "date":
+        _, _, year, month, day = spec
+        try:
+            first = today.replace(year=year or today.year, month=month, day=day)
+            if year is None and first < today - timedelta(days=183):
+                first = first.replace(year=first.year + 1)  # "jan 10" asked in December
+        except ValueError:
+            return None
+        label, days = f"on {_date_name(first)}", 1
+    elif rule == "milestone":
+        when = milestone(spec[2]) if milestone else None
+        if when is None or when <= now:
+            return None
+        when = when.astimezone(local.tzinfo)
+        return _window(f"before the {spec[2]} ({_date_name(when)})", local, when)
+    else:
+        return None
+
+    end = first + timedelta(days=days)
+    if prep == "before":
+        return _window(f"before {label.removeprefix('on ')}", local, first)
+    if prep is not None:
+        return _window(f"by {label.removeprefix('on ')}", local, end)
+    return _window(label, max(first, local), end)
+
+
+#the ZoneInfo of a Canvas user's time_zone setting (from /users/self), None when it's
+#missing or unknown here
+def user_timezone(user):
+    name = (user or {}).get('time_zone')
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+#True when text names a time window at all
+def has_timeframe(text):
+    return parse(text) is not None
+
+
+#when the first of milestone name happens after now, from (title, start ISO string) pairs
+#such as calendar events or assignments. None if nothing matches
+def find_milestone(name, items, now):
+    pattern = MILESTONES[name]
+    found = None
+    for title, start in items:
+        if not start or not pattern.search((title or "").lower()):
+            continue
+        when = datetime.fromisoformat(start.replace('Z', '+00:00'))
+        if when > now and (found is None or when < found):
+            found = when
+    return found
+
+
+# labels without strftime, it costs more than the rest of resolve()
+def _day_name(day):
+    return WEEKDAYS[day.weekday()].capitalize()
+
+
+def _date_name(day):
+    return f"{MONTHS[day.month - 1][:3].capitalize()} {day.day}"
+
+
+def _month_start(day, months_ahead):
+    month = day.month - 1 + months_ahead
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def _window(label, start, end):
+    return label, start.astimezone(timezone.utc), end.astimezone(timezone.utc)
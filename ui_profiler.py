@@ -0,0 +1,195 @@
+# ui_profiler.py - opt-in profiler for the Tk GUI, writes a Chrome trace-event file
+# turn it on with:  CANVAS_PROFILE=1 python Gui_app.py   (or python Gui_app.py --profile [path])
+# then open the trace in chrome://tracing or https://ui.perfetto.dev
+import json
+import os
+import threading
+import time
+import tkinter as tk
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils import app_data_dir
+
+# the GUI methods that build a whole view, each call becomes one trace slice
+VIEW_METHODS = ("show_dashboard", "show_grades", "show_grade_details",
+                "show_all_assignments", "process_search", "show_results", "show_reminders")
+
+
+def default_trace_path():
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(app_data_dir(), "traces", f"ui-{stamp}-{os.getpid()}.json")
+
+
+#the trace path asked for by CANVAS_PROFILE ("1" means the default location), or None
+def trace_path_from_env():
+    value = os.environ.get("CANVAS_PROFILE", "").strip()
+    if not value or value == "0":
+        return None
+    return default_trace_path() if value.lower() in ("1", "true", "yes") else value
+
+
+class _Frame:
+    __slots__ = ("name", "started", "network", "widgets", "created", "destroyed", "requests")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.network = 0.0
+        self.widgets = 0.0
+        self.created = 0
+        self.destroyed = 0
+        self.requests = 0
+
+
+#times each view method of a CanvasChatbotGUI and splits it into network wait
+#(CanvasAPI requests, through its span_hook), widget work (creating, laying out
+#and destroying Tk widgets) and data processing (everything else).
+#events are appended to the trace file as they happen; the JSON array is left
+#open, which the trace-event format allows, so a crashed session still loads
+class UIProfiler:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._ui_thread = threading.get_ident()
+        self._stack = []   # view frames currently running on the Tk thread
+        self._widget_depth = 0  # nested widget calls (destroy recurses) are timed once
+        self._originals = []
+        self.views = 0
+        self._emit({"name": "thread_name", "ph": "M", "tid": self._ui_thread, "args": {"name": "Tk main thread"}})
+
+    def _us(self, t):
+        return round((t - self._origin) * 1e6, 1)
+
+    def _emit(self, event):
+        event.setdefault("pid", self._pid)
+        line = json.dumps(event, separators=(",", ":"))
+        with self._lock:
+            if self._file:
+                self._file.write(line + ",\n")
+
+    def _on_ui_thread(self):
+        return threading.get_ident() == self._ui_thread
+
+    # ---- network: passed to CanvasAPI as span_hook ----
+
+    @contextmanager
+    def network_span(self, template, method):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            self._emit({"name": template, "cat": "network", "ph": "X", "tid": threading.get_ident(),
+                        "ts": self._us(started), "dur": self._us(ended) - self._us(started)})
+            # requests from background threads (login, sync) don't block a view
+            if self._on_ui_thread():
+                for frame in self._stack:
+                    frame.network += ended - started
+                    frame.requests += 1
+
+    # ---- widgets: tkinter is patched while the profiler is installed ----
+
+    def _widget_wrapper(self, original, counter):
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            if not profiler._stack or not profiler._on_ui_thread():
+                return original(*args, **kwargs)
+            outermost = profiler._widget_depth == 0
+            profiler._widget_depth += 1
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                profiler._widget_depth -= 1
+                elapsed = time.perf_counter() - started
+                for frame in profiler._stack:
+                    if outermost:
+                        frame.widgets += elapsed
+                    if counter == "created":
+                        frame.created += 1
+                    elif counter == "destroyed":
+                        frame.destroyed += 1
+        return wrapper
+
+    def _patch(self, owner, name, counter=None):
+        original = owner.__dict__[name]
+        self._originals.append((owner, name, original))
+        setattr(owner, name, self._widget_wrapper(original, counter))
+
+    #wraps the view methods of one GUI object and patches tkinter (once per process)
+    def install(self, gui):
+        self._patch(tk.BaseWidget, "__init__", "created")
+        self._patch(tk.BaseWidget, "destroy", "destroyed")
+        # pack/grid/place are aliases of the *_configure functions, so patch both names
+        for owner, names in ((tk.Pack, ("pack", "pack_configure")),
+                             (tk.Grid, ("grid", "grid_configure")),
+                             (tk.Place, ("place", "place_configure"))):
+            for name in names:
+                self._patch(owner, name)
+        # update/update_idletasks is where Tk actually lays the new widgets out
+        for name in ("update", "update_idletasks"):
+            self._patch(tk.Misc, name)
+
+        for name in VIEW_METHODS:
+            method = getattr(gui, name, None)
+            if method is not None:
+                setattr(gui, name, self._view_wrapper(name, method))
+
+    def _view_wrapper(self, name, method):
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            frame = _Frame(name)
+            profiler._stack.append(frame)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                profiler._stack.pop()
+                profiler._finish(frame)
+        wrapper.__name__ = name
+        return wrapper
+
+    #only the view name and its timings go into the trace, never the arguments (a view's
+    #arguments include what was typed into the chat)
+    def _finish(self, frame):
+        ended = time.perf_counter()
+        total = ended - frame.started
+        processing = max(total - frame.network - frame.widgets, 0.0)
+        self.views += 1
+        detail = {"network_ms": round(frame.network * 1000, 3),
+                  "widgets_ms": round(frame.widgets * 1000, 3),
+                  "processing_ms": round(processing * 1000, 3),
+                  "requests": frame.requests,
+                  "widgets_created": frame.created,
+                  "widgets_destroyed": frame.destroyed}
+        self._emit({"name": frame.name, "cat": "view", "ph": "X", "tid": self._ui_thread,
+                    "ts": self._us(frame.started), "dur": self._us(ended) - self._us(frame.started),
+                    "args": detail})
+        # a counter track, so the viewer also graphs the split per navigation
+        self._emit({"name": "view time (ms)", "ph": "C", "tid": self._ui_thread, "ts": self._us(ended),
+                    "args": {k: detail[k] for k in ("network_ms", "widgets_ms", "processing_ms")}})
+        self._emit({"name": "widgets", "ph": "C", "tid": self._ui_thread, "ts": self._us(ended),
+                    "args": {"created": frame.created, "destroyed": frame.destroyed}})
+        with self._lock:
+            if self._file:
+                self._file.flush()
+
+    #undoes the tkinter patches and closes the JSON array
+    def close(self):
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals = []
+        with self._lock:
+            if self._file:
+                self._file.write(json.dumps({"name": "session_end", "ph": "i", "s": "g", "pid": self._pid,
+                                             "tid": self._ui_thread, "ts": self._us(time.perf_counter())}))
+                self._file.write("\n]\n")
+                self._file.close()
+                self._file = None
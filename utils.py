@@ -1 +1,10 @@
-#for any utility functions used across multiple modules we may be adding in the future
\ No newline at end of file
+#for any utility functions used across multiple modules we may be adding in the future
+import os
+
+
+#folder where the app keeps its local files (session snapshots, reminders, ...)
+#can be moved with the CANVAS_CHATBOT_HOME environment variable
+def app_data_dir():
+    path = os.environ.get("CANVAS_CHATBOT_HOME") or os.path.join(os.path.expanduser("~"), ".canvas_chatbot")
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,99 @@
+# views.py - what each GUI view reads from Canvas and the caches, without any widgets.
+# Gui_app draws these, benchmarks.py calls the same functions to time the screens
+from datetime import datetime, timezone
+
+
+#the next `limit` assignments due, as dashboard lines, merged from the per-course summary table
+def upcoming_lines(course_stats, limit=3, now=None):
+    now = now or datetime.now(timezone.utc)
+    upcoming = []
+    for due, course, assignment in course_stats.upcoming(limit=limit, now=now.timestamp()):
+        delta = datetime.fromtimestamp(due, timezone.utc) - now
+        days = delta.days
+        hours = delta.seconds // 3600
+        course_code = course.get('name', '')[:20].strip()
+        if days == 0:
+            time_str = f"Due in {hours} hours"
+        else:
+            time_str = f"Due in {days} days"
+        upcoming.append(f"{course_code} - {assignment.get('name', 'Untitled')} ({time_str})")
+    return upcoming or ["No upcoming assignments"]
+
+
+#one dashboard line per course with its current grade
+def grade_lines(course_stats):
+    lines = []
+    for row in course_stats.rows():
+        course_name = row.name or 'Unknown Course'
+        if row.score is not None:
+            lines.append(f"{course_name} - {row.score:.1f}% {row.letter}")
+        else:
+            lines.append(f"{course_name} - No grade yet")
+    return lines or ["No grades available"]
+
+
+def _due(assignment):
+    try:
+        return datetime.fromisoformat(assignment['due_at'].replace('Z', '+00:00'))
+    except (KeyError, AttributeError, TypeError, ValueError):
+        return None
+
+
+#one dashboard line per course with work due in the coming week or past due and not handed
+#in, from the summary table. courses whose submissions aren't loaded only show the week
+def week_lines(course_stats, now=None):
+    now = now or datetime.now(timezone.utc)
+    names = {row.course_id: row.name for row in course_stats.rows()}
+    lines = []
+    for course_id, (next_due, this_week, unsubmitted) in course_stats.due_summary(now.timestamp()).items():
+        parts = []
+        if this_week:
+            parts.append(f"{this_week} due this week, next {next_due.get('name', 'Untitled')}")
+        if unsubmitted:
+            parts.append(f"{unsubmitted} past due and not handed in")
+        if parts:
+            lines.append(f"{names.get(course_id) or 'Unknown Course'} - {'; '.join(parts)}")
+    return lines or ["Nothing due this week"]
+
+
+#the assignments view as (missing, upcoming): past-due work that was never turned in, over
+#every course in one request chain, and (course name, assignments) per course of the work
+#not handed in that's undated or due after now, soonest first. the upcoming part comes from
+#the caches: what was handed in is what login loaded plus what sync has seen since. courses
+#with no submissions cached (the REST login path) have them fetched first
+def assignment_lists(api, assignments_cache, course_stats, now):
+    missing = api.get_missing_submissions() or []
+    course_stats.load_submissions()
+    upcoming = []
+    for row in course_stats.rows():
+        open_work = []
+        for assignment in assignments_cache.get(row.course_id, []):
+            if assignment.get('id') in row.submitted:
+                continue
+            due = _due(assignment)
+            # undated work is listed, and so is a date that doesn't parse rather than lose it
+            if not assignment.get('due_at') or due is None or due > now:
+                open_work.append(assignment)
+        if open_work:
+            open_work.sort(key=lambda a: a.get('due_at') or '9999-12-31')
+            upcoming.append((row.name or 'Unnamed Course', open_work))
+    return missing, upcoming
+
+
+#(course, enrollment grade or None) for every course, for the grades view
+def course_grades(api, courses):
+    return [(course, api.get_course_grade(course.get('id'))) for course in courses]
+
+
+#a course's assignments, each with the student's submission under 'submission', by due date.
+#one request chain; without it, what login loaded joined with the cached submissions
+def grade_details(api, assignments_cache, course_id):
+    assignments = api.get_assignments_with_submissions(course_id)
+    if assignments is None:
+        submission_map = {s.get('assignment_id'): s for s in api.get_assignment_submissions(course_id) or []}
+        assignments = [dict(a, submission=submission_map.get(a.get('id')))
+                       for a in assignments_cache.get(course_id, [])]
+    else:
+        assignments = list(assignments)
+    assignments.sort(key=lambda a: a.get('due_at') or '9999-12-31T00:00:00Z')
+    return assignments